@@ -18,7 +18,7 @@ load_dotenv(dotenv_path=env_path)
 
 # Import Base and all models
 from app.db.base import Base
-from app.models import User, Video, Vote
+from app.models import User, Video, Vote, UploadSession, OutboxTask, MediaAsset
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
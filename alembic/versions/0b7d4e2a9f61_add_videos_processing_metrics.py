@@ -0,0 +1,25 @@
+"""Add per-stage processing metrics to videos
+
+Revision ID: 0b7d4e2a9f61
+Revises: f2c6a8d4e913
+Create Date: 2025-11-01 10:21:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d4e2a9f61'
+down_revision = 'f2c6a8d4e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('processing_metrics', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'processing_metrics')
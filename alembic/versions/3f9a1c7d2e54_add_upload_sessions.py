@@ -0,0 +1,37 @@
+"""Add upload_sessions for resumable uploads
+
+Revision ID: 3f9a1c7d2e54
+Revises: b139fb2ec928
+Create Date: 2025-10-26 18:12:44.201873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2e54'
+down_revision = 'b139fb2ec928'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('original_filename', sa.String(length=255), nullable=False),
+    sa.Column('total_size', sa.BigInteger(), nullable=False),
+    sa.Column('received_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_sessions_user_id'), 'upload_sessions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_upload_sessions_user_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
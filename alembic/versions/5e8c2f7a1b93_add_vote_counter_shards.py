@@ -0,0 +1,30 @@
+"""Add sharded write-behind vote counters
+
+Revision ID: 5e8c2f7a1b93
+Revises: 9d3f1b6c2a48
+Create Date: 2025-11-05 12:07:26.840513
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8c2f7a1b93'
+down_revision = '9d3f1b6c2a48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('vote_counter_shards',
+    sa.Column('video_id', sa.UUID(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('video_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('vote_counter_shards')
@@ -0,0 +1,38 @@
+"""Add task_outbox for transactional task dispatch
+
+Revision ID: 7c2e8b41d0a3
+Revises: 3f9a1c7d2e54
+Create Date: 2025-10-27 10:03:18.552907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e8b41d0a3'
+down_revision = '3f9a1c7d2e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('task_outbox',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('task_name', sa.String(length=100), nullable=False),
+    sa.Column('args', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('options', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_outbox_status_created_at', 'task_outbox', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_outbox_status_created_at', table_name='task_outbox')
+    op.drop_table('task_outbox')
@@ -0,0 +1,24 @@
+"""Add failure reason to videos
+
+Revision ID: 9d3f1b6c2a48
+Revises: 0b7d4e2a9f61
+Create Date: 2025-11-03 16:42:11.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f1b6c2a48'
+down_revision = '0b7d4e2a9f61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('failure_reason', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'failure_reason')
@@ -0,0 +1,24 @@
+"""Add videos.hls_path for the HLS ladder
+
+Revision ID: a4d7e2f9c315
+Revises: 7c2e8b41d0a3
+Create Date: 2025-10-28 16:41:09.118254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7e2f9c315'
+down_revision = '7c2e8b41d0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('hls_path', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'hls_path')
@@ -0,0 +1,24 @@
+"""Index videos.file_path for the storage janitor
+
+Revision ID: a8f3c6e1d247
+Revises: e7a2b5d90c16
+Create Date: 2025-11-07 10:18:52.671034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8f3c6e1d247'
+down_revision = 'e7a2b5d90c16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_videos_file_path'), 'videos', ['file_path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_videos_file_path'), table_name='videos')
@@ -0,0 +1,44 @@
+"""Add user_vote_totals rollup for player rankings
+
+Revision ID: c41a7d9e5f28
+Revises: 5e8c2f7a1b93
+Create Date: 2025-11-06 09:54:13.402716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a7d9e5f28'
+down_revision = '5e8c2f7a1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('user_vote_totals',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('city', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('public_videos', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_vote_totals_city_total', 'user_vote_totals', ['city', sa.text('total DESC'), 'user_id'], unique=False)
+    op.create_index('ix_user_vote_totals_total', 'user_vote_totals', [sa.text('total DESC'), 'user_id'], unique=False)
+    
+    # Totals of videos published before the rollup existed
+    op.execute("""
+        INSERT INTO user_vote_totals (user_id, city, total, public_videos)
+        SELECT videos.user_id, users.city, sum(videos.votes_count), count(*)
+        FROM videos JOIN users ON users.id = videos.user_id
+        WHERE videos.is_public AND videos.status = 'processed'
+        GROUP BY videos.user_id, users.city
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_vote_totals_total', table_name='user_vote_totals')
+    op.drop_index('ix_user_vote_totals_city_total', table_name='user_vote_totals')
+    op.drop_table('user_vote_totals')
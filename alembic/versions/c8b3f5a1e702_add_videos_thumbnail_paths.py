@@ -0,0 +1,28 @@
+"""Add poster, preview and sprite paths to videos
+
+Revision ID: c8b3f5a1e702
+Revises: a4d7e2f9c315
+Create Date: 2025-10-29 09:27:52.730416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8b3f5a1e702'
+down_revision = 'a4d7e2f9c315'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('poster_path', sa.String(length=500), nullable=True))
+    op.add_column('videos', sa.Column('preview_path', sa.String(length=500), nullable=True))
+    op.add_column('videos', sa.Column('sprite_path', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'sprite_path')
+    op.drop_column('videos', 'preview_path')
+    op.drop_column('videos', 'poster_path')
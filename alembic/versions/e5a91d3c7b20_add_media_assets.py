@@ -0,0 +1,46 @@
+"""Add content hash to videos and media_assets cache
+
+Revision ID: e5a91d3c7b20
+Revises: c8b3f5a1e702
+Create Date: 2025-10-30 11:42:05.184233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a91d3c7b20'
+down_revision = 'c8b3f5a1e702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_videos_content_hash'), 'videos', ['content_hash'], unique=False)
+    op.create_table('media_assets',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('profile_version', sa.String(length=40), nullable=False),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=50), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('hls_path', sa.String(length=500), nullable=True),
+    sa.Column('poster_path', sa.String(length=500), nullable=True),
+    sa.Column('preview_path', sa.String(length=500), nullable=True),
+    sa.Column('sprite_path', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'profile_version', name='uq_media_assets_hash_version')
+    )
+    op.create_index(op.f('ix_media_assets_content_hash'), 'media_assets', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_assets_content_hash'), table_name='media_assets')
+    op.drop_table('media_assets')
+    op.drop_index(op.f('ix_videos_content_hash'), table_name='videos')
+    op.drop_column('videos', 'content_hash')
@@ -0,0 +1,71 @@
+"""Add hourly video_vote_buckets for time-windowed rankings
+
+Revision ID: e7a2b5d90c16
+Revises: c41a7d9e5f28
+Create Date: 2025-11-06 16:31:48.209571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2b5d90c16'
+down_revision = 'c41a7d9e5f28'
+branch_labels = None
+depends_on = None
+
+
+def _flush_pending_votes() -> None:
+    """Add pending shards to the videos and their owners' totals, then empty them"""
+    op.execute("""
+        WITH drained AS (
+            DELETE FROM vote_counter_shards RETURNING video_id, delta
+        ), totals AS (
+            SELECT video_id, sum(delta) AS delta FROM drained GROUP BY video_id
+        ), bumped AS (
+            UPDATE videos SET votes_count = videos.votes_count + totals.delta
+            FROM totals WHERE videos.id = totals.video_id
+            RETURNING videos.user_id, totals.delta
+        )
+        UPDATE user_vote_totals SET total = user_vote_totals.total + owners.delta
+        FROM (SELECT user_id, sum(delta) AS delta FROM bumped GROUP BY user_id) AS owners
+        WHERE user_vote_totals.user_id = owners.user_id
+    """)
+
+
+def upgrade() -> None:
+    op.create_table('video_vote_buckets',
+    sa.Column('video_id', sa.UUID(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('votes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('video_id', 'hour')
+    )
+    op.create_index('ix_video_vote_buckets_hour', 'video_vote_buckets', ['hour'], unique=False)
+    op.create_index(op.f('ix_votes_voted_at'), 'votes', ['voted_at'], unique=False)
+    
+    # Shards are now keyed by hour too; pending ones carry no hour, so flush them first
+    _flush_pending_votes()
+    op.add_column('vote_counter_shards', sa.Column('hour', sa.DateTime(), nullable=False))
+    op.drop_constraint('vote_counter_shards_pkey', 'vote_counter_shards', type_='primary')
+    op.create_primary_key('vote_counter_shards_pkey', 'vote_counter_shards', ['video_id', 'shard', 'hour'])
+    
+    # With nothing pending, every vote is already in votes_count
+    op.execute("""
+        INSERT INTO video_vote_buckets (video_id, hour, votes)
+        SELECT video_id, date_trunc('hour', voted_at), count(*)
+        FROM votes
+        GROUP BY video_id, date_trunc('hour', voted_at)
+    """)
+
+
+def downgrade() -> None:
+    _flush_pending_votes()
+    op.drop_constraint('vote_counter_shards_pkey', 'vote_counter_shards', type_='primary')
+    op.drop_column('vote_counter_shards', 'hour')
+    op.create_primary_key('vote_counter_shards_pkey', 'vote_counter_shards', ['video_id', 'shard'])
+    
+    op.drop_index(op.f('ix_votes_voted_at'), table_name='votes')
+    op.drop_index('ix_video_vote_buckets_hour', table_name='video_vote_buckets')
+    op.drop_table('video_vote_buckets')
@@ -0,0 +1,27 @@
+"""Add processing pipeline checkpoint to videos
+
+Revision ID: f2c6a8d4e913
+Revises: e5a91d3c7b20
+Create Date: 2025-10-31 15:08:41.620397
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8d4e913'
+down_revision = 'e5a91d3c7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('processing_stage', sa.String(length=20), nullable=True))
+    op.add_column('videos', sa.Column('processing_artifacts', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'processing_artifacts')
+    op.drop_column('videos', 'processing_stage')
@@ -8,6 +8,10 @@ from app.schemas.video import VideoListItem, PublicVideoItem
 from app.schemas.vote import VoteResponse, RankingItem
 from app.repositories.video_repository import video_repository
 from app.repositories.vote_repository import vote_repository
+from app.repositories.user_vote_total_repository import user_vote_total_repository
+from app.repositories.video_vote_bucket_repository import video_vote_bucket_repository, RANKING_WINDOWS
+from app.services.leaderboard_service import leaderboard_service
+from app.storage.file_service import fileservice
 from app.core.dependencies import get_current_user
 from app.models.user import User
 from app.core.exceptions import ValidationException, NotFoundException
@@ -38,6 +42,10 @@ async def list_public_videos(
             video_id=str(v.id),
             title=v.title,
             processed_url=v.file_path,
+            hls_url=fileservice.get_file_url(v.hls_path) if v.hls_path else None,
+            poster_url=fileservice.get_file_url(v.poster_path) if v.poster_path else None,
+            preview_url=fileservice.get_file_url(v.preview_path) if v.preview_path else None,
+            sprite_url=fileservice.get_file_url(v.sprite_path) if v.sprite_path else None,
             username=f"{v.user.first_name} {v.user.last_name}",
             city=v.user.city,
             votes=v.votes_count
@@ -70,27 +78,22 @@ async def vote_video(
     except ValueError:
         raise ValidationException("Invalid UUID format")
     
-    video = await video_repository.get_by_id(db, video_uuid)
+    # Un solo round trip: existencia, insert idempotente e incremento en la BD
+    found, votes = await vote_repository.cast_vote(db, current_user.id, video_uuid)
     
-    if not video or not video.is_public:
+    if not found:
         raise NotFoundException("Video not found or not public")
     
-    existing_vote = await vote_repository.get_vote(db, current_user.id, video_uuid)
-    
-    if existing_vote:
+    if votes is None:
         raise ValidationException("You have already voted for this video")
     
-    await vote_repository.create(db, current_user.id, video_uuid)
-    
-    # Incrementar contador de votos
-    video.votes_count += 1
-    db.add(video)
     await db.commit()
+    await leaderboard_service.record_vote(db, video_id, votes)
     
     return VoteResponse(
         message="Vote registered successfully",
         video_id=str(video_id),
-        votes=video.votes_count
+        votes=votes
     )
 
 
@@ -99,32 +102,100 @@ async def vote_video(
     status_code=status.HTTP_200_OK,
     response_model=List[RankingItem],
     summary="Get video rankings",
-    description="Get users ranked by total votes. **No authentication required**.",
+    description=(
+        "Get public videos ranked by votes, all time or within a window "
+        "(daily, weekly or season). **No authentication required**."
+    ),
     responses={
-        200: {"description": "List of rankings"}
+        200: {"description": "List of rankings"},
+        400: {"description": "Invalid window"}
     }
 )
 async def get_rankings(
     city: Optional[str] = Query(None, description="Filter by city"),
+    window: Optional[str] = Query(None, description="Only count votes cast in the last day, week or this season"),
     limit: int = Query(20, ge=1, le=100, description="Number of results"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get video rankings (No authentication required)"""
-    videos = await video_repository.get_rankings(
+    if window is not None:
+        if window not in RANKING_WINDOWS:
+            raise ValidationException(f"Invalid window. Allowed: {', '.join(RANKING_WINDOWS)}")
+        
+        # Solo se suman los buckets por hora de la ventana
+        ranked = await video_vote_bucket_repository.get_rankings(
+            db,
+            since=video_vote_bucket_repository.window_start(window),
+            city=city,
+            limit=limit,
+            offset=offset
+        )
+        return [
+            RankingItem(
+                position=idx,
+                username=f"{video.user.first_name} {video.user.last_name}",
+                city=video.user.city,
+                votes=votes
+            )
+            for idx, (video, votes) in enumerate(ranked, start=offset + 1)
+        ]
+    
+    entries = await leaderboard_service.page(db, city=city, limit=limit, offset=offset)
+    
+    # Sin Redis se calcula desde Postgres
+    if entries is None:
+        videos = await video_repository.get_rankings(
+            db,
+            city=city,
+            limit=limit,
+            offset=offset
+        )
+        entries = [
+            {
+                "username": f"{video.user.first_name} {video.user.last_name}",
+                "city": video.user.city,
+                "votes": video.votes_count
+            }
+            for video in videos
+        ]
+    
+    return [
+        RankingItem(position=idx, **entry)
+        for idx, entry in enumerate(entries, start=offset + 1)
+    ]
+
+
+@router.get(
+    "/rankings/users",
+    status_code=status.HTTP_200_OK,
+    response_model=List[RankingItem],
+    summary="Get player rankings",
+    description="Get users ranked by the total votes of their public videos. **No authentication required**.",
+    responses={
+        200: {"description": "List of rankings"}
+    }
+)
+async def get_user_rankings(
+    city: Optional[str] = Query(None, description="Filter by city"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get player rankings from the user_vote_totals rollup (No authentication required)"""
+    players = await user_vote_total_repository.get_rankings(
         db,
         city=city,
         limit=limit,
         offset=offset
     )
     
-    rankings = []
-    for idx, video in enumerate(videos, start=offset + 1):
-        rankings.append(RankingItem(
+    return [
+        RankingItem(
             position=idx,
-            username=f"{video.user.first_name} {video.user.last_name}",
-            city=video.user.city,
-            votes=video.votes_count
-        ))
-    
-    return rankings
\ No newline at end of file
+            username=f"{user.first_name} {user.last_name}",
+            city=totals.city,
+            votes=totals.total
+        )
+        for idx, (totals, user) in enumerate(players, start=offset + 1)
+    ]
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, File, UploadFile, Form, status
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Header, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Dict, List, Optional
 from uuid import UUID
+import asyncio
+import hashlib
+import json
 import uuid
 from pathlib import Path
 import aiofiles
@@ -14,22 +18,88 @@ from app.schemas.video import (
     VideoDeleteResponse,
     VideoPublishResponse
 )
+from app.schemas.upload_session import UploadSessionCreateRequest, UploadSessionResponse
 from app.repositories.video_repository import video_repository
-from app.storage.file_service import fileservice
-from app.utils.video_validator import validate_video
+from app.repositories.upload_session_repository import upload_session_repository
+from app.repositories.media_asset_repository import media_asset_repository
+from app.repositories.user_vote_total_repository import user_vote_total_repository
+from app.services.outbox_service import outbox_service
+from app.storage.file_service import fileservice, iter_chunks, hash_chunks, content_hash
+from app.processing.assets import processing_version
+from app.services.probe_service import probe_service
+from app.services.progress_service import progress_service, TERMINAL_STATUSES
+from app.services.leaderboard_service import leaderboard_service
 from app.core.config import settings
+from app.core.celery_app import transcode_priority
 from app.core.dependencies import get_current_user
 from app.models.user import User
 from app.core.exceptions import (
     ValidationException,
     NotFoundException,
-    ForbiddenException
+    ForbiddenException,
+    ConflictException
 )
 from app.tasks.video_tasks import process_video_task
 
 router = APIRouter()
 
 
+async def _register_video(
+    db: AsyncSession,
+    user: User,
+    title: str,
+    original_filename: str,
+    file_path: str,
+    file_size: int,
+    digest: str,
+    metadata: Optional[Dict]
+) -> VideoUploadResponse:
+    """Create the video row and either link cached outputs or queue processing"""
+    logo_path = Path(settings.RES_PATH) / "logo720.png"
+    asset = await media_asset_repository.get(db, digest, processing_version(str(logo_path)))
+    
+    # Create video record in database with status="uploaded"
+    video = await video_repository.create(
+        db=db,
+        user_id=user.id,
+        title=title,
+        original_filename=original_filename,
+        file_path=file_path,
+        duration_seconds=int(metadata['duration']) if metadata else 0,
+        file_size_bytes=file_size,
+        status="uploaded",
+        content_hash=digest
+    )
+    
+    # Duplicate content: reuse the processed outputs, no worker involved
+    if asset and Path(asset.file_path).exists():
+        media_asset_repository.link(video, asset)
+        await db.commit()
+        await fileservice.delete_file(file_path)
+        
+        return VideoUploadResponse(
+            message="Video uploaded successfully and linked to an existing processed copy",
+            task_id=str(video.id)
+        )
+    
+    # Queue the video processing task in the same transaction as the video
+    outbox_entry = await outbox_service.enqueue(
+        db,
+        process_video_task.name,
+        [str(video.id), file_path],
+        {"priority": transcode_priority(metadata['duration'] if metadata else None)}
+    )
+    await db.commit()
+    
+    # Publish only now that the video row is visible to the worker
+    await outbox_service.dispatch(db, [outbox_entry])
+    
+    return VideoUploadResponse(
+        message="Video uploaded successfully and queued for processing",
+        task_id=str(video.id)
+    )
+
+
 @router.post(
     "/upload",
     status_code=status.HTTP_201_CREATED,
@@ -52,38 +122,242 @@ async def upload_video(
     if not video_file.content_type or not video_file.content_type.startswith("video/"):
         raise ValidationException("File must be a video")
     
-    file_content = await video_file.read()
-    file_size = len(file_content)
-    
     max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-    if file_size > max_size:
+    
+    # Reject early when the multipart parser already knows the size
+    if video_file.size is not None and video_file.size > max_size:
         raise ValidationException(f"File size exceeds maximum allowed ({settings.MAX_FILE_SIZE_MB}MB)")
     
+    # Reject clips outside the duration/resolution rules from their MP4 header
+    # before storing anything or queueing a worker job (off the event loop:
+    # the header read seeks through the spooled upload)
+    metadata = await asyncio.to_thread(probe_service.check_upload, video_file.file)
+    
     # Generate unique filename
     video_id = uuid.uuid4()
-    temp_filename = f"{video_id}.mp4"
     
-    # Save file to uploads folder (temp location for processing)
-    temp_file_path = await fileservice.save_file(file_content=file_content, filename=f"{video_id}.mp4", subfolder="uploads")
+    # Stream file to uploads folder (temp location for processing) chunk by chunk,
+    # hashing it on the way for deduplication
+    digest = hashlib.sha256()
+    temp_file_path, file_size = await fileservice.save_stream(
+        chunks=hash_chunks(iter_chunks(video_file), digest),
+        filename=f"{video_id}.mp4",
+        subfolder="uploads",
+        max_size=max_size
+    )
     
-    # Create video record in database with status="uploaded"
-    video = await video_repository.create(
+    return await _register_video(
+        db,
+        current_user,
+        title,
+        video_file.filename or "video.mp4",
+        str(temp_file_path),
+        file_size,
+        digest.hexdigest(),
+        metadata
+    )
+
+
+async def _get_owned_upload(db: AsyncSession, upload_id: str, user: User, for_update: bool = False):
+    """Load an upload session and check it belongs to the user"""
+    try:
+        upload_uuid = UUID(upload_id)
+    except ValueError:
+        raise ValidationException("Invalid UUID format")
+    
+    upload = await upload_session_repository.get_by_id(db, upload_uuid, for_update=for_update)
+    
+    if not upload:
+        raise NotFoundException("Upload session not found")
+    
+    if upload.user_id != user.id:
+        raise ForbiddenException("You don't have permission to access this upload")
+    
+    return upload
+
+
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    response_model=UploadSessionResponse,
+    summary="Start a resumable upload",
+    description="Create a resumable upload session. Send chunks with `PATCH /uploads/{upload_id}`. **Requires JWT authentication**.",
+    responses={
+        201: {"description": "Upload session created"},
+        401: {"description": "Unauthorized - Invalid or missing token"},
+        400: {"description": "Bad request - Invalid size or data"}
+    }
+)
+async def create_upload_session(
+    upload_data: UploadSessionCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a resumable upload session (JWT Protected)"""
+    if upload_data.total_size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+        raise ValidationException(f"File size exceeds maximum allowed ({settings.MAX_FILE_SIZE_MB}MB)")
+    
+    upload = await upload_session_repository.create(
         db=db,
         user_id=current_user.id,
-        title=title,
-        original_filename=video_file.filename or "video.mp4",
-        file_path=str(temp_file_path),
-        duration_seconds=0,
-        file_size_bytes=file_size,
-        status="uploaded"
+        title=upload_data.title,
+        original_filename=upload_data.filename,
+        total_size=upload_data.total_size
     )
     
-    # Queue the video processing task
-    task = process_video_task.delay(str(video.id), str(temp_file_path))
+    return UploadSessionResponse(
+        upload_id=str(upload.id),
+        offset=upload.received_bytes,
+        total_size=upload.total_size
+    )
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=UploadSessionResponse,
+    summary="Get resumable upload offset",
+    description="Return how many bytes of the upload have been stored, so the client knows where to resume. **Requires JWT authentication**.",
+    responses={
+        200: {"description": "Current upload offset"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Forbidden - Not the upload owner"},
+        404: {"description": "Upload session not found"}
+    }
+)
+async def get_upload_session(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the current offset of a resumable upload (JWT Protected)"""
+    upload = await _get_owned_upload(db, upload_id, current_user)
     
-    return VideoUploadResponse(
-        message="Video uploaded successfully and queued for processing",
-        task_id=str(video.id)
+    response.headers["Upload-Offset"] = str(upload.received_bytes)
+    return UploadSessionResponse(
+        upload_id=str(upload.id),
+        offset=upload.received_bytes,
+        total_size=upload.total_size
+    )
+
+
+@router.patch(
+    "/uploads/{upload_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=UploadSessionResponse,
+    summary="Upload a chunk",
+    description="Append the raw request body at the position given by the `Upload-Offset` header. **Requires JWT authentication**.",
+    responses={
+        200: {"description": "Chunk stored"},
+        400: {"description": "Chunk exceeds the declared size"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Forbidden - Not the upload owner"},
+        404: {"description": "Upload session not found"},
+        409: {"description": "Offset does not match the stored offset"}
+    }
+)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Append a chunk to a resumable upload (JWT Protected)"""
+    upload = await _get_owned_upload(db, upload_id, current_user)
+    filename = f"{upload.id}.part"
+    
+    # Concurrent chunks of the same upload are serialized on the partial file
+    async with fileservice.lock_partial(filename, subfolder="temp"):
+        await db.refresh(upload, ["received_bytes"])
+        if upload_offset != upload.received_bytes:
+            raise ConflictException(f"Upload offset mismatch (expected {upload.received_bytes})")
+        
+        # No transaction (nor pooled connection) is held while the chunk arrives
+        await db.commit()
+        
+        received_bytes = await fileservice.append_stream(
+            chunks=request.stream(),
+            filename=filename,
+            offset=upload_offset,
+            subfolder="temp",
+            max_size=upload.total_size - upload_offset
+        )
+        
+        if not await upload_session_repository.advance(db, upload.id, upload_offset, received_bytes):
+            raise ConflictException("Upload offset changed while the chunk was being written")
+        await db.commit()
+    
+    response.headers["Upload-Offset"] = str(received_bytes)
+    return UploadSessionResponse(
+        upload_id=str(upload.id),
+        offset=received_bytes,
+        total_size=upload.total_size
+    )
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    status_code=status.HTTP_201_CREATED,
+    response_model=VideoUploadResponse,
+    summary="Finish a resumable upload",
+    description="Turn a fully received upload into a video and queue it for processing. **Requires JWT authentication**.",
+    responses={
+        201: {"description": "Video uploaded successfully"},
+        400: {"description": "Upload is not complete"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Forbidden - Not the upload owner"},
+        404: {"description": "Upload session not found"}
+    }
+)
+async def complete_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Finalize a resumable upload (JWT Protected)"""
+    upload = await _get_owned_upload(db, upload_id, current_user, for_update=True)
+    
+    if upload.received_bytes != upload.total_size:
+        raise ValidationException(
+            f"Upload is incomplete ({upload.received_bytes} of {upload.total_size} bytes received)"
+        )
+    
+    # Move assembled file to uploads folder (temp location for processing)
+    temp_file_path = await fileservice.move_file(
+        filename=f"{upload.id}.part",
+        src_subfolder="temp",
+        dest_filename=f"{upload.id}.mp4",
+        dest_subfolder="uploads"
+    )
+    
+    # Same header check as the direct upload; a rejected file ends the session
+    try:
+        metadata = await asyncio.to_thread(probe_service.read_header, temp_file_path)
+        if metadata is not None:
+            probe_service.validate(metadata)
+    except ValidationException:
+        await fileservice.delete_file(temp_file_path)
+        await upload_session_repository.delete(db, upload.id)
+        await db.commit()
+        raise
+    
+    await upload_session_repository.delete(db, upload.id)
+    
+    # Chunks arrive over several requests, so the assembled file is hashed here
+    digest = await asyncio.to_thread(content_hash, temp_file_path)
+    
+    return await _register_video(
+        db,
+        current_user,
+        upload.title,
+        upload.original_filename,
+        str(temp_file_path),
+        upload.total_size,
+        digest,
+        metadata
     )
 
 
@@ -153,6 +427,7 @@ async def get_video(
         video_id=str(video.id),
         title=video.title,
         status=video.status,
+        failure_reason=video.failure_reason,
         uploaded_at=video.uploaded_at,
         file_path=video.file_path,
         votes=video.votes_count,
@@ -162,6 +437,60 @@ async def get_video(
     )
 
 
+def _sse(event: dict) -> str:
+    return f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get(
+    "/{video_id}/events",
+    status_code=status.HTTP_200_OK,
+    summary="📡 Stream processing progress",
+    description="Server-Sent Events with the processing stage and percent of a video until it is processed or fails. **Requires JWT authentication**.",
+    responses={
+        200: {"description": "text/event-stream of progress updates"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Forbidden - Not the video owner"},
+        404: {"description": "Video not found"}
+    }
+)
+async def stream_video_progress(
+    video_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream processing progress instead of polling the video (JWT Protected)"""
+    try:
+        video_uuid = UUID(video_id)
+    except ValueError:
+        raise ValidationException("Invalid UUID format")
+    
+    video = await video_repository.get_by_id(db, video_uuid)
+    
+    if not video:
+        raise NotFoundException("Video not found")
+    
+    if video.user_id != current_user.id:
+        raise ForbiddenException("You don't have permission to view this video")
+    
+    # Read everything needed now; the DB session is released before streaming
+    current = {"video_id": str(video.id), "status": video.status, "stage": video.processing_stage, "percent": None}
+    
+    async def events():
+        yield _sse(current)
+        if current["status"] in TERMINAL_STATUSES:
+            return
+        
+        async for event in progress_service.listen(current["video_id"]):
+            # Comment lines keep proxies from closing an idle connection
+            yield _sse(event) if event is not None else ": keepalive\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.put(
     "/{video_id}/publish",
     status_code=status.HTTP_200_OK,
@@ -197,11 +526,13 @@ async def publish_video(
     if video.status != "processed":
         raise ValidationException("Video must be processed before publishing")
     
-    # Actualizar el video
-    video.is_public = True
-    db.add(video)
+    # Solo la petición que cambia is_public suma el video al total del jugador
+    votes = await video_repository.mark_public(db, video.id)
+    if votes is not None:
+        await user_vote_total_repository.add_video(db, current_user, votes)
     await db.commit()
-    await db.refresh(video) 
+    await db.refresh(video)
+    await leaderboard_service.add(video, current_user)
     
     return VideoPublishResponse(
         message="Video published successfully",
@@ -246,9 +577,10 @@ async def delete_video(
     if video.is_public:
         raise ValidationException("Cannot delete a public video")
     
-    # Eliminar archivo físico
+    # Eliminar archivo físico (processed outputs are shared blobs owned by media_assets)
     try:
-        await fileservice.delete_file(video.file_path)
+        if not (video.content_hash and video.status == "processed"):
+            await fileservice.delete_file(video.file_path)
     except Exception as e:
         print(f"Error deleting file: {e}")
     
@@ -24,6 +24,12 @@ class DuplicateException(APIException):
         super().__init__(status_code=400, detail=detail)
 
 
+class ConflictException(APIException):
+    """Exception for requests that conflict with the current resource state"""
+    def __init__(self, detail: str):
+        super().__init__(status_code=409, detail=detail)
+
+
 class UnauthorizedException(APIException):
     """Exception for unauthorized access"""
     def __init__(self, detail: str = "Unauthorized"):
@@ -0,0 +1,115 @@
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client import multiprocess
+
+from app.core.config import settings
+
+SECONDS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+FPS_BUCKETS = (5, 10, 25, 50, 100, 200, 400, 800, 1600)
+BYTES_BUCKETS = (1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8, 2.5e8, 5e8)
+RSS_BUCKETS = (6.4e7, 1.28e8, 2.56e8, 5.12e8, 1.024e9, 2.048e9, 4.096e9)
+
+STAGE_WALL_SECONDS = Histogram(
+    "video_stage_wall_seconds", "Wall-clock time per processing stage", ["stage"], buckets=SECONDS_BUCKETS
+)
+STAGE_CPU_SECONDS = Histogram(
+    "video_stage_cpu_seconds", "CPU time per stage, including ffmpeg children", ["stage"], buckets=SECONDS_BUCKETS
+)
+STAGE_ENCODE_FPS = Histogram(
+    "video_stage_encode_fps", "Frames encoded per wall-clock second", ["stage"], buckets=FPS_BUCKETS
+)
+STAGE_INPUT_BYTES = Histogram(
+    "video_stage_input_bytes", "Bytes read by a stage", ["stage"], buckets=BYTES_BUCKETS
+)
+STAGE_OUTPUT_BYTES = Histogram(
+    "video_stage_output_bytes", "Bytes written by a stage", ["stage"], buckets=BYTES_BUCKETS
+)
+STAGE_PEAK_RSS_BYTES = Histogram(
+    "video_stage_peak_rss_bytes", "Peak RSS of the worker or its largest ffmpeg child", ["stage"], buckets=RSS_BUCKETS
+)
+
+STORAGE_RECLAIMED_BYTES = Counter(
+    "storage_janitor_reclaimed_bytes", "Bytes of orphaned files removed by the storage janitor", ["area"]
+)
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus every child it has waited for"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def current_rss_bytes() -> int:
+    """Resident memory of this process right now (Linux), or its peak elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_bytes()
+
+
+def _peak_rss_bytes() -> int:
+    """High-water mark of this process or of its largest finished child"""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def measure_stage(stage: str) -> Iterator[Dict]:
+    """
+    Time a processing stage and export it to Prometheus.
+    
+    The stage fills in input_bytes, output_bytes and frames on the yielded
+    dict; wall/CPU time, fps and peak RSS are added on exit. Nothing is
+    recorded if the stage raises.
+    """
+    stats: Dict = {}
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    
+    yield stats
+    
+    wall = time.perf_counter() - wall_start
+    stats["wall_seconds"] = round(wall, 3)
+    stats["cpu_seconds"] = round(_cpu_seconds() - cpu_start, 3)
+    stats["peak_rss_bytes"] = _peak_rss_bytes()
+    if stats.get("frames") and wall > 0:
+        stats["fps"] = round(stats["frames"] / wall, 1)
+    
+    STAGE_WALL_SECONDS.labels(stage).observe(stats["wall_seconds"])
+    STAGE_CPU_SECONDS.labels(stage).observe(stats["cpu_seconds"])
+    STAGE_PEAK_RSS_BYTES.labels(stage).observe(stats["peak_rss_bytes"])
+    if "fps" in stats:
+        STAGE_ENCODE_FPS.labels(stage).observe(stats["fps"])
+    if stats.get("input_bytes"):
+        STAGE_INPUT_BYTES.labels(stage).observe(stats["input_bytes"])
+    if stats.get("output_bytes"):
+        STAGE_OUTPUT_BYTES.labels(stage).observe(stats["output_bytes"])
+
+
+def start_metrics_server() -> None:
+    """
+    Serve /metrics for the worker on METRICS_PORT (0 disables it).
+    
+    Prefork children each keep their own samples; with
+    PROMETHEUS_MULTIPROC_DIR set they are written there and aggregated here.
+    """
+    if not settings.METRICS_PORT:
+        return
+    
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(settings.METRICS_PORT, registry=registry)
+    else:
+        start_http_server(settings.METRICS_PORT)
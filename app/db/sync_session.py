@@ -0,0 +1,18 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+
+# Create synchronous database session for Celery worker
+SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+asyncpg", "")
+sync_engine = create_engine(SYNC_DATABASE_URL)
+SyncSessionLocal = sessionmaker(bind=sync_engine)
+
+
+def dispose_inherited_pool() -> None:
+    """
+    Give a forked worker child its own connection pool.
+    
+    Connections inherited from the parent are left untouched (close=False)
+    so the parent keeps using them; the child opens fresh ones on demand.
+    """
+    sync_engine.dispose(close=False)
@@ -11,7 +11,8 @@ from app.core.exceptions import (
     ForbiddenException,
     NotFoundException,
     ValidationException,
-    DuplicateException
+    DuplicateException,
+    ConflictException
 )
 
 app = FastAPI(
@@ -87,6 +88,14 @@ async def duplicate_exception_handler(request: Request, exc: DuplicateException)
     )
 
 
+@app.exception_handler(ConflictException)
+async def conflict_exception_handler(request: Request, exc: ConflictException):
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": str(exc)}
+    )
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(videos.router, prefix="/api/videos", tags=["Videos"])
@@ -1,6 +1,14 @@
 from app.models.user import User
 from app.models.video import Video
 from app.models.vote import Vote
+from app.models.upload_session import UploadSession
+from app.models.outbox_task import OutboxTask
+from app.models.media_asset import MediaAsset
+from app.models.vote_counter_shard import VoteCounterShard
+from app.models.user_vote_total import UserVoteTotal
+from app.models.video_vote_bucket import VideoVoteBucket
 
-__all__ = ["User", "Video", "Vote"]
-
+__all__ = [
+    "User", "Video", "Vote", "UploadSession", "OutboxTask", "MediaAsset", "VoteCounterShard", "UserVoteTotal",
+    "VideoVoteBucket"
+]
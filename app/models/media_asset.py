@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from app.db.base import Base
+
+
+class MediaAsset(Base):
+    """Probe metadata and processed outputs of one upload content, per processing version"""
+    __tablename__ = "media_assets"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    content_hash = Column(String(64), nullable=False, index=True)
+    profile_version = Column(String(40), nullable=False)
+    duration = Column(Float, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    codec = Column(String(50), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    hls_path = Column(String(500), nullable=True)
+    poster_path = Column(String(500), nullable=True)
+    preview_path = Column(String(500), nullable=True)
+    sprite_path = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('content_hash', 'profile_version', name='uq_media_assets_hash_version'),
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+import uuid
+from app.db.base import Base
+
+
+class OutboxTask(Base):
+    """Celery task waiting to be published once its transaction has committed"""
+    __tablename__ = "task_outbox"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_name = Column(String(100), nullable=False)
+    args = Column(JSONB, default=list, nullable=False)
+    options = Column(JSONB, default=dict, nullable=False)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    dispatched_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_task_outbox_status_created_at', 'status', 'created_at'),
+    )
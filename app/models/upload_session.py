@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import uuid
+from app.db.base import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    title = Column(String(200), nullable=False)
+    original_filename = Column(String(255), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    user = relationship("User")
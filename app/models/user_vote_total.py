@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base import Base
+
+
+class UserVoteTotal(Base):
+    """Votes of each player across their public videos, kept up to date incrementally"""
+    __tablename__ = "user_vote_totals"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    city = Column(String(100), nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    public_videos = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        # Rankings are served straight from these, in order
+        Index('ix_user_vote_totals_city_total', 'city', total.desc(), 'user_id'),
+        Index('ix_user_vote_totals_total', total.desc(), 'user_id'),
+    )
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -13,8 +13,17 @@ class Video(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    file_path = Column(String(500), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    hls_path = Column(String(500), nullable=True)
+    poster_path = Column(String(500), nullable=True)
+    preview_path = Column(String(500), nullable=True)
+    sprite_path = Column(String(500), nullable=True)
     status = Column(String(50), default="uploaded", nullable=False)
+    failure_reason = Column(String(500), nullable=True)
+    processing_stage = Column(String(20), nullable=True)  # last pipeline stage completed
+    processing_artifacts = Column(JSONB, nullable=True)  # intermediate outputs between stages
+    processing_metrics = Column(JSONB, nullable=True)  # per-stage timings, fps, bytes and peak RSS
     duration_seconds = Column(Integer, nullable=True)
     file_size_bytes = Column(Integer, nullable=False)
     is_public = Column(Boolean, default=False, nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base import Base
+
+
+class VideoVoteBucket(Base):
+    """Votes a video received in one UTC hour, summed for time-windowed rankings"""
+    __tablename__ = "video_vote_buckets"
+    
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)
+    votes = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        # Windowed rankings only read the buckets of the last hours
+        Index('ix_video_vote_buckets_hour', 'hour'),
+    )
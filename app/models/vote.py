@@ -12,7 +12,7 @@ class Vote(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=False)
-    voted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    voted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
     user = relationship("User", back_populates="votes")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, SmallInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base import Base
+
+
+class VoteCounterShard(Base):
+    """Votes not yet added to videos.votes_count, spread over rows to avoid one hot lock"""
+    __tablename__ = "vote_counter_shards"
+    
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # UTC hour the votes were cast, for video_vote_buckets
+    delta = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,38 @@
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.processing.errors import ProcessingError
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+from app.processing.thumbnails import Thumbnails
+
+
+def render_video(
+    input_path: str,
+    output_path: str,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    engine: str = None,
+    thumbnails_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None
+) -> Optional[Thumbnails]:
+    """
+    Render the final video with the configured engine ("ffmpeg" or "moviepy").
+    
+    Returns the generated thumbnails when thumbnails_dir is given. progress,
+    if given, is called with the completed fraction (0 to 1) of the encode.
+    """
+    engine = engine or settings.VIDEO_ENGINE
+    
+    # Engines are imported lazily so the worker never loads MoviePy unless asked to
+    if engine == "ffmpeg":
+        from app.processing.ffmpeg_engine import render_video as render
+    elif engine == "moviepy":
+        from app.processing.moviepy_engine import render_video as render
+    else:
+        raise ProcessingError(f"Unknown video engine: {engine}")
+    
+    return render(input_path, output_path, duration, logo_path, profile, thumbnails_dir, progress)
+
+
+__all__ = ["ProcessingError", "ProcessingProfile", "DEFAULT_PROFILE", "Thumbnails", "render_video"]
@@ -0,0 +1,72 @@
+import hashlib
+import os
+from pathlib import Path
+
+from app.core.config import settings
+from app.processing.ffmpeg_utils import build_segment_command, run_ffmpeg
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+
+SEGMENT_KINDS = ("intro", "outro")
+
+
+def cache_dir() -> Path:
+    """Directory for pre-rendered segments, next to the static resources"""
+    return Path(settings.RES_PATH) / "cache"
+
+
+def file_fingerprint(path: str) -> str:
+    """Short content hash used to invalidate segments when the logo changes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def processing_version(logo_path: str, profile: ProcessingProfile = DEFAULT_PROFILE) -> str:
+    """Key for processed outputs: changes with the profile or the logo"""
+    return f"{profile.name}-{profile.fingerprint}-{file_fingerprint(logo_path)}"
+
+
+def get_segment(kind: str, logo_path: str, profile: ProcessingProfile = DEFAULT_PROFILE) -> Path:
+    """
+    Return the cached intro/outro segment for a logo and profile, rendering it if needed.
+    
+    Segments are keyed by profile fingerprint and logo content hash, so a new
+    logo or profile produces a new file; stale variants are removed. Rendering
+    goes to a temporary name and is renamed into place, so concurrent workers
+    never read a half-written segment.
+    """
+    if kind not in SEGMENT_KINDS:
+        raise ValueError(f"Unknown segment kind: {kind}")
+    
+    folder = cache_dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    
+    prefix = f"{kind}-{profile.name}-{profile.fingerprint}-"
+    segment_path = folder / f"{prefix}{file_fingerprint(logo_path)}.mp4"
+    
+    if segment_path.exists():
+        return segment_path
+    
+    duration = profile.intro_duration if kind == "intro" else profile.outro_duration
+    tmp_path = folder / f".{segment_path.stem}.{os.getpid()}.mp4"
+    
+    try:
+        run_ffmpeg(build_segment_command(
+            logo_path,
+            str(tmp_path),
+            duration,
+            profile,
+            fade_in=(kind == "outro")
+        ))
+        tmp_path.replace(segment_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    
+    # Drop segments rendered from a previous logo
+    for stale in folder.glob(f"{prefix}*.mp4"):
+        if stale != segment_path:
+            stale.unlink(missing_ok=True)
+    
+    return segment_path
@@ -0,0 +1,3 @@
+class ProcessingError(Exception):
+    """Raised when a media processing step fails"""
+    pass
@@ -0,0 +1,342 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.processing.assets import get_segment
+from app.processing.ffmpeg_utils import (
+    base_args,
+    build_concat_command,
+    encoder_args,
+    fit_frame_filter,
+    fraction_of,
+    kill_running,
+    run_ffmpeg,
+    write_concat_list
+)
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+from app.storage.scratch import scratch_dir
+from app.processing.thumbnails import (
+    Thumbnails,
+    build_thumbnail_graph,
+    render_thumbnails,
+    thumbnail_output_args,
+    thumbnails_in
+)
+
+
+def build_body_graph(
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    watermark_input: int = 1,
+    output_label: str = "out",
+    fade_in: bool = True
+) -> str:
+    """
+    Build the graph for the trimmed body with its watermark.
+    
+    Input 0 is the source video (already cut with -t), watermark_input is the
+    looped logo. Produces a single [output_label] stream. fade_in is disabled
+    for body pieces that do not start at the beginning of the video.
+    """
+    fade = profile.fade_duration
+    body_fade = f"fade=t=in:st=0:d={fade}," if fade_in else ""
+    watermark_fade = f",fade=t=in:st=0:d={fade}:alpha=1" if fade_in else ""
+    
+    body = (
+        f"[0:v]setpts=PTS-STARTPTS,scale={profile.width}:{profile.height},setsar=1,"
+        f"fps={profile.fps},{body_fade}format={profile.pix_fmt}[body]"
+    )
+    
+    watermark = (
+        f"[{watermark_input}:v]scale=-2:{profile.watermark_height},format=rgba,"
+        f"colorchannelmixer=aa={profile.watermark_opacity}{watermark_fade}[wm]"
+    )
+    
+    # Watermark is centered horizontally with its top edge at half the height
+    main = (
+        f"[body][wm]overlay=x=(main_w-overlay_w)/2:y=main_h/2:shortest=1,"
+        f"format={profile.pix_fmt}[{output_label}]"
+    )
+    
+    return ";".join([body, watermark, main])
+
+
+def _with_thumbnails(graph: str, label: str, body_duration: float, profile: ProcessingProfile) -> str:
+    """Tee the [label] body stream into thumbnail branches, keeping [label] for the encode"""
+    return ";".join([
+        graph,
+        f"[{label}_all]split=2[{label}][{label}_thumbs]",
+        build_thumbnail_graph(f"{label}_thumbs", body_duration, profile)
+    ])
+
+
+def build_filter_graph(
+    body_duration: float,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    thumbnails: bool = False
+) -> str:
+    """
+    Build the filter_complex graph for the whole composition.
+    
+    Inputs: 0 = source video, 1 = intro logo, 2 = watermark logo, 3 = outro logo.
+    The graph produces a single [out] video stream, plus [poster], [preview]
+    and [sprite] when thumbnails is set.
+    """
+    intro = f"[1:v]{fit_frame_filter(profile)}[intro]"
+    if thumbnails:
+        main = _with_thumbnails(
+            build_body_graph(profile, watermark_input=2, output_label="main_all"),
+            "main", body_duration, profile
+        )
+    else:
+        main = build_body_graph(profile, watermark_input=2, output_label="main")
+    outro = f"[3:v]{fit_frame_filter(profile)},fade=t=in:st=0:d={profile.fade_duration}[outro]"
+    concat = "[intro][main][outro]concat=n=3:v=1:a=0[out]"
+    
+    return ";".join([intro, main, outro, concat])
+
+
+def _logo_input(logo_path: str, seconds: float, profile: ProcessingProfile) -> List[str]:
+    # Each logo use gets its own input so no branch has to buffer frames
+    return ['-loop', '1', '-framerate', str(profile.fps), '-t', str(seconds), '-i', logo_path]
+
+
+def build_ffmpeg_command(
+    input_path: str,
+    output_path: str,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    thumbnails_dir: Optional[str] = None
+) -> List[str]:
+    """Build the single ffmpeg invocation that renders the final video (and thumbnails)"""
+    body_duration = min(duration, profile.max_duration)
+    
+    return [
+        *base_args(),
+        '-t', str(body_duration), '-i', input_path,
+        *_logo_input(logo_path, profile.intro_duration, profile),
+        *_logo_input(logo_path, body_duration, profile),
+        *_logo_input(logo_path, profile.outro_duration, profile),
+        '-filter_complex', build_filter_graph(body_duration, profile, thumbnails=bool(thumbnails_dir)),
+        '-map', '[out]',
+        *encoder_args(profile),
+        '-movflags', '+faststart',
+        output_path,
+        *(thumbnail_output_args(thumbnails_dir) if thumbnails_dir else [])
+    ]
+
+
+def build_body_command(
+    input_path: str,
+    output_path: str,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    fade_in: bool = True,
+    threads: Optional[int] = None,
+    thumbnails_dir: Optional[str] = None
+) -> List[str]:
+    """
+    Build the command that renders only the body (trim, scale, fade, watermark).
+    
+    With thumbnails_dir the poster, preview and sprite are written from the
+    same decoded frames.
+    """
+    body_duration = min(duration, profile.max_duration)
+    thread_args = ['-threads', str(threads)] if threads else []
+    
+    if thumbnails_dir:
+        graph = _with_thumbnails(
+            build_body_graph(profile, fade_in=fade_in, output_label="out_all"),
+            "out", body_duration, profile
+        )
+    else:
+        graph = build_body_graph(profile, fade_in=fade_in)
+    
+    return [
+        *base_args(),
+        '-t', str(body_duration), '-i', input_path,
+        *_logo_input(logo_path, body_duration, profile),
+        '-filter_complex', graph,
+        '-map', '[out]',
+        *encoder_args(profile),
+        *thread_args,
+        output_path,
+        *(thumbnail_output_args(thumbnails_dir) if thumbnails_dir else [])
+    ]
+
+
+def render_video(
+    input_path: str,
+    output_path: str,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    thumbnails_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None
+) -> Optional[Thumbnails]:
+    """
+    Render intro, trimmed body with watermark and outro.
+    
+    With ASSET_CACHE_ENABLED only the body is encoded; the cached intro and
+    outro segments are joined to it with a stream-copy concat. With
+    PARALLEL_SEGMENTS > 1 the body itself is split at keyframes and its
+    pieces are encoded concurrently. Otherwise the whole composition is
+    encoded in a single ffmpeg process.
+    
+    With thumbnails_dir, thumbnails are taken from the body encode when it
+    runs as one process, or from a separate pass in parallel mode.
+    
+    progress is called with the encoded fraction of the body (or of the
+    whole composition in single-pass mode).
+    
+    Raises:
+        ProcessingError: If ffmpeg exits with an error
+    """
+    parallelism = settings.PARALLEL_SEGMENTS
+    body_duration = min(duration, profile.max_duration)
+    
+    if thumbnails_dir:
+        Path(thumbnails_dir).mkdir(parents=True, exist_ok=True)
+    
+    if not settings.ASSET_CACHE_ENABLED and parallelism <= 1:
+        total = profile.intro_duration + body_duration + profile.outro_duration
+        run_ffmpeg(
+            build_ffmpeg_command(input_path, output_path, duration, logo_path, profile, thumbnails_dir),
+            fraction_of(total, progress)
+        )
+        return thumbnails_in(thumbnails_dir) if thumbnails_dir else None
+    
+    intro = get_segment("intro", logo_path, profile)
+    outro = get_segment("outro", logo_path, profile)
+    
+    with scratch_dir("render") as work_dir:
+        if parallelism > 1:
+            body_segments = render_body_parallel(
+                input_path, work_dir, duration, logo_path, profile, parallelism, progress
+            )
+        else:
+            body = work_dir / "body.mp4"
+            run_ffmpeg(
+                build_body_command(input_path, str(body), duration, logo_path, profile, thumbnails_dir=thumbnails_dir),
+                fraction_of(body_duration, progress)
+            )
+            body_segments = [str(body)]
+        
+        concat_list = work_dir / "segments.txt"
+        write_concat_list(concat_list, [str(intro), *body_segments, str(outro)])
+        run_ffmpeg(build_concat_command(str(concat_list), output_path))
+    
+    if not thumbnails_dir:
+        return None
+    if parallelism > 1:
+        return render_thumbnails(output_path, thumbnails_dir, body_duration, profile, profile.intro_duration)
+    return thumbnails_in(thumbnails_dir)
+
+
+def split_points(duration: float, parts: int, min_seconds: float) -> List[float]:
+    """Evenly spaced cut times, using fewer parts if pieces would be shorter than min_seconds"""
+    parts = min(parts, int(duration // min_seconds)) if min_seconds > 0 else parts
+    if parts <= 1:
+        return []
+    
+    step = duration / parts
+    return [round(step * i, 3) for i in range(1, parts)]
+
+
+def build_split_command(
+    input_path: str,
+    output_pattern: str,
+    duration: float,
+    points: List[float]
+) -> List[str]:
+    """
+    Build the command that cuts the source into pieces without re-encoding.
+    
+    With stream copy the segment muxer can only cut on keyframes, so each
+    piece starts at the first keyframe at or after its requested time.
+    """
+    return [
+        *base_args(),
+        '-t', str(duration), '-i', input_path,
+        '-map', '0:v:0',
+        '-an',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_times', ",".join(str(p) for p in points),
+        '-reset_timestamps', '1',
+        output_pattern
+    ]
+
+
+def render_body_parallel(
+    input_path: str,
+    work_dir: Path,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile,
+    parallelism: int,
+    progress: Optional[Callable[[float], None]] = None
+) -> List[str]:
+    """
+    Encode the body as keyframe-aligned pieces running concurrently.
+    
+    Each piece is its own ffmpeg process, so a thread pool is enough to keep
+    several cores busy (Celery prefork children cannot start a
+    multiprocessing pool). Encoder threads are divided between the pieces.
+    
+    Returns:
+        Paths of the encoded pieces in playback order
+    """
+    body_duration = min(duration, profile.max_duration)
+    points = split_points(body_duration, parallelism, settings.PARALLEL_MIN_SEGMENT_SECONDS)
+    
+    if points:
+        run_ffmpeg(build_split_command(input_path, str(work_dir / "piece_%03d.mp4"), body_duration, points))
+        pieces = sorted(work_dir.glob("piece_*.mp4"))
+    else:
+        pieces = [Path(input_path)]
+    
+    threads = max(1, (os.cpu_count() or 1) // len(pieces))
+    outputs = [str(work_dir / f"body_{index:03d}.mp4") for index in range(len(pieces))]
+    
+    # Progreso total = suma de lo codificado por cada pieza
+    encoded = [0.0] * len(pieces)
+    lock = threading.Lock()
+    
+    def piece_progress(index: int) -> Optional[Callable[[float], None]]:
+        if progress is None:
+            return None
+        
+        def report(seconds: float) -> None:
+            with lock:
+                encoded[index] = seconds
+                progress(min(sum(encoded) / body_duration, 1.0))
+        return report
+    
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        futures = [
+            pool.submit(
+                run_ffmpeg,
+                build_body_command(
+                    str(piece), output, body_duration, logo_path, profile,
+                    fade_in=(index == 0), threads=threads
+                ),
+                piece_progress(index)
+            )
+            for index, (piece, output) in enumerate(zip(pieces, outputs))
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Sin esto, salir del pool espera a que terminen las demás piezas
+            for future in futures:
+                future.cancel()
+            kill_running()
+            raise
+    
+    return outputs
@@ -0,0 +1,246 @@
+import ctypes
+import ctypes.util
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Set
+
+from app.core.config import settings
+from app.processing.errors import ProcessingError
+from app.processing.profile import ProcessingProfile
+from app.storage.scratch import pid_alive, scratch_root
+
+# ffmpeg processes started by this worker, so a timed-out task can kill them all
+_running: Set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True) if sys.platform.startswith("linux") else None
+PR_SET_PDEATHSIG = 1
+
+# Marker left on scratch space for each running ffmpeg process group:
+# ffmpeg-<worker pid>-<group id>, holding the leader's start time
+GROUP_PREFIX = "ffmpeg-"
+
+
+def _die_with_parent() -> None:
+    """Runs in the child before exec: SIGKILL ffmpeg if the worker child is killed"""
+    _libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+
+
+def _group_marker(process: subprocess.Popen) -> Path:
+    return scratch_root() / f"{GROUP_PREFIX}{os.getpid()}-{process.pid}"
+
+
+def _start_time(pid: int) -> Optional[str]:
+    """Start time of a process in clock ticks since boot (/proc/<pid>/stat field 22)"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # comm (field 2) may contain spaces; the fields after it start at field 3
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def _kill_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _spawn(cmd: List[str], **kwargs) -> subprocess.Popen:
+    """
+    Start ffmpeg in its own process group.
+    
+    preexec_fn can deadlock the forked child when other threads are running
+    (render_body_parallel spawns from a thread pool), so PDEATHSIG is only
+    set from a single-threaded process. Otherwise a marker on scratch space
+    lets kill_orphaned_groups reclaim the group if this worker is killed.
+    """
+    preexec_fn = _die_with_parent if _libc and threading.active_count() == 1 else None
+    process = subprocess.Popen(cmd, start_new_session=True, preexec_fn=preexec_fn, **kwargs)
+    with _running_lock:
+        _running.add(process)
+    _group_marker(process).write_text(_start_time(process.pid) or "")
+    return process
+
+
+def _reap(process: subprocess.Popen) -> None:
+    """Kill a process group that is still running and wait for its leader"""
+    if process.poll() is None:
+        _kill_group(process.pid)
+    process.wait()
+    with _running_lock:
+        _running.discard(process)
+    _group_marker(process).unlink(missing_ok=True)
+
+
+def kill_running() -> int:
+    """
+    Kill every ffmpeg started by this process, including those of other threads.
+    
+    Used when a task hits its soft time limit: the exception only reaches the
+    task thread, while parallel pieces keep encoding in pool threads.
+    
+    Returns:
+        Number of processes killed
+    """
+    with _running_lock:
+        processes = [process for process in _running if process.poll() is None]
+    for process in processes:
+        _kill_group(process.pid)
+    return len(processes)
+
+
+def kill_orphaned_groups() -> int:
+    """
+    Kill ffmpeg process groups left behind by worker processes that no longer exist.
+    
+    Called when a worker child starts, to stop encodes of a sibling killed
+    by a hard time limit or the memory ceiling.
+    
+    Returns:
+        Number of process groups killed
+    """
+    killed = 0
+    for marker in scratch_root().glob(f"{GROUP_PREFIX}*"):
+        owner, _, pgid = marker.name[len(GROUP_PREFIX):].partition("-")
+        if not owner.isdigit() or not pgid.isdigit() or pid_alive(int(owner)):
+            continue
+        # Every ffmpeg leads its own session, so a recycled pid can lead a
+        # sibling's live encode: only kill the leader the marker recorded
+        try:
+            started = marker.read_text().strip()
+        except FileNotFoundError:
+            continue
+        try:
+            if started and _start_time(int(pgid)) == started and os.getpgid(int(pgid)) == int(pgid):
+                _kill_group(int(pgid))
+                killed += 1
+        except ProcessLookupError:
+            pass
+        marker.unlink(missing_ok=True)
+    return killed
+
+
+def run_ffmpeg(cmd: List[str], on_progress: Optional[Callable[[float], None]] = None) -> None:
+    """
+    Run an ffmpeg command.
+    
+    With on_progress, ffmpeg reports through -progress and the callback is
+    called with the seconds of output written so far. If anything interrupts
+    the call (e.g. a Celery time limit), ffmpeg is killed and reaped.
+    
+    Raises:
+        ProcessingError: If ffmpeg exits with an error
+    """
+    if on_progress is not None:
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe
+    with tempfile.TemporaryFile(mode='w+') as stderr:
+        process = _spawn(
+            cmd,
+            stdout=subprocess.PIPE if on_progress else subprocess.DEVNULL,
+            stderr=stderr,
+            text=True
+        )
+        try:
+            if on_progress is not None:
+                for line in process.stdout:
+                    key, _, value = line.strip().partition('=')
+                    if key == 'out_time_us' and value.isdigit():
+                        on_progress(int(value) / 1_000_000)
+            process.wait()
+        finally:
+            _reap(process)
+            if process.stdout:
+                process.stdout.close()
+        
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise ProcessingError(f"ffmpeg failed: {stderr.read().strip()[-500:]}")
+
+
+def fraction_of(total: float, progress: Optional[Callable[[float], None]]) -> Optional[Callable[[float], None]]:
+    """Adapt run_ffmpeg's seconds written to a completed fraction of total"""
+    if progress is None or not total:
+        return None
+    return lambda seconds: progress(min(seconds / total, 1.0))
+
+
+def base_args() -> List[str]:
+    """Common ffmpeg flags: quiet, non-interactive, overwrite output"""
+    return [settings.FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y']
+
+
+def fit_frame_filter(profile: ProcessingProfile) -> str:
+    """Filters that letterbox a frame into the output size"""
+    return (
+        f"scale={profile.width}:{profile.height}:force_original_aspect_ratio=decrease,"
+        f"pad={profile.width}:{profile.height}:(ow-iw)/2:(oh-ih)/2,"
+        f"setsar=1,fps={profile.fps},format={profile.pix_fmt}"
+    )
+
+
+def encoder_args(profile: ProcessingProfile) -> List[str]:
+    """
+    Video encoder flags for a profile.
+    
+    Every segment encoded with the same profile gets identical stream
+    parameters (codec, size, pixel format, timescale) so segments can be
+    joined with a stream-copy concat.
+    """
+    return [
+        '-an',
+        '-c:v', profile.video_codec,
+        '-preset', profile.preset,
+        '-crf', str(profile.crf),
+        '-pix_fmt', profile.pix_fmt,
+        '-video_track_timescale', str(profile.fps * 512),
+    ]
+
+
+def build_segment_command(
+    logo_path: str,
+    output_path: str,
+    duration: float,
+    profile: ProcessingProfile,
+    fade_in: bool = False
+) -> List[str]:
+    """Build the command that renders a still logo segment (intro or outro)"""
+    video_filter = fit_frame_filter(profile)
+    if fade_in:
+        video_filter += f",fade=t=in:st=0:d={profile.fade_duration}"
+    
+    return [
+        *base_args(),
+        '-loop', '1', '-framerate', str(profile.fps), '-t', str(duration), '-i', logo_path,
+        '-vf', video_filter,
+        *encoder_args(profile),
+        output_path
+    ]
+
+
+def build_concat_command(list_path: str, output_path: str) -> List[str]:
+    """Build the command that joins segments listed in an ffconcat file without re-encoding"""
+    return [
+        *base_args(),
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        output_path
+    ]
+
+
+def write_concat_list(list_path: Path, segments: Sequence[str]) -> None:
+    """Write an ffconcat list file with absolute segment paths"""
+    lines = ["ffconcat version 1.0"]
+    for segment in segments:
+        escaped = str(Path(segment).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_path.write_text("\n".join(lines) + "\n")
@@ -0,0 +1,117 @@
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from app.core.config import settings
+from app.processing.ffmpeg_utils import base_args, fraction_of, run_ffmpeg
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+
+MASTER_PLAYLIST = "master.m3u8"
+
+
+@dataclass(frozen=True)
+class Rendition:
+    name: str
+    height: int
+    video_bitrate: str
+    maxrate: str
+    bufsize: str
+
+
+HLS_LADDER = (
+    Rendition("360p", 360, "800k", "856k", "1200k"),
+    Rendition("480p", 480, "1400k", "1498k", "2100k"),
+    Rendition("720p", 720, "2800k", "2996k", "4200k"),
+)
+
+
+def ladder_for(profile: ProcessingProfile, ladder: Sequence[Rendition] = HLS_LADDER) -> List[Rendition]:
+    """Renditions that do not upscale beyond the processed output"""
+    return [r for r in ladder if r.height <= profile.height]
+
+
+def build_hls_command(
+    input_path: str,
+    output_dir: str,
+    renditions: Sequence[Rendition],
+    profile: ProcessingProfile = DEFAULT_PROFILE
+) -> List[str]:
+    """
+    Build the command that encodes every rendition in one pass.
+    
+    Keyframes are forced on segment boundaries in all renditions so players
+    can switch bitrate at any segment.
+    """
+    count = len(renditions)
+    gop = str(profile.fps * settings.HLS_SEGMENT_SECONDS)
+    
+    labels = "".join(f"[v{i}]" for i in range(count))
+    scales = [f"[v{i}]scale=-2:{r.height}[v{i}out]" for i, r in enumerate(renditions)]
+    graph = ";".join([f"[0:v]split={count}{labels}", *scales])
+    
+    stream_args: List[str] = []
+    for i, r in enumerate(renditions):
+        stream_args += [
+            '-map', f'[v{i}out]',
+            f'-c:v:{i}', profile.video_codec,
+            f'-b:v:{i}', r.video_bitrate,
+            f'-maxrate:v:{i}', r.maxrate,
+            f'-bufsize:v:{i}', r.bufsize,
+        ]
+    
+    var_stream_map = " ".join(f"v:{i},name:{r.name}" for i, r in enumerate(renditions))
+    
+    return [
+        *base_args(),
+        '-i', input_path,
+        '-filter_complex', graph,
+        *stream_args,
+        '-an',
+        '-preset', profile.preset,
+        '-pix_fmt', profile.pix_fmt,
+        '-g', gop, '-keyint_min', gop, '-sc_threshold', '0',
+        '-f', 'hls',
+        '-hls_time', str(settings.HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', f'{output_dir}/%v/segment_%03d.ts',
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', var_stream_map,
+        f'{output_dir}/%v/index.m3u8'
+    ]
+
+
+def render_hls(
+    input_path: str,
+    output_dir: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    progress: Optional[Callable[[float], None]] = None,
+    duration: Optional[float] = None
+) -> str:
+    """
+    Produce the HLS ladder for a processed video.
+    
+    The ladder is written to a hidden sibling folder and renamed into place
+    when complete, so nginx never serves a partial playlist. progress needs
+    the input duration to report the completed fraction.
+    
+    Returns:
+        Path of the master playlist
+    """
+    final_dir = Path(output_dir)
+    work_dir = final_dir.with_name(f".{final_dir.name}.tmp")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+    
+    try:
+        run_ffmpeg(
+            build_hls_command(input_path, str(work_dir), ladder_for(profile), profile),
+            fraction_of(duration, progress)
+        )
+        shutil.rmtree(final_dir, ignore_errors=True)
+        work_dir.rename(final_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    return str(final_dir / MASTER_PLAYLIST)
@@ -0,0 +1,88 @@
+from moviepy import ImageClip, VideoFileClip, CompositeVideoClip, vfx
+from proglog import ProgressBarLogger
+
+from typing import Callable, Optional
+
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+from app.processing.thumbnails import Thumbnails, render_thumbnails
+
+
+class _ProgressLogger(ProgressBarLogger):
+    """Forward MoviePy's frame progress bar as a completed fraction"""
+    
+    def __init__(self, progress: Callable[[float], None]):
+        super().__init__()
+        self.progress = progress
+    
+    def bars_callback(self, bar, attr, value, old_value=None):
+        total = self.bars[bar].get('total')
+        if attr == 'index' and total:
+            self.progress(min(value / total, 1.0))
+
+
+def render_video(
+    input_path: str,
+    output_path: str,
+    duration: float,
+    logo_path: str,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    thumbnails_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None
+) -> Optional[Thumbnails]:
+    """
+    Render the final video with MoviePy.
+    
+    Kept as a reference implementation; every frame goes through NumPy so it
+    is much slower than the ffmpeg engine. Thumbnails need an extra ffmpeg pass.
+    """
+    videoclip = VideoFileClip(input_path)
+    
+    # Determine durations
+    video_duration = min(duration, profile.max_duration)
+    
+    # Create clips
+    intro_logo = (ImageClip(logo_path)
+          .with_duration(profile.intro_duration)
+          .with_position(("center", "center")))
+    
+    # Trim video if needed and add fade in
+    if duration > profile.max_duration:
+        videoclip = videoclip.subclipped(0, profile.max_duration)
+    
+    videoclip = (videoclip
+          .with_effects([vfx.CrossFadeIn(profile.fade_duration)])
+          .resized((profile.width, profile.height)))
+    
+    # Watermark (positioned at 50% from top, centered horizontally)
+    watermark = (ImageClip(logo_path)
+         .with_duration(video_duration)
+         .resized(height=profile.watermark_height)
+         .with_position(("center", 0.5), relative=True)
+         .with_effects([vfx.CrossFadeIn(profile.fade_duration)])
+         .with_opacity(profile.watermark_opacity)
+         .with_start(profile.intro_duration))
+    
+    # Outro logo
+    outro_logo = (ImageClip(logo_path)
+          .with_duration(profile.outro_duration)
+          .with_position(("center", "center"))
+          .with_effects([vfx.CrossFadeIn(profile.fade_duration)])
+          .with_start(profile.intro_duration + video_duration))
+    
+    # Composite all clips and remove audio
+    final_clip = CompositeVideoClip([
+        intro_logo,
+        videoclip.with_start(profile.intro_duration),
+        watermark,
+        outro_logo
+    ]).with_audio(None)
+    
+    try:
+        final_clip.write_videofile(output_path, logger=_ProgressLogger(progress) if progress else "bar")
+    finally:
+        videoclip.close()
+        final_clip.close()
+    
+    if thumbnails_dir:
+        return render_thumbnails(output_path, thumbnails_dir, video_duration, profile, profile.intro_duration)
+    return None
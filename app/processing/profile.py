@@ -0,0 +1,35 @@
+import hashlib
+from dataclasses import dataclass, astuple
+
+
+@dataclass(frozen=True)
+class ProcessingProfile:
+    """
+    Output settings shared by all processing engines.
+    
+    Defaults reproduce the original MoviePy composition: 2.5s logo intro,
+    body trimmed to 30s and scaled to 1280x720 with a 2s fade in, logo
+    watermark (100px high, 50% opacity) and a 2.5s logo outro, no audio.
+    """
+    name: str = "720p"
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    max_duration: float = 30.0
+    intro_duration: float = 2.5
+    outro_duration: float = 2.5
+    fade_duration: float = 2.0
+    watermark_height: int = 100
+    watermark_opacity: float = 0.5
+    video_codec: str = "libx264"
+    preset: str = "veryfast"
+    crf: int = 23
+    pix_fmt: str = "yuv420p"
+    
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of every setting; changes whenever the output would change"""
+        return hashlib.sha1(repr(astuple(self)).encode()).hexdigest()[:10]
+
+
+DEFAULT_PROFILE = ProcessingProfile()
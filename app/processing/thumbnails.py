@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from app.processing.ffmpeg_utils import base_args, run_ffmpeg
+from app.processing.profile import ProcessingProfile, DEFAULT_PROFILE
+
+POSTER_NAME = "poster.jpg"
+PREVIEW_NAME = "preview.webp"
+SPRITE_NAME = "sprite.jpg"
+
+PREVIEW_SECONDS = 3.0
+PREVIEW_FPS = 8
+PREVIEW_WIDTH = 320
+SPRITE_COLUMNS = 5
+SPRITE_ROWS = 5
+SPRITE_TILE_WIDTH = 160
+
+
+@dataclass(frozen=True)
+class Thumbnails:
+    poster: str
+    preview: str
+    sprite: str
+
+
+def poster_time(body_duration: float, profile: ProcessingProfile = DEFAULT_PROFILE) -> float:
+    """Pick a frame just after the fade in, or mid-body for very short clips"""
+    return round(min(profile.fade_duration + 1.0, body_duration / 2), 3)
+
+
+def build_thumbnail_graph(
+    input_label: str,
+    body_duration: float,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    start_offset: float = 0.0
+) -> str:
+    """
+    Build the graph branches that derive the poster, preview and sprite sheet.
+    
+    input_label is a stream of processed body frames; start_offset is where
+    the body starts within that stream (0 when fed from the body encode).
+    Produces [poster], [preview] and [sprite].
+    """
+    poster_at = start_offset + poster_time(body_duration, profile)
+    body_end = start_offset + body_duration
+    tiles = SPRITE_COLUMNS * SPRITE_ROWS
+    
+    return ";".join([
+        f"[{input_label}]split=3[thumb_poster][thumb_preview][thumb_sprite]",
+        f"[thumb_poster]trim=start={poster_at},setpts=PTS-STARTPTS[poster]",
+        (
+            f"[thumb_preview]trim=start={poster_at}:duration={PREVIEW_SECONDS},setpts=PTS-STARTPTS,"
+            f"fps={PREVIEW_FPS},scale={PREVIEW_WIDTH}:-2[preview]"
+        ),
+        (
+            f"[thumb_sprite]trim=start={start_offset}:end={body_end},setpts=PTS-STARTPTS,"
+            f"fps={tiles}/{body_duration},scale={SPRITE_TILE_WIDTH}:-2,"
+            f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}[sprite]"
+        ),
+    ])
+
+
+def thumbnail_output_args(output_dir: str) -> List[str]:
+    """Output options for the three thumbnail streams of build_thumbnail_graph"""
+    folder = Path(output_dir)
+    return [
+        '-map', '[poster]', '-frames:v', '1', '-q:v', '3', str(folder / POSTER_NAME),
+        '-map', '[preview]', '-c:v', 'libwebp_anim', '-quality', '60', '-loop', '0', str(folder / PREVIEW_NAME),
+        '-map', '[sprite]', '-frames:v', '1', '-q:v', '4', str(folder / SPRITE_NAME),
+    ]
+
+
+def thumbnails_in(output_dir: str) -> Thumbnails:
+    """Paths of the thumbnails written to output_dir"""
+    folder = Path(output_dir)
+    return Thumbnails(
+        poster=str(folder / POSTER_NAME),
+        preview=str(folder / PREVIEW_NAME),
+        sprite=str(folder / SPRITE_NAME)
+    )
+
+
+def render_thumbnails(
+    video_path: str,
+    output_dir: str,
+    body_duration: float,
+    profile: ProcessingProfile = DEFAULT_PROFILE,
+    start_offset: float = 0.0
+) -> Thumbnails:
+    """
+    Produce thumbnails in a separate pass over an already rendered video.
+    
+    Used when the body was not encoded in a single process (MoviePy engine,
+    parallel segments); otherwise thumbnails come from the body encode itself.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    run_ffmpeg([
+        *base_args(),
+        '-i', video_path,
+        '-filter_complex', build_thumbnail_graph("0:v", body_duration, profile, start_offset),
+        *thumbnail_output_args(output_dir)
+    ])
+    return thumbnails_in(output_dir)
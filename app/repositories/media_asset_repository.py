@@ -0,0 +1,32 @@
+from typing import Optional
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.media_asset import MediaAsset
+from app.models.video import Video
+
+
+class MediaAssetRepository:
+    
+    async def get(self, db: AsyncSession, content_hash: str, profile_version: str) -> Optional[MediaAsset]:
+        """Get the processed outputs of a content hash for a processing version"""
+        result = await db.execute(
+            select(MediaAsset).where(and_(
+                MediaAsset.content_hash == content_hash,
+                MediaAsset.profile_version == profile_version
+            ))
+        )
+        return result.scalar_one_or_none()
+    
+    def link(self, video: Video, asset: MediaAsset) -> None:
+        """Point a video at cached outputs and mark it processed"""
+        video.file_path = asset.file_path
+        video.hls_path = asset.hls_path
+        video.poster_path = asset.poster_path
+        video.preview_path = asset.preview_path
+        video.sprite_path = asset.sprite_path
+        video.duration_seconds = int(asset.duration)
+        video.status = "processed"
+
+
+# Singleton instance
+media_asset_repository = MediaAssetRepository()
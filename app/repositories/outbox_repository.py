@@ -0,0 +1,40 @@
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.outbox_task import OutboxTask
+
+
+class OutboxRepository:
+    
+    async def create(
+        self,
+        db: AsyncSession,
+        task_name: str,
+        args: list,
+        options: Optional[dict] = None
+    ) -> OutboxTask:
+        """Add a pending task to the outbox in the current transaction"""
+        entry = OutboxTask(
+            task_name=task_name,
+            args=args,
+            options=options or {},
+            status="pending",
+            attempts=0
+        )
+        db.add(entry)
+        await db.flush()
+        return entry
+    
+    async def get_pending(self, db: AsyncSession, task_ids: List[UUID]) -> List[OutboxTask]:
+        """Lock the given entries that are still pending, skipping rows locked elsewhere"""
+        result = await db.execute(
+            select(OutboxTask)
+            .where(and_(OutboxTask.id.in_(task_ids), OutboxTask.status == "pending"))
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+
+# Singleton instance
+outbox_repository = OutboxRepository()
@@ -0,0 +1,60 @@
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.upload_session import UploadSession
+
+
+class UploadSessionRepository:
+    
+    async def create(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        title: str,
+        original_filename: str,
+        total_size: int
+    ) -> UploadSession:
+        """Create a new resumable upload session"""
+        upload = UploadSession(
+            user_id=user_id,
+            title=title,
+            original_filename=original_filename,
+            total_size=total_size,
+            received_bytes=0
+        )
+        db.add(upload)
+        await db.flush()
+        await db.refresh(upload)
+        return upload
+    
+    async def get_by_id(
+        self,
+        db: AsyncSession,
+        upload_id: UUID,
+        for_update: bool = False
+    ) -> Optional[UploadSession]:
+        """Get upload session by ID, optionally locking the row"""
+        query = select(UploadSession).where(UploadSession.id == upload_id)
+        if for_update:
+            query = query.with_for_update()
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
+    
+    async def advance(self, db: AsyncSession, upload_id: UUID, offset: int, received_bytes: int) -> bool:
+        """Move the offset forward only if no other chunk moved it since it was read"""
+        result = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.received_bytes == offset)
+            .values(received_bytes=received_bytes)
+        )
+        return result.rowcount == 1
+    
+    async def delete(self, db: AsyncSession, upload_id: UUID) -> None:
+        """Delete an upload session"""
+        await db.execute(delete(UploadSession).where(UploadSession.id == upload_id))
+        await db.flush()
+
+
+# Singleton instance
+upload_session_repository = UploadSessionRepository()
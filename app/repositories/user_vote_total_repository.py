@@ -0,0 +1,54 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import select, desc
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+from app.models.user_vote_total import UserVoteTotal
+
+
+class UserVoteTotalRepository:
+    
+    async def add_video(self, db: AsyncSession, user: User, votes: int = 0) -> None:
+        """Count a newly published video (and any votes it has) in its owner's total"""
+        statement = insert(UserVoteTotal).values(
+            user_id=user.id,
+            city=user.city,
+            total=votes,
+            public_videos=1
+        )
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[UserVoteTotal.user_id],
+                set_={
+                    "city": statement.excluded.city,
+                    "total": UserVoteTotal.total + statement.excluded.total,
+                    "public_videos": UserVoteTotal.public_videos + 1
+                }
+            )
+        )
+    
+    async def get_rankings(
+        self,
+        db: AsyncSession,
+        city: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Tuple[UserVoteTotal, User]]:
+        """Players ranked by total votes, read in index order"""
+        query = (
+            select(UserVoteTotal, User)
+            .join(User, User.id == UserVoteTotal.user_id)
+            .where(UserVoteTotal.public_videos > 0)
+        )
+        
+        if city:
+            query = query.where(UserVoteTotal.city == city)
+        
+        query = query.order_by(desc(UserVoteTotal.total), UserVoteTotal.user_id).limit(limit).offset(offset)
+        
+        result = await db.execute(query)
+        return [tuple(row) for row in result.all()]
+
+
+# Singleton instance
+user_vote_total_repository = UserVoteTotalRepository()
@@ -1,10 +1,11 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
-from sqlalchemy import select, delete, and_, desc
+from sqlalchemy import select, delete, update, and_, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from app.models.video import Video
 from app.models.user import User
+from app.models.vote_counter_shard import VoteCounterShard
 
 
 class VideoRepository:
@@ -18,7 +19,8 @@ class VideoRepository:
         file_path: str,
         duration_seconds: int,
         file_size_bytes: int,
-        status: str = "processed"
+        status: str = "processed",
+        content_hash: Optional[str] = None
     ) -> Video:
         """Create a new video record"""
         video = Video(
@@ -28,6 +30,7 @@ class VideoRepository:
             file_path=file_path,
             duration_seconds=duration_seconds,
             file_size_bytes=file_size_bytes,
+            content_hash=content_hash,
             status=status,
             is_public=False,
             votes_count=0
@@ -78,6 +81,22 @@ class VideoRepository:
         await db.flush()
     
     
+    async def mark_public(self, db: AsyncSession, video_id: UUID) -> Optional[int]:
+        """
+        Make a video public if it is not already.
+        
+        Returns:
+            The video's vote count if this call published it, None if it
+            already was public (e.g. a concurrent request won)
+        """
+        result = await db.execute(
+            update(Video)
+            .where(Video.id == video_id, Video.is_public == False)
+            .values(is_public=True)
+            .returning(Video.votes_count)
+        )
+        return result.scalar_one_or_none()
+    
     async def get_rankings(
         self,
         db: AsyncSession,
@@ -100,6 +119,27 @@ class VideoRepository:
         
         result = await db.execute(query)
         return list(result.scalars().all())
+    
+    async def get_ranking_scores(self, db: AsyncSession) -> List[Tuple[UUID, int, str, str, str]]:
+        """Votes (flushed and pending) of every ranked video with its owner's name and city"""
+        pending = (
+            select(VoteCounterShard.video_id, func.sum(VoteCounterShard.delta).label("delta"))
+            .group_by(VoteCounterShard.video_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                Video.id,
+                Video.votes_count + func.coalesce(pending.c.delta, 0),
+                User.first_name,
+                User.last_name,
+                User.city
+            )
+            .join(User, User.id == Video.user_id)
+            .outerjoin(pending, pending.c.video_id == Video.id)
+            .where(Video.is_public == True, Video.status == 'processed')
+        )
+        return [tuple(row) for row in result.all()]
 
 
 # Singleton instance
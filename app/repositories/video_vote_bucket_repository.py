@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import select, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core.config import settings
+from app.models.user import User
+from app.models.video import Video
+from app.models.video_vote_bucket import VideoVoteBucket
+
+# Hourly buckets summed by each rolling window, current hour included
+WINDOW_HOURS = {
+    "daily": 24,
+    "weekly": 7 * 24,
+}
+
+RANKING_WINDOWS = (*WINDOW_HOURS, "season")
+
+
+class VideoVoteBucketRepository:
+    
+    def window_start(self, window: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        """First hour counted by a ranking window (None for a season with no start)"""
+        if window == "season":
+            return settings.RANKING_SEASON_START
+        
+        current_hour = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        return current_hour - timedelta(hours=WINDOW_HOURS[window] - 1)
+    
+    async def get_rankings(
+        self,
+        db: AsyncSession,
+        since: Optional[datetime],
+        city: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Tuple[Video, int]]:
+        """
+        Public videos ranked by the votes they received from `since` on.
+        
+        Only the buckets of the window are read (one row per video and hour,
+        through ix_video_vote_buckets_hour), so the cost depends on the
+        length of the window and not on the size of the votes table.
+        """
+        windowed = select(
+            VideoVoteBucket.video_id,
+            func.sum(VideoVoteBucket.votes).label("votes")
+        )
+        if since is not None:
+            windowed = windowed.where(VideoVoteBucket.hour >= since)
+        windowed = windowed.group_by(VideoVoteBucket.video_id).subquery()
+        
+        query = (
+            select(Video, windowed.c.votes)
+            .options(joinedload(Video.user))
+            .join(windowed, windowed.c.video_id == Video.id)
+            .where(Video.is_public == True, Video.status == 'processed', windowed.c.votes > 0)
+        )
+        
+        if city:
+            query = query.join(User).where(User.city == city)
+        
+        query = query.order_by(desc(windowed.c.votes), Video.id).limit(limit).offset(offset)
+        
+        result = await db.execute(query)
+        return [(video, votes) for video, votes in result.all()]
+
+
+# Singleton instance
+video_vote_bucket_repository = VideoVoteBucketRepository()
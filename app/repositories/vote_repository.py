@@ -1,8 +1,15 @@
-from typing import Optional
+import random
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
 from uuid import UUID
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func, literal, DateTime
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.video import Video
 from app.models.vote import Vote
+from app.models.vote_counter_shard import VoteCounterShard
 
 
 class VoteRepository:
@@ -33,8 +40,82 @@ class VoteRepository:
             )
         )
         return result.scalar_one_or_none()
+    
+    async def cast_vote(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        video_id: UUID
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Register a vote and count it in a single statement.
+        
+        The existence check, the insert (ON CONFLICT DO NOTHING on
+        unique_user_video_vote) and the counter increment run as one CTE.
+        The increment goes to a random vote_counter_shards row instead of
+        the video, so concurrent voters of a viral video don't serialize on
+        one row lock; flush_vote_counters adds the shards to votes_count
+        and to the video_vote_buckets of the hour the vote was cast.
+        
+        Returns:
+            Whether the video exists and is public, and the vote count
+            including pending shards (None if the user had already voted)
+        """
+        voted_at = datetime.utcnow()
+        target = (
+            select(Video.id)
+            .where(Video.id == video_id, Video.is_public.is_(True))
+            .cte("target")
+        )
+        inserted = (
+            insert(Vote)
+            .from_select(
+                ["id", "user_id", "video_id", "voted_at"],
+                select(
+                    literal(uuid.uuid4(), PG_UUID(as_uuid=True)),
+                    literal(user_id, PG_UUID(as_uuid=True)),
+                    target.c.id,
+                    literal(voted_at, DateTime)
+                )
+            )
+            .on_conflict_do_nothing(constraint="unique_user_video_vote")
+            .returning(Vote.video_id)
+            .cte("inserted")
+        )
+        shard = insert(VoteCounterShard).from_select(
+            ["video_id", "shard", "hour", "delta"],
+            select(
+                inserted.c.video_id,
+                literal(random.randrange(settings.VOTE_COUNTER_SHARDS)),
+                literal(voted_at.replace(minute=0, second=0, microsecond=0), DateTime),
+                literal(1)
+            )
+        )
+        bumped = (
+            shard.on_conflict_do_update(
+                index_elements=[VoteCounterShard.video_id, VoteCounterShard.shard, VoteCounterShard.hour],
+                set_={"delta": VoteCounterShard.delta + 1}
+            )
+            .returning(VoteCounterShard.video_id)
+            .cte("bumped")
+        )
+        # The statement does not see its own increment, hence the + 1
+        pending = (
+            select(func.coalesce(func.sum(VoteCounterShard.delta), 0))
+            .where(VoteCounterShard.video_id == video_id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                select(func.count()).select_from(target).scalar_subquery(),
+                select(Video.votes_count + pending + 1)
+                .where(Video.id == bumped.c.video_id)
+                .scalar_subquery()
+            )
+        )
+        found, votes = result.one()
+        return bool(found), votes
 
 
 # Singleton instance
 vote_repository = VoteRepository()
-
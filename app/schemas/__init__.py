@@ -6,6 +6,7 @@ from app.schemas.video import (
     VideoDeleteResponse
 )
 from app.schemas.vote import VoteRequest, VoteResponse, RankingItem
+from app.schemas.upload_session import UploadSessionCreateRequest, UploadSessionResponse
 
 __all__ = [
     "UserSignupRequest",
@@ -18,5 +19,7 @@ __all__ = [
     "VoteRequest",
     "VoteResponse",
     "RankingItem",
+    "UploadSessionCreateRequest",
+    "UploadSessionResponse",
 ]
 
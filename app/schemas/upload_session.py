@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreateRequest(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    filename: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0, description="Total file size in bytes")
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    offset: int
+    total_size: int
+    
+    class Config:
+        from_attributes = True
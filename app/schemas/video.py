@@ -23,6 +23,7 @@ class VideoDetail(BaseModel):
     video_id: str
     title: str
     status: str
+    failure_reason: Optional[str] = None
     uploaded_at: datetime
     file_path: str
     votes: int
@@ -44,6 +45,10 @@ class PublicVideoItem(BaseModel):
     video_id: str
     title: str
     processed_url: str
+    hls_url: Optional[str] = None
+    poster_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    sprite_url: Optional[str] = None
     username: str
     city: str
     votes: int
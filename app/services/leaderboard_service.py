@@ -0,0 +1,180 @@
+import json
+import logging
+from typing import List, Optional
+from uuid import UUID
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.video import Video
+from app.repositories.video_repository import video_repository
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "leaderboard:global"
+CITY_KEY = "leaderboard:city:"
+PLAYERS_KEY = "leaderboard:players"  # video id -> {"username", "city"}
+READY_KEY = "leaderboard:ready"  # expires, so the boards are rebuilt from Postgres periodically
+REBUILD_KEY = "leaderboard:rebuild:"  # boards are built under this prefix, then renamed into place
+REBUILD_LOCK_KEY = "leaderboard:rebuilding"
+REBUILD_LOCK_SECONDS = 60
+
+# Scores are absolute vote counts; GT keeps late, smaller counts from going backwards
+RECORD_VOTE_SCRIPT = """
+local player = redis.call('HGET', KEYS[1], ARGV[1])
+if not player then return 0 end
+redis.call('ZADD', KEYS[2], 'GT', ARGV[2], ARGV[1])
+redis.call('ZADD', ARGV[3] .. cjson.decode(player)['city'], 'GT', ARGV[2], ARGV[1])
+return 1
+"""
+
+# One round trip per page: ranked ids with their scores and player info
+PAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then return false end
+local ranked = redis.call('ZREVRANGE', KEYS[1], ARGV[1], ARGV[2], 'WITHSCORES')
+local page = {}
+for i = 1, #ranked, 2 do
+    page[#page + 1] = redis.call('HGET', KEYS[2], ranked[i])
+    page[#page + 1] = ranked[i + 1]
+end
+return page
+"""
+
+
+class LeaderboardService:
+    """
+    Vote rankings in Redis sorted sets: one global board plus one per city.
+    
+    Members are video ids scored by their votes, with the player name and
+    city kept in a hash. Boards are rebuilt from Postgres when missing and
+    every caller falls back to Postgres while Redis is unavailable.
+    """
+    
+    def __init__(self):
+        self._client: Optional[aioredis.Redis] = None
+    
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            self._client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+    
+    def _player(self, user: User) -> str:
+        return json.dumps({"username": f"{user.first_name} {user.last_name}", "city": user.city})
+    
+    async def add(self, video: Video, user: User, votes: Optional[int] = None) -> None:
+        """Put a newly published video on the global board and its city's"""
+        score = video.votes_count if votes is None else votes
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(PLAYERS_KEY, str(video.id), self._player(user))
+            pipe.zadd(GLOBAL_KEY, {str(video.id): score}, gt=True)
+            pipe.zadd(CITY_KEY + user.city, {str(video.id): score}, gt=True)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Could not add video %s to the leaderboards: %s", video.id, e)
+    
+    async def record_vote(self, db: AsyncSession, video_id: str, votes: int) -> None:
+        """
+        Raise a video's score to its new vote count on both of its boards.
+        
+        A video missing from the boards (e.g. published while they were
+        being rebuilt) is added back from its database row.
+        """
+        try:
+            recorded = await self.client.eval(
+                RECORD_VOTE_SCRIPT, 2, PLAYERS_KEY, GLOBAL_KEY, str(video_id), votes, CITY_KEY
+            )
+        except redis.RedisError as e:
+            logger.warning("Could not record vote for video %s on the leaderboards: %s", video_id, e)
+            return
+        
+        if not recorded:
+            video = await video_repository.get_by_id(db, UUID(str(video_id)))
+            if video is not None and video.is_public and video.status == 'processed':
+                await self.add(video, video.user, votes)
+    
+    async def rebuild(self, db: AsyncSession) -> int:
+        """
+        Replace every board with the current counts from Postgres.
+        
+        The boards are written under REBUILD_KEY and renamed over the live
+        ones in one transaction, so readers never see them half built. The
+        ready flag expires after LEADERBOARD_REBUILD_SECONDS, bounding how
+        long anything the snapshot missed stays off the boards.
+        
+        Returns:
+            Number of ranked videos
+        """
+        entries = await video_repository.get_ranking_scores(db)
+        
+        boards = {}
+        for video_id, votes, first_name, last_name, city in entries:
+            player = json.dumps({"username": f"{first_name} {last_name}", "city": city})
+            boards.setdefault(PLAYERS_KEY, {})[str(video_id)] = player
+            boards.setdefault(GLOBAL_KEY, {})[str(video_id)] = votes
+            boards.setdefault(CITY_KEY + city, {})[str(video_id)] = votes
+        
+        stale = [key async for key in self.client.scan_iter(match=f"{CITY_KEY}*") if key not in boards]
+        stale += [key for key in (GLOBAL_KEY, PLAYERS_KEY) if key not in boards]
+        
+        pipe = self.client.pipeline(transaction=False)
+        if boards:
+            pipe.delete(*(REBUILD_KEY + key for key in boards))
+        for key, members in boards.items():
+            if key == PLAYERS_KEY:
+                pipe.hset(REBUILD_KEY + key, mapping=members)
+            else:
+                pipe.zadd(REBUILD_KEY + key, members)
+        await pipe.execute()
+        
+        pipe = self.client.pipeline(transaction=True)
+        if stale:
+            pipe.delete(*stale)
+        for key in boards:
+            pipe.rename(REBUILD_KEY + key, key)
+        pipe.set(READY_KEY, 1, ex=settings.LEADERBOARD_REBUILD_SECONDS)
+        await pipe.execute()
+        
+        return len(entries)
+    
+    async def page(
+        self,
+        db: AsyncSession,
+        city: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Optional[List[dict]]:
+        """
+        A page of the global or city ranking, highest votes first.
+        
+        Builds the boards on first use; only one request rebuilds while the
+        others are served from Postgres. Returns None when the caller should
+        query Postgres instead.
+        """
+        key = CITY_KEY + city if city else GLOBAL_KEY
+        try:
+            page = await self.client.eval(PAGE_SCRIPT, 3, key, PLAYERS_KEY, READY_KEY, offset, offset + limit - 1)
+            if page is None:
+                if not await self.client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_SECONDS):
+                    return None
+                try:
+                    await self.rebuild(db)
+                finally:
+                    await self.client.delete(REBUILD_LOCK_KEY)
+                page = await self.client.eval(PAGE_SCRIPT, 3, key, PLAYERS_KEY, READY_KEY, offset, offset + limit - 1)
+        except redis.RedisError as e:
+            logger.warning("Leaderboard unavailable, ranking from Postgres: %s", e)
+            return None
+        
+        return [
+            {**json.loads(player), "votes": int(float(score))}
+            for player, score in zip(page[::2], page[1::2])
+        ]
+
+
+# Singleton instance
+leaderboard_service = LeaderboardService()
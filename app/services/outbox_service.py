@@ -0,0 +1,60 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.celery_app import celery_app
+from app.models.outbox_task import OutboxTask
+from app.repositories.outbox_repository import outbox_repository
+
+logger = logging.getLogger(__name__)
+
+
+def publish(entry: OutboxTask) -> bool:
+    """
+    Send an outbox entry to the broker and record the outcome on the row.
+    
+    Failures are kept as pending so the periodic sweeper retries them.
+    The caller is responsible for committing the row changes.
+    """
+    entry.attempts += 1
+    try:
+        celery_app.send_task(entry.task_name, args=entry.args, **(entry.options or {}))
+    except Exception as e:
+        entry.last_error = str(e)[:500]
+        logger.warning("Could not publish outbox task %s: %s", entry.id, e)
+        return False
+    
+    entry.status = "dispatched"
+    entry.dispatched_at = datetime.utcnow()
+    entry.last_error = None
+    return True
+
+
+class OutboxService:
+    
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        task_name: str,
+        args: list,
+        options: Optional[dict] = None
+    ) -> OutboxTask:
+        """Record a task in the same transaction as the data it depends on"""
+        return await outbox_repository.create(db, task_name, args, options)
+    
+    async def dispatch(self, db: AsyncSession, entries: List[OutboxTask]) -> int:
+        """
+        Publish outbox entries. Must be called after their transaction committed.
+        
+        Returns:
+            Number of entries sent to the broker
+        """
+        pending = await outbox_repository.get_pending(db, [e.id for e in entries])
+        sent = sum(publish(entry) for entry in pending)
+        await db.commit()
+        return sent
+
+
+# Singleton instance
+outbox_service = OutboxService()
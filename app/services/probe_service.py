@@ -0,0 +1,183 @@
+import asyncio
+import json
+import subprocess
+from typing import BinaryIO, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.exceptions import ValidationException
+from app.utils.mp4_header import read_mp4_metadata
+
+
+class ProbeService:
+    """
+    Video metadata probing with ffprobe, shared by the API and the Celery worker.
+    
+    MP4/MOV files are read in-process from their moov header; ffprobe is only
+    started for containers the header parser cannot handle. The async path runs
+    ffprobe with asyncio subprocesses so the event loop is never blocked,
+    limits how many probes run at once and kills the child process on timeout
+    or cancellation.
+    """
+    
+    def __init__(self):
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.PROBE_CONCURRENCY)
+        return self._semaphore
+    
+    def build_command(self, file_path: str) -> List[str]:
+        return [
+            settings.FFPROBE_BINARY,
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            file_path
+        ]
+    
+    def parse(self, output: str) -> Dict:
+        """
+        Extract and validate metadata from ffprobe JSON output.
+        
+        Returns metadata dict with duration, width, height, codec.
+        Raises ValidationException if video is invalid.
+        """
+        try:
+            metadata = json.loads(output)
+        except json.JSONDecodeError:
+            raise ValidationException("Unable to parse video metadata")
+        
+        # Find video stream
+        video_stream = next(
+            (s for s in metadata.get('streams', []) if s.get('codec_type') == 'video'),
+            None
+        )
+        
+        if not video_stream:
+            raise ValidationException("No video stream found in file")
+        
+        return self.validate({
+            'duration': float(metadata.get('format', {}).get('duration', 0)),
+            'width': int(video_stream.get('width', 0)),
+            'height': int(video_stream.get('height', 0)),
+            'codec': video_stream.get('codec_name', 'unknown')
+        })
+    
+    def validate(self, metadata: Dict) -> Dict:
+        """Check duration and resolution requirements"""
+        duration = metadata['duration']
+        height = metadata['height']
+        
+        # Validate duration (20-60 seconds as per requirements)
+        if duration < 20 or duration > 60:
+            raise ValidationException(
+                f"Video duration must be between 20 and 60 seconds (current: {duration:.1f}s)"
+            )
+        
+        # Validate resolution (minimum 1080p as per requirements)
+        if height < 1080:
+            raise ValidationException(
+                f"Video resolution must be at least 1080p (current: {height}p)"
+            )
+        
+        return metadata
+    
+    def read_header(self, file_path: str) -> Optional[Dict]:
+        """Metadata from the container header, or None if ffprobe is needed"""
+        try:
+            with open(file_path, 'rb') as f:
+                return read_mp4_metadata(f)
+        except OSError:
+            return None
+    
+    def check_upload(self, file: BinaryIO) -> Optional[Dict]:
+        """
+        Validate an upload from its container header before it is stored.
+        
+        Returns None when the header cannot be parsed; the worker will then
+        run the full ffprobe validation.
+        """
+        metadata = read_mp4_metadata(file)
+        if metadata is None:
+            return None
+        return self.validate(metadata)
+    
+    def probe_sync(self, file_path: str) -> Dict:
+        """Blocking probe for Celery workers"""
+        metadata = self.read_header(file_path)
+        if metadata is not None:
+            return self.validate(metadata)
+        
+        try:
+            result = subprocess.run(
+                self.build_command(file_path),
+                capture_output=True,
+                text=True,
+                timeout=settings.PROBE_TIMEOUT_SECONDS
+            )
+        except subprocess.TimeoutExpired:
+            raise ValidationException("Video validation timeout")
+        except OSError as e:
+            raise ValidationException(f"Video validation error: {str(e)}")
+        
+        if result.returncode != 0:
+            raise ValidationException("Unable to process video file")
+        
+        return self.parse(result.stdout)
+    
+    async def probe(self, file_path: str) -> Dict:
+        """Non-blocking probe for FastAPI handlers"""
+        # Leer el header del contenedor toma microsegundos, no vale la pena un hilo
+        metadata = self.read_header(file_path)
+        if metadata is not None:
+            return self.validate(metadata)
+        
+        async with self.semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self.build_command(file_path),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+            except OSError as e:
+                raise ValidationException(f"Video validation error: {str(e)}")
+            
+            try:
+                stdout, _ = await asyncio.wait_for(
+                    process.communicate(),
+                    timeout=settings.PROBE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise ValidationException("Video validation timeout")
+            except asyncio.CancelledError:
+                await self._kill(process)
+                raise
+        
+        if process.returncode != 0:
+            raise ValidationException("Unable to process video file")
+        
+        return self.parse(stdout.decode())
+    
+    async def _kill(self, process: asyncio.subprocess.Process) -> None:
+        """Terminate a probe and reap it so no zombie is left behind"""
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+
+# Singleton instance
+probe_service = ProbeService()
+
+
+def validate_video_sync(file_path: str) -> Dict:
+    """Validate video file using ffprobe (blocking, for Celery workers)"""
+    return probe_service.probe_sync(file_path)
+
+
+async def validate_video(file_path: str) -> Dict:
+    """Validate video file using ffprobe without blocking the event loop"""
+    return await probe_service.probe(file_path)
@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from typing import AsyncIterator, Callable, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("processed", "failed")
+
+
+class ProgressService:
+    """
+    Processing progress over Redis pub/sub.
+    
+    Workers publish each update on a per-video channel and keep the latest
+    one in a key, so a client that subscribes mid-way starts from the
+    current state instead of waiting for the next update.
+    """
+    
+    def __init__(self):
+        self._client: Optional[redis.Redis] = None
+    
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(settings.REDIS_URL)
+        return self._client
+    
+    def channel(self, video_id: str) -> str:
+        return f"video-progress:{video_id}"
+    
+    def publish(self, video_id: str, status: str, stage: Optional[str] = None, percent: Optional[int] = None) -> None:
+        """Publish an update; progress is best effort and never fails processing"""
+        event = json.dumps({
+            "video_id": str(video_id),
+            "status": status,
+            "stage": stage,
+            "percent": percent
+        })
+        channel = self.channel(video_id)
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(channel, event, ex=settings.PROGRESS_TTL_SECONDS)
+            pipe.publish(channel, event)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Could not publish progress for video %s: %s", video_id, e)
+    
+    def reporter(self, video_id: str, stage: str, min_interval: float = 0.5) -> Callable[[float], None]:
+        """Callback for the processing engines: fraction in, throttled updates out"""
+        last = {"percent": -1, "at": 0.0}
+        
+        def report(fraction: float) -> None:
+            percent = int(fraction * 100)
+            now = time.monotonic()
+            if percent <= last["percent"] or (percent < 100 and now - last["at"] < min_interval):
+                return
+            last.update(percent=percent, at=now)
+            self.publish(video_id, "processing", stage, percent)
+        
+        return report
+    
+    async def listen(self, video_id: str) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield the latest stored update and then every new one for a video.
+        
+        Yields None every PROGRESS_KEEPALIVE_SECONDS without updates so the
+        caller can keep the connection alive. Stops after a terminal status.
+        """
+        channel = self.channel(video_id)
+        client = aioredis.Redis.from_url(settings.REDIS_URL)
+        pubsub = client.pubsub()
+        
+        try:
+            # Subscribe before reading the last update so nothing is missed in between
+            await pubsub.subscribe(channel)
+            latest = await client.get(channel)
+            if latest:
+                event = json.loads(latest)
+                yield event
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+            
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.PROGRESS_KEEPALIVE_SECONDS
+                )
+                if message is None:
+                    yield None
+                    continue
+                event = json.loads(message["data"])
+                yield event
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+# Singleton instance
+progress_service = ProgressService()
@@ -1,11 +1,46 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from typing import AsyncContextManager, AsyncIterator, BinaryIO, Optional, Tuple
 
 class BaseStorage(ABC):
     @abstractmethod
     async def save_file(self, file_content: bytes, filename: str, subfolder: str = "uploads") -> str:
         pass
 
+    @abstractmethod
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        subfolder: str = "uploads",
+        max_size: Optional[int] = None
+    ) -> Tuple[str, int]:
+        pass
+
+    @abstractmethod
+    async def append_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        offset: int,
+        subfolder: str = "temp",
+        max_size: Optional[int] = None
+    ) -> int:
+        pass
+
+    @abstractmethod
+    def lock_partial(self, filename: str, subfolder: str = "temp") -> AsyncContextManager[None]:
+        pass
+
+    @abstractmethod
+    async def move_file(
+        self,
+        filename: str,
+        src_subfolder: str,
+        dest_filename: str,
+        dest_subfolder: str = "uploads"
+    ) -> str:
+        pass
+
     @abstractmethod
     async def delete_file(self, path: str) -> bool:
         pass
@@ -1,6 +1,35 @@
+import hashlib
+from typing import AsyncContextManager, AsyncIterator, Optional, Tuple
+from app.core.config import settings
 from app.storage.base_storage import BaseStorage
 from app.storage.local_storage import LocalStorage 
 
+
+async def iter_chunks(file, chunk_size: int = settings.UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield fixed-size chunks from any object exposing an async read(size)"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def hash_chunks(chunks: AsyncIterator[bytes], digest) -> AsyncIterator[bytes]:
+    """Pass chunks through unchanged while feeding them to a hashlib digest"""
+    async for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a stored file, read in upload-sized blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class FileService:
     def __init__(self, storage: BaseStorage):
         self.storage = storage
@@ -9,6 +38,39 @@ class FileService:
         path = await self.storage.save_file(file_content, filename, subfolder)
         return str(path)
 
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        subfolder: str = "uploads",
+        max_size: Optional[int] = None
+    ) -> Tuple[str, int]:
+        path, size = await self.storage.save_stream(chunks, filename, subfolder, max_size)
+        return str(path), size
+
+    async def append_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        offset: int,
+        subfolder: str = "temp",
+        max_size: Optional[int] = None
+    ) -> int:
+        return await self.storage.append_stream(chunks, filename, offset, subfolder, max_size)
+
+    def lock_partial(self, filename: str, subfolder: str = "temp") -> AsyncContextManager[None]:
+        return self.storage.lock_partial(filename, subfolder)
+
+    async def move_file(
+        self,
+        filename: str,
+        src_subfolder: str,
+        dest_filename: str,
+        dest_subfolder: str = "uploads"
+    ) -> str:
+        path = await self.storage.move_file(filename, src_subfolder, dest_filename, dest_subfolder)
+        return str(path)
+
     async def delete_file(self, path: str):
         await self.storage.delete_file(path)
     
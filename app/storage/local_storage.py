@@ -1,6 +1,9 @@
 import aiofiles
+import fcntl
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import BinaryIO
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+from app.core.exceptions import ConflictException, ValidationException
 from .base_storage import BaseStorage
 
 
@@ -25,6 +28,118 @@ class LocalStorage(BaseStorage):
         
         return str(file_path)
     
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        subfolder: str = "uploads",
+        max_size: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """
+        Write an async stream of chunks to local storage.
+        
+        Only one chunk is held in memory at a time. If max_size is given the
+        write is aborted as soon as it is exceeded and the partial file removed.
+        
+        Returns:
+            Tuple with the stored path and the number of bytes written
+        """
+        folder = self.base_path / subfolder
+        folder.mkdir(exist_ok=True)
+        
+        file_path = folder / filename
+        written = 0
+        
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                async for chunk in chunks:
+                    written += len(chunk)
+                    if max_size is not None and written > max_size:
+                        raise ValidationException(
+                            f"File size exceeds maximum allowed ({max_size // (1024 * 1024)}MB)"
+                        )
+                    await f.write(chunk)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
+        
+        return str(file_path), written
+    
+    async def append_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        offset: int,
+        subfolder: str = "temp",
+        max_size: Optional[int] = None
+    ) -> int:
+        """
+        Write an async stream of chunks into a partial file starting at offset.
+        
+        Anything previously written past offset (e.g. an interrupted chunk) is
+        discarded first. max_size limits the bytes accepted in this call.
+        
+        Returns:
+            The new size of the partial file
+        """
+        folder = self.base_path / subfolder
+        folder.mkdir(exist_ok=True)
+        
+        file_path = folder / filename
+        file_path.touch(exist_ok=True)
+        
+        if file_path.stat().st_size < offset:
+            raise ValidationException("Partial upload data is missing, restart the upload")
+        
+        written = 0
+        async with aiofiles.open(file_path, 'r+b') as f:
+            await f.truncate(offset)
+            await f.seek(offset)
+            async for chunk in chunks:
+                written += len(chunk)
+                if max_size is not None and written > max_size:
+                    raise ValidationException("Chunk exceeds the declared upload size")
+                await f.write(chunk)
+        
+        return offset + written
+    
+    @asynccontextmanager
+    async def lock_partial(self, filename: str, subfolder: str = "temp") -> AsyncIterator[None]:
+        """
+        Hold an exclusive lock on a partial file while a chunk is written to it.
+        
+        The lock is not waited for: a second writer gets a ConflictException
+        right away, like a chunk sent at a stale offset.
+        """
+        folder = self.base_path / subfolder
+        folder.mkdir(exist_ok=True)
+        
+        with open(folder / filename, 'ab') as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ConflictException("Another chunk of this upload is being written")
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    async def move_file(
+        self,
+        filename: str,
+        src_subfolder: str,
+        dest_filename: str,
+        dest_subfolder: str = "uploads"
+    ) -> str:
+        """Move a stored file into another subfolder and return the new path"""
+        folder = self.base_path / dest_subfolder
+        folder.mkdir(exist_ok=True)
+        
+        file_path = folder / dest_filename
+        (self.base_path / src_subfolder / filename).replace(file_path)
+        
+        return str(file_path)
+    
     async def delete_file(self, path: str) -> bool:
         """Delete a file from storage"""
         try:
@@ -37,8 +152,13 @@ class LocalStorage(BaseStorage):
             return False
     
     def get_file_url(self, path: str) -> str:
-        """Return the URL/path for file access"""
-        return f"/storage/{Path(path).name}"
+        """Return the URL/path for file access (served by nginx under /storage/)"""
+        file_path = Path(path)
+        try:
+            relative = file_path.resolve().relative_to(self.base_path.resolve())
+        except ValueError:
+            return f"/storage/{file_path.name}"
+        return f"/storage/{relative.as_posix()}"
     
     
 
@@ -0,0 +1,102 @@
+import errno
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app.core.config import settings
+
+SCRATCH_PREFIX = "anb-"
+
+
+def scratch_root() -> Path:
+    """Directory for intermediates: SCRATCH_PATH (tmpfs or local disk) or the system temp dir"""
+    root = Path(settings.SCRATCH_PATH or tempfile.gettempdir())
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+@contextmanager
+def scratch_dir(label: str) -> Iterator[Path]:
+    """
+    Private work directory on scratch space, removed on exit whatever happens.
+    
+    The name carries the pid so purge_stale_scratch can reclaim it if the
+    process is killed before the cleanup runs.
+    """
+    path = Path(tempfile.mkdtemp(prefix=f"{SCRATCH_PREFIX}{os.getpid()}-{label}-", dir=scratch_root()))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process exists (possibly owned by another user)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def purge_stale_scratch() -> int:
+    """
+    Remove scratch directories of processes that no longer exist.
+    
+    Returns:
+        Bytes reclaimed
+    """
+    reclaimed = 0
+    for path in scratch_root().glob(f"{SCRATCH_PREFIX}*"):
+        pid = path.name[len(SCRATCH_PREFIX):].split("-", 1)[0]
+        if not path.is_dir() or not pid.isdigit() or pid_alive(int(pid)):
+            continue
+        reclaimed += sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        shutil.rmtree(path, ignore_errors=True)
+    return reclaimed
+
+
+def move_into_storage(source: Path, target: Path) -> Path:
+    """
+    Move a finished file or directory from scratch space to its final path.
+    
+    A plain rename when both are on the same filesystem. Otherwise the copy
+    is written to a hidden sibling of target and renamed into place, so
+    readers such as nginx only ever see complete outputs. An existing target
+    is replaced.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.is_dir():
+        shutil.rmtree(target)
+    
+    try:
+        os.replace(source, target)
+        return target
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    
+    # Otro sistema de archivos (tmpfs): copiar y renombrar de forma atómica
+    partial = target.with_name(f".{target.name}.partial-{os.getpid()}")
+    try:
+        if source.is_dir():
+            shutil.copytree(source, partial)
+        else:
+            shutil.copyfile(source, partial)
+        os.replace(partial, target)
+    finally:
+        if partial.is_dir():
+            shutil.rmtree(partial, ignore_errors=True)
+        else:
+            partial.unlink(missing_ok=True)
+    
+    if source.is_dir():
+        shutil.rmtree(source, ignore_errors=True)
+    else:
+        source.unlink(missing_ok=True)
+    return target
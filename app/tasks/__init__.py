@@ -1,3 +1,4 @@
 from app.tasks.video_tasks import process_video_task
+from app.tasks.outbox_tasks import dispatch_outbox_task
 
-__all__ = ["process_video_task"]
\ No newline at end of file
+__all__ = ["process_video_task", "dispatch_outbox_task"]
\ No newline at end of file
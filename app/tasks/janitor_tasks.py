@@ -0,0 +1,203 @@
+import logging
+import re
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.metrics import STORAGE_RECLAIMED_BYTES
+from app.db.sync_session import SyncSessionLocal
+from app.models.media_asset import MediaAsset
+from app.models.upload_session import UploadSession
+from app.models.video import Video
+
+logger = logging.getLogger(__name__)
+
+# Only names in these layouts are ever considered; anything else (.gitkeep,
+# files put there by hand) is left alone
+# {video or upload session id}.mp4: raw uploads waiting for the pipeline
+UPLOAD_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.mp4$")
+# {upload session id}.part: chunked uploads being assembled
+PART_NAME = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.part$")
+# {sha256}-{processing version}: outputs promoted by the finalize stage
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})-(.+?)(?:\.mp4)?$")
+# .{sha256}.{video id}: outputs staged by transcode/renditions until finalize
+STAGED_NAME = re.compile(r"^\.[0-9a-f]{64}\.([0-9a-f-]{36})(?:\.mp4)?$")
+# .{name}.partial-{pid}: copies left by a move_into_storage that was interrupted
+PARTIAL_NAME = re.compile(r"^\..+\.partial-\d+$")
+
+
+def _batches(entries: Iterable[Path], size: int) -> Iterator[List[Path]]:
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _untouched_since(folder: Path, cutoff: datetime) -> Iterator[Path]:
+    """Entries of a folder not modified after cutoff (fresh ones may still be in use)"""
+    if not folder.is_dir():
+        return
+    for entry in folder.iterdir():
+        try:
+            if datetime.utcfromtimestamp(entry.stat().st_mtime) < cutoff:
+                yield entry
+        except FileNotFoundError:
+            continue
+
+
+def _remove(path: Path) -> int:
+    """Delete a file or directory tree and return the bytes freed"""
+    try:
+        if path.is_dir():
+            size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+            shutil.rmtree(path)
+        else:
+            size = path.stat().st_size
+            path.unlink()
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def _sweep(paths: Iterable[Path], report: Dict[str, int]) -> None:
+    for path in paths:
+        freed = _remove(path)
+        report["removed"] += 1
+        report["reclaimed_bytes"] += freed
+
+
+def _orphan_uploads(db, batch: List[Path]) -> List[Path]:
+    """Raw uploads no video still needs: deleted rows and failed videos"""
+    # Same form as the stored file_path, so ix_videos_file_path is used
+    uploads = {str(path): path for path in batch if UPLOAD_NAME.match(path.name)}
+    if not uploads:
+        return []
+    referenced = {
+        file_path for (file_path,) in db.query(Video.file_path)
+        .filter(Video.file_path.in_(list(uploads)), Video.status != "failed")
+    }
+    return [path for file_path, path in uploads.items() if file_path not in referenced]
+
+
+def _orphan_parts(db, batch: List[Path]) -> List[Path]:
+    """Partial chunked uploads whose upload session is gone"""
+    ids = {}
+    for path in batch:
+        if match := PART_NAME.match(path.name):
+            ids[path] = UUID(match.group(1))
+    if not ids:
+        return []
+    alive = {
+        upload_id for (upload_id,) in db.query(UploadSession.id)
+        .filter(UploadSession.id.in_(set(ids.values())))
+    }
+    return [path for path, upload_id in ids.items() if upload_id not in alive]
+
+
+def _orphan_outputs(db, batch: List[Path]) -> List[Path]:
+    """
+    Processed outputs nothing points to.
+    
+    Content-addressed blobs are kept while a media_assets row references
+    them; staged outputs while their video is still processing. Partial
+    copies of interrupted moves are always orphans. Names in any other
+    format are never touched.
+    """
+    blobs, staged = {}, {}
+    for path in batch:
+        if match := BLOB_NAME.match(path.name):
+            blobs[path] = match.groups()
+        elif match := STAGED_NAME.match(path.name):
+            staged[path] = UUID(match.group(1))
+    
+    cached = set()
+    if blobs:
+        cached = set(
+            db.query(MediaAsset.content_hash, MediaAsset.profile_version)
+            .filter(tuple_(MediaAsset.content_hash, MediaAsset.profile_version).in_(set(blobs.values())))
+            .all()
+        )
+    processing = set()
+    if staged:
+        processing = {
+            video_id for (video_id,) in db.query(Video.id)
+            .filter(Video.id.in_(set(staged.values())), Video.status == "processing")
+        }
+    
+    orphans = []
+    for path in batch:
+        if path in blobs:
+            if tuple(blobs[path]) not in cached:
+                orphans.append(path)
+        elif path in staged:
+            if staged[path] not in processing:
+                orphans.append(path)
+        elif PARTIAL_NAME.match(path.name):
+            orphans.append(path)
+    return orphans
+
+
+@celery_app.task(name="reconcile_storage")
+def reconcile_storage_task(batch_size: int = settings.JANITOR_BATCH_SIZE):
+    """
+    Reconcile the storage tree with the database and remove what is orphaned.
+    
+    Covers raw uploads of deleted or failed videos, partial uploads of
+    abandoned sessions (the sessions are deleted too) and processed outputs
+    left by failed or interrupted runs. Only entries untouched for
+    JANITOR_GRACE_HOURS are considered, and they are checked against the
+    database in batches.
+    """
+    db = SyncSessionLocal()
+    root = Path(settings.STORAGE_PATH)
+    cutoff = datetime.utcnow() - timedelta(hours=settings.JANITOR_GRACE_HOURS)
+    reports = {area: {"removed": 0, "reclaimed_bytes": 0} for area in ("uploads", "temp", "processed")}
+    
+    try:
+        for batch in _batches(_untouched_since(root / "uploads", cutoff), batch_size):
+            _sweep(_orphan_uploads(db, batch), reports["uploads"])
+        
+        # Sesiones abandonadas primero, así sus archivos .part quedan huérfanos
+        expired_sessions = (
+            db.query(UploadSession)
+            .filter(UploadSession.updated_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        for batch in _batches(_untouched_since(root / "temp", cutoff), batch_size):
+            _sweep(_orphan_parts(db, batch), reports["temp"])
+        
+        processed = root / "processed"
+        outputs = (
+            entry
+            for folder in (processed, processed / "hls", processed / "thumbs")
+            for entry in _untouched_since(folder, cutoff)
+            if not (folder == processed and entry.name in ("hls", "thumbs"))
+        )
+        for batch in _batches(outputs, batch_size):
+            _sweep(_orphan_outputs(db, batch), reports["processed"])
+    
+    finally:
+        db.close()
+    
+    for area, report in reports.items():
+        STORAGE_RECLAIMED_BYTES.labels(area=area).inc(report["reclaimed_bytes"])
+    reclaimed = sum(report["reclaimed_bytes"] for report in reports.values())
+    logger.info("Storage janitor reclaimed %.1f MiB", reclaimed / (1024 * 1024))
+    
+    return {
+        "status": "success",
+        **reports,
+        "expired_upload_sessions": expired_sessions,
+        "reclaimed_bytes": reclaimed
+    }
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.db.sync_session import SyncSessionLocal
+from app.models.outbox_task import OutboxTask
+from app.services.outbox_service import publish
+
+
+@celery_app.task(name="dispatch_outbox")
+def dispatch_outbox_task(batch_size: int = 100):
+    """
+    Publish outbox entries the API could not dispatch right after commit
+    (broker unavailable, process crashed) and purge old dispatched entries.
+    """
+    db = SyncSessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        
+        # Leave fresh entries to the request that created them
+        cutoff = now - timedelta(seconds=settings.OUTBOX_GRACE_SECONDS)
+        entries = (
+            db.query(OutboxTask)
+            .filter(OutboxTask.status == "pending", OutboxTask.created_at < cutoff)
+            .order_by(OutboxTask.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        sent = sum(publish(entry) for entry in entries)
+        
+        retention_cutoff = now - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        purged = (
+            db.query(OutboxTask)
+            .filter(OutboxTask.status == "dispatched", OutboxTask.dispatched_at < retention_cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        
+        return {
+            "status": "success",
+            "dispatched": sent,
+            "failed": len(entries) - sent,
+            "purged": purged
+        }
+    
+    finally:
+        db.close()
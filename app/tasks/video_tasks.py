@@ -1,146 +1,516 @@
 import shutil
 from pathlib import Path
-from time import sleep
+from typing import Callable, List, Optional
 from uuid import UUID
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from moviepy import ImageClip, VideoFileClip, CompositeVideoClip, vfx
+
+from celery import Signature
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 
 from app.core.celery_app import celery_app
 from app.core.config import settings
-from app.utils.video_validator_sync import validate_video_sync
+from app.core.exceptions import ValidationException
+from app.core.metrics import measure_stage
+from app.db.sync_session import SyncSessionLocal
+from app.services.probe_service import validate_video_sync
+from app.processing import DEFAULT_PROFILE, render_video
+from app.processing.assets import processing_version
+from app.processing.ffmpeg_utils import kill_running
+from app.processing.hls import ladder_for, render_hls
+from app.models.media_asset import MediaAsset
+from app.models.outbox_task import OutboxTask
 from app.models.video import Video
+from app.repositories.media_asset_repository import media_asset_repository
+from app.services.outbox_service import publish
+from app.services.progress_service import progress_service
+from app.storage.file_service import content_hash
+from app.storage.scratch import move_into_storage, scratch_dir
+
+# Pipeline stages in order; videos.processing_stage holds the last one completed
+STAGES = ("probe", "transcode", "renditions", "finalize")
+
+STAGE_MAX_RETRIES = 3
+STAGE_RETRY_BACKOFF = 10  # seconds, doubled on each retry
+
+# Encode passes each stage makes over the rendered length, to scale its time limit
+STAGE_ENCODE_PASSES = {
+    "probe": 0,
+    "transcode": 2,  # render + thumbnails
+    "renditions": len(ladder_for(DEFAULT_PROFILE)),
+    "finalize": 0,
+}
+
+
+def stage_time_limits(stage: str, duration: Optional[float] = None) -> dict:
+    """
+    Celery soft and hard time limits for a stage, scaled by the input duration.
+    
+    The soft limit raises inside the task so it can kill ffmpeg and mark the
+    video failed; the hard limit kills the worker child as a last resort.
+    Unknown durations get the limits of the longest clip.
+    """
+    body = min(duration or DEFAULT_PROFILE.max_duration, DEFAULT_PROFILE.max_duration)
+    seconds = DEFAULT_PROFILE.intro_duration + body + DEFAULT_PROFILE.outro_duration
+    soft = settings.STAGE_TIME_LIMIT_BASE_SECONDS + settings.STAGE_TIME_LIMIT_FACTOR * seconds * STAGE_ENCODE_PASSES[stage]
+    return {
+        "soft_time_limit": int(soft),
+        "time_limit": int(soft) + settings.STAGE_TIME_LIMIT_GRACE_SECONDS
+    }
+
+
+def _logo_path() -> Path:
+    return Path(settings.RES_PATH) / "logo720.png"
+
+
+def _processed_folder() -> Path:
+    folder = Path(settings.STORAGE_PATH) / "processed"
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def _output_seconds(video: Video) -> float:
+    """Length of the rendered video: intro, trimmed body and outro"""
+    body_duration = min(video.processing_artifacts['metadata']['duration'], DEFAULT_PROFILE.max_duration)
+    return DEFAULT_PROFILE.intro_duration + body_duration + DEFAULT_PROFILE.outro_duration
+
+
+def _size(path: Optional[str]) -> int:
+    """Bytes of a file, or of every file under a directory"""
+    if not path:
+        return 0
+    target = Path(path)
+    if target.is_dir():
+        return sum(f.stat().st_size for f in target.rglob("*") if f.is_file())
+    return target.stat().st_size if target.exists() else 0
+
+
+def _promote(staged: Path, target: Path) -> Path:
+    """
+    Move a freshly rendered file or directory to its content-addressed name.
+    
+    If a concurrent worker already produced the same blob, ours is dropped.
+    """
+    if not target.exists():
+        try:
+            staged.rename(target)
+            return target
+        except OSError:
+            # Otro worker ganó la carrera con el mismo contenido
+            if not target.exists():
+                raise
+    if staged.is_dir():
+        shutil.rmtree(staged, ignore_errors=True)
+    else:
+        staged.unlink(missing_ok=True)
+    return target
+
+
+def stage_done(video: Video, stage: str) -> bool:
+    """Whether the checkpoint of a video is at or past the given stage"""
+    if video.processing_stage not in STAGES:
+        return False
+    return STAGES.index(video.processing_stage) >= STAGES.index(stage)
+
+
+def remaining_stages(video: Video) -> List[str]:
+    """Stages still to run, resuming after the last checkpoint"""
+    return [stage for stage in STAGES if not stage_done(video, stage)]
+
+
+def _checkpoint(db, video: Video, stage: str, stats: dict) -> None:
+    """Store the stage reached with its metrics and the artifacts set by the stage"""
+    video.processing_metrics = {**(video.processing_metrics or {}), stage: stats}
+    video.processing_stage = stage
+    db.commit()
+
+
+def _fail(db, video: Video, reason: str, stage: Optional[str] = None) -> None:
+    """Mark a video failed, keeping why so the owner can see it"""
+    video.status = "failed"
+    video.failure_reason = reason[:500]
+    db.commit()
+    progress_service.publish(str(video.id), "failed", stage)
 
-# Create synchronous database session for Celery worker
-SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+asyncpg", "")
-sync_engine = create_engine(SYNC_DATABASE_URL)
-SyncSessionLocal = sessionmaker(bind=sync_engine)
+
+def _enqueue_chain(db, stages: List[Signature]) -> OutboxTask:
+    """
+    Add an outbox entry that starts a chain of stage signatures.
+    
+    The entry is the first stage carrying the rest as its chain option, the
+    same message chain.apply_async would send.
+    """
+    first, rest = stages[0], stages[1:]
+    entry = OutboxTask(
+        task_name=first.task,
+        args=list(first.args),
+        options={**first.options, "chain": [dict(signature) for signature in reversed(rest)]},
+        status="pending",
+        attempts=0
+    )
+    db.add(entry)
+    return entry
 
 
-@celery_app.task(name="process_video")
-def process_video_task(video_id: str, temp_file_path: str):
+def _cached_asset(db, video: Video, version: Optional[str] = None) -> Optional[MediaAsset]:
+    """Cached outputs for the video content, preferring the given processing version"""
+    query = db.query(MediaAsset).filter(MediaAsset.content_hash == video.content_hash)
+    if version:
+        query = query.order_by((MediaAsset.profile_version == version).desc())
+    return query.first()
+
+
+def _run_stage(task, video_id: str, stage: str, work: Callable) -> dict:
     """
-    Process uploaded video asynchronously.
-    
-    Steps:
-    1. Update status to 'processing'
-    2. Validate video with FFprobe
-    3. Process video (cutting, resizing, adding banner)
-    4. Move to processed folder
-    5. Update status to 'processed' or 'failed'
+    Run one pipeline stage for a video.
+    
+    The stage is skipped if its checkpoint was already reached (retry or
+    duplicate delivery) or if the previous stage did not complete, which is
+    how a failure stops the rest of the chain. Invalid videos and stages
+    that hit their soft time limit fail at once; other errors are retried
+    with backoff and mark the video failed when retries run out, keeping the
+    checkpoint so a new run resumes from it.
     """
     db = SyncSessionLocal()
+    video = None
     
     try:
-        sleep(5)
+        video = db.query(Video).filter(Video.id == UUID(video_id)).first()
+        
+        if not video:
+            raise ValidationException(f"Video {video_id} not found in database")
+        
+        previous = STAGES[STAGES.index(stage) - 1] if stage != STAGES[0] else None
+        if video.status != "processing" or stage_done(video, stage) or (previous and not stage_done(video, previous)):
+            return {
+                "status": "skipped",
+                "video_id": video_id,
+                "stage": stage
+            }
+        
+        progress_service.publish(video_id, "processing", stage, 0)
+        with measure_stage(stage) as stats:
+            work(db, video, stats)
+        _checkpoint(db, video, stage, stats)
+        progress_service.publish(video_id, video.status, stage, 100)
+        
+        return {
+            "status": "success",
+            "video_id": video_id,
+            "stage": stage
+        }
+    
+    except Exception as e:
+        db.rollback()
+        
+        if isinstance(e, SoftTimeLimitExceeded):
+            # A corrupt input hangs the same way on every attempt: free the slot now
+            kill_running()
+            reason = f"Stage {stage} exceeded its time limit"
+        elif not isinstance(e, ValidationException) and task.request.retries < task.max_retries:
+            raise task.retry(exc=e, countdown=STAGE_RETRY_BACKOFF * 2 ** task.request.retries)
+        else:
+            reason = str(e) or type(e).__name__
+        
+        # Update status to failed
+        if video:
+            _fail(db, video, reason, stage)
+        
+        return {
+            "status": "failed",
+            "video_id": video_id,
+            "stage": stage,
+            "error": reason
+        }
+    
+    finally:
+        db.close()
 
-        # Get video record
+
+@celery_app.task(
+    name="process_video",
+    bind=True,
+    soft_time_limit=settings.STAGE_TIME_LIMIT_BASE_SECONDS,
+    time_limit=settings.STAGE_TIME_LIMIT_BASE_SECONDS + settings.STAGE_TIME_LIMIT_GRACE_SECONDS
+)
+def process_video_task(self, video_id: str, temp_file_path: str):
+    """
+    Entry point for processing an uploaded video.
+    
+    Links the video to cached outputs when the same content was already
+    processed; otherwise starts the probe -> transcode -> renditions ->
+    finalize chain from the first stage not yet completed. Each stage runs
+    on its own queue, keeps the priority this task was published with and
+    gets time limits scaled to the video duration.
+    
+    The claim of the video and the outbox entry that starts the chain
+    commit together, so a duplicate delivery never starts a second chain
+    and a crash before publishing leaves the entry to the outbox sweeper.
+    """
+    db = SyncSessionLocal()
+    video = None
+    
+    try:
+        # The outbox and acks_late deliver at least once: only the delivery
+        # that moves the video into "processing" starts the pipeline
+        claimed = db.execute(
+            update(Video)
+            .where(Video.id == UUID(video_id), Video.status.in_(("uploaded", "failed")))
+            .values(status="processing", failure_reason=None)
+        ).rowcount
+        
+        # Get video record (published through the outbox, so it is committed)
         video = db.query(Video).filter(Video.id == UUID(video_id)).first()
         
         if not video:
             raise Exception(f"Video {video_id} not found in database")
         
-        # Update status to processing
-        video.status = "processing"
-        db.commit()
+        if not claimed:
+            db.rollback()
+            return {
+                "status": "skipped",
+                "video_id": video_id,
+                "message": f"Video already {video.status}"
+            }
         
-        # Validate video with FFprobe
-        metadata = validate_video_sync(temp_file_path)
+        # Videos queued before uploads were hashed
+        if not video.content_hash:
+            video.content_hash = content_hash(temp_file_path)
         
-        # Update duration
-        video.duration_seconds = int(metadata['duration'])
-        db.commit()
+        # Same content already processed with this profile: just link it
+        version = processing_version(str(_logo_path()))
+        cached = _cached_asset(db, video, version)
+        if cached and cached.profile_version == version and Path(cached.file_path).exists():
+            media_asset_repository.link(video, cached)
+            db.commit()
+            Path(temp_file_path).unlink(missing_ok=True)
+            progress_service.publish(video_id, "processed")
+            
+            return {
+                "status": "success",
+                "video_id": video_id,
+                "message": "Video linked to an existing processed copy"
+            }
         
-        # Process video (cutting, adding banner, watermark and resizing.)
-        videoclip = VideoFileClip(video.file_path)
-
-
-        # Intro and Outro logo
-        logo_path = Path(settings.RES_PATH) / "logo720.png"
-
-        # Determine durations
-        video_duration = video.duration_seconds if video.duration_seconds <= 30 else 30
-        intro_duration = 2.5
-        outro_duration = 2.5
-        watermark_fadein = 2.0
-
-        # Create clips
-        intro_logo = (ImageClip(str(logo_path))
-              .with_duration(intro_duration)
-              .with_position(("center", "center")))
-        
-        # Trim video if needed and add fade in
-        if video.duration_seconds > 30:
-            videoclip = videoclip.subclipped(0, 30)
-
-        videoclip = videoclip.with_effects([vfx.CrossFadeIn(watermark_fadein)]).resized((1280,720))
-
-        # Watermark (positioned at 50% from top, centered horizontally)
-        watermark = (ImageClip(str(logo_path))
-             .with_duration(video_duration)
-             .resized(height=100)  # Resize logo for watermark
-             .with_position(("center", 0.5), relative=True)
-             .with_effects([vfx.CrossFadeIn(watermark_fadein)])
-             .with_opacity(0.5)
-             .with_start(intro_duration))
-
-        # Outro logo
-        outro_logo = (ImageClip(str(logo_path))
-              .with_duration(outro_duration)
-              .with_position(("center", "center"))
-              .with_effects([vfx.CrossFadeIn(2.0)])
-              .with_start(intro_duration + video_duration))
-
-        # Composite all clips
-        final_clip = CompositeVideoClip([
-            intro_logo,
-            videoclip.with_start(intro_duration),
-            watermark,
-            outro_logo
-        ])
-
-        # Remove audio and resize
-        final_clip = (final_clip
-                    .with_audio(None))
-
-        # Export
-        temp_path = Path(temp_file_path)
-        processed_folder = Path(settings.STORAGE_PATH) / "processed"
-        processed_folder.mkdir(parents=True, exist_ok=True)
-        
-        processed_file_path = processed_folder / temp_path.name
-        final_clip.write_videofile(processed_file_path)
-
-        # Clean up
-        videoclip.close()
-        final_clip.close()
-        
-        # Update database record
-        video.file_path = str(processed_file_path)
-        video.status = "processed"
+        priority = (self.request.delivery_info or {}).get("priority")
+        stages = []
+        for stage in remaining_stages(video):
+            signature = STAGE_TASKS[stage].si(video_id).set(
+                priority=priority,
+                **stage_time_limits(stage, video.duration_seconds)
+            )
+            # A hard time limit kills the child before the stage can mark the video
+            signature.on_error(fail_video_task.si(video_id, stage))
+            stages.append(signature)
+        entry = _enqueue_chain(db, stages)
         db.commit()
         
-        # Clean up temp file
-        if temp_path.exists():
-            temp_path.unlink()
+        # Publish right away; if this fails the sweeper retries the entry
+        publish(entry)
+        db.commit()
         
         return {
-            "status": "success",
+            "status": "queued",
             "video_id": video_id,
-            "message": "Video processed successfully"
+            "stages": remaining_stages(video)
         }
-        
+    
     except Exception as e:
         # Update status to failed
         if video:
-            video.status = "failed"
-            db.commit()
+            db.rollback()
+            _fail(db, video, str(e) or type(e).__name__)
         
         return {
             "status": "failed",
             "video_id": video_id,
             "error": str(e)
         }
+    
+    finally:
+        db.close()
+
+
+def _probe(db, video: Video, stats: dict) -> None:
+    """Validate the upload with FFprobe, unless this content was probed before"""
+    stats['input_bytes'] = _size(video.file_path)
+    cached = _cached_asset(db, video)
+    if cached:
+        metadata = {
+            'duration': cached.duration,
+            'width': cached.width,
+            'height': cached.height,
+            'codec': cached.codec
+        }
+    else:
+        metadata = validate_video_sync(video.file_path)
+    
+    video.duration_seconds = int(metadata['duration'])
+    video.processing_artifacts = {**(video.processing_artifacts or {}), 'metadata': metadata}
+
+
+def _transcode(db, video: Video, stats: dict) -> None:
+    """Cut, resize and brand the video; thumbnails come from the same decode"""
+    processed_folder = _processed_folder()
+    
+    # Staged under a per-video name; finalize moves it to its content-addressed name
+    staging_name = f".{video.content_hash}.{video.id}"
+    staged_file_path = processed_folder / f"{staging_name}.mp4"
+    thumbnails_dir = processed_folder / "thumbs" / staging_name
+    
+    # Encoded on scratch space; storage only receives the finished outputs
+    with scratch_dir("transcode") as work:
+        thumbnails = render_video(
+            input_path=video.file_path,
+            output_path=str(work / "video.mp4"),
+            duration=video.processing_artifacts['metadata']['duration'],
+            logo_path=str(_logo_path()),
+            thumbnails_dir=str(work / "thumbs") if settings.THUMBNAILS_ENABLED else None,
+            progress=progress_service.reporter(str(video.id), "transcode")
+        )
+        move_into_storage(work / "video.mp4", staged_file_path)
+        if thumbnails:
+            move_into_storage(work / "thumbs", thumbnails_dir)
+    
+    video.processing_artifacts = {
+        **video.processing_artifacts,
+        'staged_file': str(staged_file_path),
+        'thumbnails_dir': str(thumbnails_dir) if thumbnails else None,
+        'thumbnails': [
+            str(thumbnails_dir / Path(path).name)
+            for path in (thumbnails.poster, thumbnails.preview, thumbnails.sprite)
+        ] if thumbnails else None
+    }
+    
+    stats['input_bytes'] = _size(video.file_path)
+    stats['output_bytes'] = _size(str(staged_file_path)) + (_size(str(thumbnails_dir)) if thumbnails else 0)
+    stats['frames'] = int(_output_seconds(video) * DEFAULT_PROFILE.fps)
+
+
+def _renditions(db, video: Video, stats: dict) -> None:
+    """Adaptive bitrate ladder for streaming playback"""
+    hls_master = None
+    if settings.HLS_ENABLED:
+        hls_dir = _processed_folder() / "hls" / Path(video.processing_artifacts['staged_file']).stem
+        with scratch_dir("renditions") as work:
+            master = render_hls(
+                video.processing_artifacts['staged_file'],
+                str(work / "hls"),
+                progress=progress_service.reporter(str(video.id), "renditions"),
+                duration=_output_seconds(video)
+            )
+            move_into_storage(work / "hls", hls_dir)
+        hls_master = str(hls_dir / Path(master).name)
         
+        # Every rung of the ladder is a separate encode of the same frames
+        stats['input_bytes'] = _size(video.processing_artifacts['staged_file'])
+        stats['output_bytes'] = _size(str(Path(hls_master).parent))
+        stats['frames'] = int(_output_seconds(video) * DEFAULT_PROFILE.fps) * len(ladder_for(DEFAULT_PROFILE))
+    
+    video.processing_artifacts = {**video.processing_artifacts, 'hls_master': hls_master}
+
+
+def _finalize(db, video: Video, stats: dict) -> None:
+    """Publish outputs under their content hash, cache them and mark the video processed"""
+    artifacts = video.processing_artifacts
+    metadata = artifacts['metadata']
+    processed_folder = _processed_folder()
+    version = processing_version(str(_logo_path()))
+    blob_name = f"{video.content_hash}-{version}"
+    
+    hls_path = None
+    if artifacts.get('hls_master'):
+        hls_master = Path(artifacts['hls_master'])
+        hls_dir = _promote(hls_master.parent, processed_folder / "hls" / blob_name)
+        hls_path = str(hls_dir / hls_master.name)
+    
+    processed_file_path = _promote(Path(artifacts['staged_file']), processed_folder / f"{blob_name}.mp4")
+    
+    poster_path = preview_path = sprite_path = None
+    if artifacts.get('thumbnails'):
+        thumbs = _promote(Path(artifacts['thumbnails_dir']), processed_folder / "thumbs" / blob_name)
+        poster_path, preview_path, sprite_path = (str(thumbs / Path(p).name) for p in artifacts['thumbnails'])
+    
+    # Record the outputs for future duplicates (first writer wins)
+    db.execute(
+        insert(MediaAsset)
+        .values(
+            content_hash=video.content_hash,
+            profile_version=version,
+            duration=metadata['duration'],
+            width=metadata['width'],
+            height=metadata['height'],
+            codec=metadata['codec'],
+            file_path=str(processed_file_path),
+            hls_path=hls_path,
+            poster_path=poster_path,
+            preview_path=preview_path,
+            sprite_path=sprite_path
+        )
+        .on_conflict_do_nothing(constraint='uq_media_assets_hash_version')
+    )
+    asset = (
+        db.query(MediaAsset)
+        .filter(
+            MediaAsset.content_hash == video.content_hash,
+            MediaAsset.profile_version == version
+        )
+        .one()
+    )
+    
+    # Clean up temp file
+    Path(video.file_path).unlink(missing_ok=True)
+    
+    # Update database record
+    media_asset_repository.link(video, asset)
+
+
+@celery_app.task(name="probe_video", bind=True, max_retries=STAGE_MAX_RETRIES, **stage_time_limits("probe"))
+def probe_video_task(self, video_id: str):
+    """Pipeline stage 1: validate the upload and store its metadata"""
+    return _run_stage(self, video_id, "probe", _probe)
+
+
+@celery_app.task(name="transcode_video", bind=True, max_retries=STAGE_MAX_RETRIES, **stage_time_limits("transcode"))
+def transcode_video_task(self, video_id: str):
+    """Pipeline stage 2: render the branded video and its thumbnails"""
+    return _run_stage(self, video_id, "transcode", _transcode)
+
+
+@celery_app.task(name="render_renditions", bind=True, max_retries=STAGE_MAX_RETRIES, **stage_time_limits("renditions"))
+def render_renditions_task(self, video_id: str):
+    """Pipeline stage 3: render the HLS ladder"""
+    return _run_stage(self, video_id, "renditions", _renditions)
+
+
+@celery_app.task(name="finalize_video", bind=True, max_retries=STAGE_MAX_RETRIES, **stage_time_limits("finalize"))
+def finalize_video_task(self, video_id: str):
+    """Pipeline stage 4: publish outputs and mark the video processed"""
+    return _run_stage(self, video_id, "finalize", _finalize)
+
+
+@celery_app.task(name="fail_video")
+def fail_video_task(video_id: str, stage: str):
+    """
+    Errback of every stage, called when it died without handling its error.
+    
+    That only happens when the worker child was killed (hard time limit or
+    lost worker). ffmpeg spawned from its pool threads can outlive it; the
+    next child to start kills those groups (kill_orphaned_groups).
+    """
+    db = SyncSessionLocal()
+    
+    try:
+        video = db.query(Video).filter(Video.id == UUID(video_id)).first()
+        if video and video.status == "processing":
+            _fail(db, video, f"Stage {stage} was terminated by the worker", stage)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+STAGE_TASKS = {
+    "probe": probe_video_task,
+    "transcode": transcode_video_task,
+    "renditions": render_renditions_task,
+    "finalize": finalize_video_task,
+}
@@ -0,0 +1,283 @@
+import logging
+from datetime import datetime, timedelta
+
+import redis
+from sqlalchemy import and_, delete, exists, func, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.db.sync_session import SyncSessionLocal
+from app.models.user import User
+from app.models.user_vote_total import UserVoteTotal
+from app.models.video import Video
+from app.models.video_vote_bucket import VideoVoteBucket
+from app.models.vote import Vote
+from app.models.vote_counter_shard import VoteCounterShard
+from app.services.leaderboard_service import READY_KEY
+
+logger = logging.getLogger(__name__)
+
+# Flush and reconcile must not interleave, or a recount could miss a batch
+VOTE_COUNTERS_LOCK = 0x766f7465
+
+
+def _lock_counters(db) -> None:
+    """Transaction-scoped lock shared by the flush and the reconciler"""
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": VOTE_COUNTERS_LOCK})
+
+
+@celery_app.task(name="flush_vote_counters")
+def flush_vote_counters_task(batch_size: int = settings.VOTE_FLUSH_BATCH_SIZE):
+    """
+    Move pending votes from vote_counter_shards into videos.votes_count.
+    
+    Shards are drained in batches, skipping rows a vote is incrementing
+    right now. Each video row, the user_vote_totals row of its owner and
+    its video_vote_buckets row for each hour are updated once per batch.
+    """
+    db = SyncSessionLocal()
+    shards = votes = 0
+    
+    try:
+        while True:
+            _lock_counters(db)
+            batch = (
+                select(VoteCounterShard.video_id, VoteCounterShard.shard, VoteCounterShard.hour)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .cte("batch")
+            )
+            drained = (
+                delete(VoteCounterShard)
+                .where(
+                    VoteCounterShard.video_id == batch.c.video_id,
+                    VoteCounterShard.shard == batch.c.shard,
+                    VoteCounterShard.hour == batch.c.hour
+                )
+                .returning(VoteCounterShard.video_id, VoteCounterShard.hour, VoteCounterShard.delta)
+                .cte("drained")
+            )
+            totals = (
+                select(drained.c.video_id, func.sum(drained.c.delta).label("delta"))
+                .group_by(drained.c.video_id)
+                .cte("totals")
+            )
+            bumped = (
+                update(Video)
+                .where(Video.id == totals.c.video_id)
+                .values(votes_count=Video.votes_count + totals.c.delta)
+                .returning(Video.user_id, totals.c.delta)
+                .cte("bumped")
+            )
+            owners = (
+                select(bumped.c.user_id, func.sum(bumped.c.delta).label("delta"))
+                .group_by(bumped.c.user_id)
+                .cte("owners")
+            )
+            rolled_up = (
+                update(UserVoteTotal)
+                .where(UserVoteTotal.user_id == owners.c.user_id)
+                .values(total=UserVoteTotal.total + owners.c.delta)
+                .returning(UserVoteTotal.user_id)
+                .cte("rolled_up")
+            )
+            hourly = insert(VideoVoteBucket).from_select(
+                ["video_id", "hour", "votes"],
+                select(drained.c.video_id, drained.c.hour, func.sum(drained.c.delta))
+                .group_by(drained.c.video_id, drained.c.hour)
+            )
+            bucketed = (
+                hourly.on_conflict_do_update(
+                    index_elements=[VideoVoteBucket.video_id, VideoVoteBucket.hour],
+                    set_={"votes": VideoVoteBucket.votes + hourly.excluded.votes}
+                )
+                .returning(VideoVoteBucket.video_id)
+                .cte("bucketed")
+            )
+            drained_rows, added, _, _ = db.execute(
+                select(
+                    select(func.count()).select_from(drained).scalar_subquery(),
+                    select(func.coalesce(func.sum(bumped.c.delta), 0)).scalar_subquery(),
+                    select(func.count()).select_from(rolled_up).scalar_subquery(),
+                    select(func.count()).select_from(bucketed).scalar_subquery()
+                )
+            ).one()
+            db.commit()
+            
+            shards += drained_rows
+            votes += added
+            if drained_rows < batch_size:
+                break
+        
+        return {
+            "status": "success",
+            "shards": shards,
+            "votes": votes
+        }
+    
+    finally:
+        db.close()
+
+
+def _reconcile_user_totals(db) -> int:
+    """Recompute user_vote_totals from the public videos, returning the rows changed"""
+    rows = (
+        select(
+            Video.user_id,
+            User.city,
+            func.sum(Video.votes_count).label("total"),
+            func.count().label("public_videos")
+        )
+        .join(User, User.id == Video.user_id)
+        .where(Video.is_public == True, Video.status == 'processed')
+        .group_by(Video.user_id, User.city)
+    )
+    upsert = insert(UserVoteTotal).from_select(["user_id", "city", "total", "public_videos"], rows)
+    changed = db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[UserVoteTotal.user_id],
+            set_={
+                "city": upsert.excluded.city,
+                "total": upsert.excluded.total,
+                "public_videos": upsert.excluded.public_videos
+            },
+            where=or_(
+                UserVoteTotal.city != upsert.excluded.city,
+                UserVoteTotal.total != upsert.excluded.total,
+                UserVoteTotal.public_videos != upsert.excluded.public_videos
+            )
+        )
+    ).rowcount
+    
+    # Players left without public videos
+    publishers = select(Video.user_id).where(Video.is_public == True, Video.status == 'processed')
+    changed += db.execute(
+        update(UserVoteTotal)
+        .where(
+            or_(UserVoteTotal.total != 0, UserVoteTotal.public_videos != 0),
+            UserVoteTotal.user_id.not_in(publishers)
+        )
+        .values(total=0, public_videos=0)
+    ).rowcount
+    return changed
+
+
+def _reconcile_vote_buckets(db, since: datetime) -> int:
+    """Recount the video_vote_buckets from `since` on, returning the rows changed"""
+    hour = func.date_trunc("hour", Vote.voted_at)
+    counted = (
+        select(Vote.video_id, hour.label("hour"), func.count().label("votes"))
+        .where(Vote.voted_at >= since)
+        .group_by(Vote.video_id, hour)
+        .subquery()
+    )
+    pending = (
+        select(VoteCounterShard.video_id, VoteCounterShard.hour, func.sum(VoteCounterShard.delta).label("delta"))
+        .where(VoteCounterShard.hour >= since)
+        .group_by(VoteCounterShard.video_id, VoteCounterShard.hour)
+        .subquery()
+    )
+    rows = (
+        select(
+            counted.c.video_id,
+            counted.c.hour,
+            counted.c.votes - func.coalesce(pending.c.delta, 0)
+        )
+        .outerjoin(pending, and_(pending.c.video_id == counted.c.video_id, pending.c.hour == counted.c.hour))
+    )
+    upsert = insert(VideoVoteBucket).from_select(["video_id", "hour", "votes"], rows)
+    changed = db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[VideoVoteBucket.video_id, VideoVoteBucket.hour],
+            set_={"votes": upsert.excluded.votes},
+            where=VideoVoteBucket.votes != upsert.excluded.votes
+        )
+    ).rowcount
+    
+    # Buckets with no votes behind them
+    voted = exists().where(
+        Vote.video_id == VideoVoteBucket.video_id,
+        Vote.voted_at >= VideoVoteBucket.hour,
+        Vote.voted_at < VideoVoteBucket.hour + literal(timedelta(hours=1))
+    )
+    changed += db.execute(
+        update(VideoVoteBucket)
+        .where(VideoVoteBucket.hour >= since, VideoVoteBucket.votes != 0, ~voted)
+        .values(votes=0)
+    ).rowcount
+    return changed
+
+
+def _invalidate_leaderboards() -> None:
+    """Have the next ranking request rebuild the Redis boards from the reconciled counts"""
+    try:
+        redis.Redis.from_url(settings.REDIS_URL).delete(READY_KEY)
+    except redis.RedisError as e:
+        logger.warning("Could not invalidate the leaderboards: %s", e)
+
+
+@celery_app.task(name="reconcile_vote_counts")
+def reconcile_vote_counts_task():
+    """
+    Recount votes_count from the votes table to correct any drift.
+    
+    A video's count must equal its votes minus those still pending in
+    shards; videos that disagree are fixed in one statement. The
+    user_vote_totals rollup is then recomputed from the fixed counts, and
+    the video_vote_buckets of the last VOTE_BUCKET_RECONCILE_HOURS from
+    the votes cast in them. Redis scores only move up, so the leaderboards
+    are then rebuilt from Postgres, which also recovers votes whose update
+    was lost while Redis was unavailable.
+    """
+    db = SyncSessionLocal()
+    
+    try:
+        _lock_counters(db)
+        counted = (
+            select(Vote.video_id, func.count().label("votes"))
+            .group_by(Vote.video_id)
+            .subquery()
+        )
+        pending = (
+            select(VoteCounterShard.video_id, func.sum(VoteCounterShard.delta).label("delta"))
+            .group_by(VoteCounterShard.video_id)
+            .subquery()
+        )
+        expected = (
+            select(
+                Video.id,
+                (func.coalesce(counted.c.votes, 0) - func.coalesce(pending.c.delta, 0)).label("votes")
+            )
+            .outerjoin(counted, counted.c.video_id == Video.id)
+            .outerjoin(pending, pending.c.video_id == Video.id)
+            .subquery()
+        )
+        corrected = db.execute(
+            update(Video)
+            .where(Video.id == expected.c.id, Video.votes_count != expected.c.votes)
+            .values(votes_count=expected.c.votes)
+        ).rowcount
+        corrected_players = _reconcile_user_totals(db)
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        corrected_buckets = _reconcile_vote_buckets(
+            db, current_hour - timedelta(hours=settings.VOTE_BUCKET_RECONCILE_HOURS)
+        )
+        db.commit()
+        _invalidate_leaderboards()
+        
+        if corrected or corrected_players or corrected_buckets:
+            logger.warning(
+                "Corrected the vote count of %d videos, %d players and %d hourly buckets",
+                corrected, corrected_players, corrected_buckets
+            )
+        
+        return {
+            "status": "success",
+            "corrected": corrected,
+            "corrected_players": corrected_players,
+            "corrected_buckets": corrected_buckets
+        }
+    
+    finally:
+        db.close()
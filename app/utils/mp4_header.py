@@ -0,0 +1,179 @@
+import struct
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+
+# Top-level boxes that identify an ISO-BMFF (MP4) or QuickTime (MOV) file
+CONTAINER_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot'}
+
+# moov of a 60 s clip is a few hundred KB; anything bigger is not worth parsing here
+MAX_MOOV_SIZE = 8 * 1024 * 1024
+
+# Sample entry fourcc -> codec name as reported by ffprobe
+CODEC_NAMES = {
+    b'avc1': 'h264',
+    b'avc3': 'h264',
+    b'hvc1': 'hevc',
+    b'hev1': 'hevc',
+    b'av01': 'av1',
+    b'vp09': 'vp9',
+    b'mp4v': 'mpeg4',
+    b'apcn': 'prores',
+    b'apch': 'prores',
+}
+
+
+def _read_box_header(f: BinaryIO) -> Optional[Tuple[bytes, int, int]]:
+    """Read a box header at the current position: (type, header size, payload size)"""
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header)
+
+    if size == 1:
+        large = f.read(8)
+        if len(large) < 8:
+            return None
+        size = struct.unpack('>Q', large)[0]
+        # A largesize smaller than its own header would seek backwards forever
+        if size < 16:
+            return None
+        return box_type, 16, size - 16
+    if size == 0:
+        # La caja llega hasta el final del archivo
+        current = f.tell()
+        end = f.seek(0, 2)
+        f.seek(current)
+        return box_type, 8, max(end - current, 0)
+    if size < 8:
+        return None
+    return box_type, 8, size - 8
+
+
+def _children(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """Iterate child boxes inside an in-memory payload: (type, payload start, payload end)"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from('>Q', data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find(data: bytes, path: Tuple[bytes, ...], start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """Return the payload range of the first box matching a path like (b'mdia', b'hdlr')"""
+    for box_type, payload_start, payload_end in _children(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload_start, payload_end
+            return _find(data, path[1:], payload_start, payload_end)
+    return None
+
+
+def _parse_mvhd(data: bytes, start: int) -> Tuple[int, int]:
+    """Return (timescale, duration) from a movie header"""
+    version = data[start]
+    if version == 1:
+        return struct.unpack_from('>IQ', data, start + 20)
+    return struct.unpack_from('>II', data, start + 12)
+
+
+def _parse_tkhd_size(data: bytes, start: int) -> Tuple[int, int]:
+    """Return the presentation width and height (16.16 fixed point) of a track"""
+    offset = start + (88 if data[start] == 1 else 76)
+    width, height = struct.unpack_from('>II', data, offset)
+    return width >> 16, height >> 16
+
+
+def _parse_video_track(data: bytes, start: int, end: int) -> Optional[Dict]:
+    """Return codec and size of a trak box, or None if it is not a video track"""
+    hdlr = _find(data, (b'mdia', b'hdlr'), start, end)
+    if hdlr is None or data[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+        return None
+
+    width, height = 0, 0
+    tkhd = _find(data, (b'tkhd',), start, end)
+    if tkhd is not None:
+        width, height = _parse_tkhd_size(data, tkhd[0])
+
+    codec = None
+    stsd = _find(data, (b'mdia', b'minf', b'stbl', b'stsd'), start, end)
+    if stsd is not None:
+        # version/flags + entry_count, then the first visual sample entry
+        for entry_type, entry_start, entry_end in _children(data, stsd[0] + 8, stsd[1]):
+            codec = CODEC_NAMES.get(entry_type, entry_type.decode('latin-1').strip())
+            if entry_end - entry_start >= 28:
+                # Tamaño codificado, igual que el que reporta ffprobe
+                width, height = struct.unpack_from('>HH', data, entry_start + 24)
+            break
+
+    return {'width': width, 'height': height, 'codec': codec or 'unknown'}
+
+
+def read_mp4_metadata(f: BinaryIO) -> Optional[Dict]:
+    """
+    Read duration, width, height and codec from the moov box of an MP4/MOV file.
+
+    Only box headers are read until moov is found, so the cost does not depend
+    on the size of the media data. Returns None when the file is not an
+    MP4/MOV this parser understands (e.g. fragmented MP4), so callers can fall
+    back to ffprobe.
+    """
+    f.seek(0)
+    moov = None
+    first = True
+
+    try:
+        while True:
+            header = _read_box_header(f)
+            if header is None:
+                break
+            box_type, _, payload_size = header
+            if payload_size < 0:
+                return None
+            if first and box_type not in CONTAINER_BOXES:
+                return None
+            first = False
+
+            if box_type == b'moov':
+                if payload_size > MAX_MOOV_SIZE:
+                    return None
+                moov = f.read(payload_size)
+                if len(moov) < payload_size:
+                    return None
+                break
+            f.seek(payload_size, 1)
+    finally:
+        f.seek(0)
+
+    if moov is None:
+        return None
+
+    try:
+        mvhd = _find(moov, (b'mvhd',))
+        if mvhd is None:
+            return None
+        timescale, duration = _parse_mvhd(moov, mvhd[0])
+        # Fragmented files keep duration in moof boxes; leave them to ffprobe
+        if not timescale or not duration or duration == 0xFFFFFFFF:
+            return None
+
+        for box_type, start, end in _children(moov):
+            if box_type != b'trak':
+                continue
+            track = _parse_video_track(moov, start, end)
+            if track is not None:
+                return {'duration': duration / timescale, **track}
+    except (struct.error, IndexError):
+        return None
+
+    return None
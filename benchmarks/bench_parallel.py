@@ -0,0 +1,71 @@
+"""
+Compare serial and split-and-parallel body encoding.
+
+Usage:
+    python -m benchmarks.bench_parallel --duration 30 --parallelism 1 2 4 8
+
+Prints one JSON object per run with the wall time for rendering the same
+synthetic 1080p source at each degree of parallelism (1 = serial path).
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.config import settings
+from app.processing import render_video
+
+
+def make_source(path: Path, duration: int, size: str, gop: int) -> None:
+    """Generate a reproducible test clip with ffmpeg's lavfi sources"""
+    subprocess.run(
+        [settings.FFMPEG_BINARY, '-v', 'error', '-y',
+         '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=30:duration={duration}',
+         '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(gop), '-pix_fmt', 'yuv420p',
+         str(path)],
+        check=True
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=30, help="Source duration in seconds")
+    parser.add_argument('--size', default='1920x1080', help="Source resolution")
+    parser.add_argument('--gop', type=int, default=60, help="Source keyframe interval in frames")
+    parser.add_argument('--parallelism', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+    
+    logo_path = str(Path(settings.RES_PATH) / "logo720.png")
+    
+    with tempfile.TemporaryDirectory(prefix="anb_bench_") as work_dir:
+        source = Path(work_dir) / "source.mp4"
+        make_source(source, args.duration, args.size, args.gop)
+        
+        # Warm the intro/outro cache so only body encoding is measured
+        settings.PARALLEL_SEGMENTS = 1
+        render_video(str(source), str(Path(work_dir) / "warmup.mp4"), args.duration, logo_path)
+        
+        for parallelism in args.parallelism:
+            settings.PARALLEL_SEGMENTS = parallelism
+            for run in range(args.repeat):
+                output = Path(work_dir) / f"out_{parallelism}_{run}.mp4"
+                start = time.perf_counter()
+                render_video(str(source), str(output), args.duration, logo_path, engine="ffmpeg")
+                elapsed = time.perf_counter() - start
+                print(json.dumps({
+                    "benchmark": "parallel_segments",
+                    "parallelism": parallelism,
+                    "run": run,
+                    "source_duration": args.duration,
+                    "source_size": args.size,
+                    "cpu_count": os.cpu_count(),
+                    "seconds": round(elapsed, 3)
+                }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark the video processing pipeline on synthetic inputs.
+
+Usage:
+    python -m benchmarks.bench_pipeline --durations 20 40 60 --sizes 1920x1080 3840x2160 --codecs h264 hevc
+
+Runs the same steps as the Celery pipeline (probe, transcode with
+thumbnails, HLS renditions) on lavfi test clips, without RabbitMQ or
+Postgres. Each case runs in a fresh process so its peak memory is its own.
+Prints one JSON object per run with seconds per video, encode fps, peak RSS
+and the per-stage breakdown.
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+from pathlib import Path
+
+from app.core.config import settings
+from app.processing import DEFAULT_PROFILE
+
+SOURCE_ENCODERS = {
+    "h264": ["-c:v", "libx264", "-tag:v", "avc1"],
+    "hevc": ["-c:v", "libx265", "-tag:v", "hvc1", "-x265-params", "log-level=error"],
+}
+
+
+def make_source(path: Path, duration: int, size: str, codec: str) -> None:
+    """Generate a reproducible test clip with ffmpeg's lavfi sources"""
+    subprocess.run(
+        [settings.FFMPEG_BINARY, '-v', 'error', '-y',
+         '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=30:duration={duration}',
+         *SOURCE_ENCODERS[codec], '-preset', 'ultrafast', '-g', '60', '-pix_fmt', 'yuv420p',
+         str(path)],
+        check=True
+    )
+
+
+def source_for(cache_dir: Path, duration: int, size: str, codec: str) -> Path:
+    """Reuse generated clips between runs; the same parameters give the same file"""
+    path = cache_dir / f"src_{duration}s_{size}_{codec}.mp4"
+    if not path.exists():
+        tmp = path.with_name(f".{path.name}")
+        make_source(tmp, duration, size, codec)
+        tmp.rename(path)
+    return path
+
+
+def run_case(source: str, case: dict) -> dict:
+    """Process one clip like the pipeline stages do; runs in its own process"""
+    from app.core.metrics import measure_stage
+    from app.processing import render_video
+    from app.processing.hls import render_hls
+    from app.services.probe_service import probe_service
+    
+    settings.PARALLEL_SEGMENTS = case["parallelism"]
+    settings.ASSET_CACHE_ENABLED = case["asset_cache"]
+    logo_path = str(Path(settings.RES_PATH) / "logo720.png")
+    stages = {}
+    
+    with tempfile.TemporaryDirectory(prefix="anb_bench_") as work_dir:
+        output = Path(work_dir) / "out.mp4"
+        start = time.perf_counter()
+        
+        with measure_stage("bench-probe") as stats:
+            metadata = probe_service.probe_sync(source)
+        stages["probe"] = stats
+        
+        with measure_stage("bench-transcode") as stats:
+            render_video(
+                source, str(output), metadata['duration'], logo_path,
+                engine=case["engine"],
+                thumbnails_dir=str(Path(work_dir) / "thumbs") if case["thumbnails"] else None
+            )
+            output_seconds = (
+                DEFAULT_PROFILE.intro_duration
+                + min(metadata['duration'], DEFAULT_PROFILE.max_duration)
+                + DEFAULT_PROFILE.outro_duration
+            )
+            stats["frames"] = int(output_seconds * DEFAULT_PROFILE.fps)
+            stats["output_bytes"] = output.stat().st_size
+        stages["transcode"] = stats
+        
+        if case["hls"]:
+            with measure_stage("bench-renditions") as stats:
+                render_hls(str(output), str(Path(work_dir) / "hls"))
+            stages["renditions"] = stats
+        
+        seconds = time.perf_counter() - start
+    
+    transcode = stages["transcode"]
+    return {
+        "seconds": round(seconds, 3),
+        "fps": transcode.get("fps"),
+        "peak_rss_bytes": max(s["peak_rss_bytes"] for s in stages.values()),
+        "stages": {name: {k: s[k] for k in ("wall_seconds", "cpu_seconds", "fps") if k in s} for name, s in stages.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=int, nargs='+', default=[20, 40, 60], help="Source durations in seconds")
+    parser.add_argument('--sizes', nargs='+', default=['1920x1080'], help="Source resolutions, e.g. 3840x2160")
+    parser.add_argument('--codecs', nargs='+', default=['h264'], choices=sorted(SOURCE_ENCODERS))
+    parser.add_argument('--engines', nargs='+', default=['ffmpeg'], choices=['ffmpeg', 'moviepy'])
+    parser.add_argument('--parallelism', type=int, nargs='+', default=[settings.PARALLEL_SEGMENTS])
+    parser.add_argument('--no-asset-cache', action='store_true', help="Encode intro/outro on every run")
+    parser.add_argument('--no-hls', action='store_true')
+    parser.add_argument('--no-thumbnails', action='store_true')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--cache-dir', default=str(Path(tempfile.gettempdir()) / "anb_bench_sources"),
+                        help="Where generated sources are kept between runs")
+    args = parser.parse_args()
+    
+    cache_dir = Path(args.cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    for duration, size, codec, engine, parallelism in product(
+        args.durations, args.sizes, args.codecs, args.engines, args.parallelism
+    ):
+        source = source_for(cache_dir, duration, size, codec)
+        case = {
+            "engine": engine,
+            "parallelism": parallelism,
+            "asset_cache": not args.no_asset_cache,
+            "hls": not args.no_hls,
+            "thumbnails": not args.no_thumbnails,
+        }
+        
+        for run in range(args.repeat):
+            # Proceso nuevo por caso: el pico de memoria no se arrastra entre corridas
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_case, str(source), case).result()
+            
+            print(json.dumps({
+                "benchmark": "pipeline",
+                "run": run,
+                "source_duration": duration,
+                "source_size": size,
+                "source_codec": codec,
+                "cpu_count": os.cpu_count(),
+                **case,
+                **result
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
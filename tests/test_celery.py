@@ -0,0 +1,68 @@
+import logging
+import pytest
+
+from app.core.celery_app import celery_app, transcode_priority
+from app.core.config import settings
+
+
+class TestCeleryRouting:
+    
+    @pytest.mark.parametrize("task_name, queue", [
+        ("process_video", settings.CELERY_VALIDATION_QUEUE),
+        ("probe_video", settings.CELERY_VALIDATION_QUEUE),
+        ("transcode_video", settings.CELERY_TRANSCODE_QUEUE),
+        ("render_renditions", settings.CELERY_TRANSCODE_QUEUE),
+        ("finalize_video", settings.CELERY_HOUSEKEEPING_QUEUE),
+        ("dispatch_outbox", settings.CELERY_HOUSEKEEPING_QUEUE),
+    ])
+    def test_task_routes(self, task_name, queue):
+        """Test that each task goes to its dedicated queue"""
+        route = celery_app.amqp.router.route({}, task_name)
+        
+        assert route["queue"].name == queue
+    
+    def test_queues_support_priorities(self):
+        """Test that every queue is declared with a max priority"""
+        for queue in celery_app.conf.task_queues:
+            assert queue.queue_arguments["x-max-priority"] == settings.CELERY_MAX_PRIORITY
+    
+    def test_fair_prefetch(self):
+        """Test that long tasks are acked late and not prefetched"""
+        assert celery_app.conf.task_acks_late is True
+        assert celery_app.conf.worker_prefetch_multiplier == 1
+    
+    def test_short_clips_first(self):
+        """Test that shorter clips get a higher priority"""
+        assert transcode_priority(20) > transcode_priority(40) > transcode_priority(60)
+        assert transcode_priority(60) >= 1
+        assert transcode_priority(None) == settings.CELERY_MAX_PRIORITY // 2
+
+
+class TestWorkerLifecycle:
+    
+    def test_children_are_recycled(self):
+        """Test that prefork children are replaced by task count and memory"""
+        assert celery_app.conf.worker_max_tasks_per_child == settings.CELERY_MAX_TASKS_PER_CHILD
+        assert celery_app.conf.worker_max_memory_per_child == settings.CELERY_MAX_MEMORY_PER_CHILD_MB * 1024
+    
+    def test_child_gets_its_own_pool(self, tmp_path, monkeypatch):
+        """Test that worker_process_init replaces the inherited connection pool"""
+        from celery.signals import worker_process_init
+        from app.db.sync_session import sync_engine
+        
+        # The handler also reclaims scratch space; keep it off the host's /tmp
+        monkeypatch.setattr(settings, "SCRATCH_PATH", str(tmp_path))
+        inherited = sync_engine.pool
+        worker_process_init.send(sender=None)
+        
+        assert sync_engine.pool is not inherited
+    
+    def test_task_memory_is_logged(self, caplog):
+        """Test that RSS is logged after each task"""
+        from celery.signals import task_postrun
+        
+        with caplog.at_level(logging.INFO, logger="app.core.celery_app"):
+            task_postrun.send(sender=None, task_id="abc", task=celery_app.tasks["process_video"], state="SUCCESS")
+        
+        assert "process_video[abc] SUCCESS, worker rss=" in caplog.text
+
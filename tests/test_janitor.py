@@ -0,0 +1,144 @@
+import os
+import time
+import uuid
+import pytest
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models.media_asset import MediaAsset
+from app.models.upload_session import UploadSession
+from app.repositories.video_repository import video_repository
+from app.tasks.janitor_tasks import reconcile_storage_task
+
+HASH = "b" * 64
+OLD = time.time() - 3 * 24 * 3600
+
+
+def write(path, size=10, old=True):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    if old:
+        os.utime(path, (OLD, OLD))
+    return path
+
+
+def make_dir(path, old=True):
+    write(path / "master.m3u8")
+    if old:
+        os.utime(path, (OLD, OLD))
+    return path
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    return tmp_path
+
+
+async def create_video(test_db, user, file_path, status):
+    video = await video_repository.create(
+        db=test_db,
+        user_id=user.id,
+        title="Janitor Video",
+        original_filename="janitor.mp4",
+        file_path=str(file_path),
+        duration_seconds=30,
+        file_size_bytes=10,
+        status=status
+    )
+    await test_db.commit()
+    return video
+
+
+@pytest.mark.asyncio
+class TestStorageJanitor:
+    
+    async def test_orphan_uploads(self, test_db, test_user, storage):
+        """Test that uploads of deleted or failed videos are removed after the grace period"""
+        processing = write(storage / "uploads" / f"{uuid.uuid4()}.mp4")
+        failed = write(storage / "uploads" / f"{uuid.uuid4()}.mp4")
+        deleted = write(storage / "uploads" / f"{uuid.uuid4()}.mp4")
+        fresh = write(storage / "uploads" / f"{uuid.uuid4()}.mp4", old=False)
+        await create_video(test_db, test_user, processing, "processing")
+        await create_video(test_db, test_user, failed, "failed")
+        
+        result = reconcile_storage_task()
+        
+        assert processing.exists()
+        assert fresh.exists()
+        assert not failed.exists()
+        assert not deleted.exists()
+        assert result["uploads"] == {"removed": 2, "reclaimed_bytes": 20}
+    
+    async def test_abandoned_upload_sessions(self, test_db, test_user, storage):
+        """Test that stale upload sessions are deleted along with their partial files"""
+        active = UploadSession(user_id=test_user.id, title="a", original_filename="a.mp4", total_size=100)
+        stale = UploadSession(
+            user_id=test_user.id, title="b", original_filename="b.mp4", total_size=100,
+            updated_at=datetime.utcnow() - timedelta(days=3)
+        )
+        test_db.add_all([active, stale])
+        await test_db.commit()
+        # An idle but live session keeps its part file even if it is old
+        active_part = write(storage / "temp" / f"{active.id}.part")
+        stale_part = write(storage / "temp" / f"{stale.id}.part", size=30)
+        
+        foreign = write(storage / "temp" / "notes.part")
+        
+        result = reconcile_storage_task()
+        
+        assert active_part.exists()
+        assert foreign.exists()
+        assert not stale_part.exists()
+        assert result["expired_upload_sessions"] == 1
+        assert result["temp"]["reclaimed_bytes"] == 30
+    
+    async def test_processed_outputs(self, test_db, test_user, storage):
+        """Test that only outputs nothing references are removed"""
+        processed = storage / "processed"
+        cached = write(processed / f"{HASH}-720p-v1.mp4")
+        uncached = write(processed / f"{'c' * 64}-720p-v1.mp4")
+        cached_hls = make_dir(processed / "hls" / f"{HASH}-720p-v1")
+        partial = write(processed / f".{HASH}-720p-v1.mp4.partial-123")
+        legacy = write(processed / "legacy_video.mp4")
+        
+        processing = await create_video(test_db, test_user, "uploads/a.mp4", "processing")
+        failed = await create_video(test_db, test_user, "uploads/b.mp4", "failed")
+        staged_live = write(processed / f".{HASH}.{processing.id}.mp4")
+        staged_dead = make_dir(processed / "thumbs" / f".{HASH}.{failed.id}")
+        
+        test_db.add(MediaAsset(
+            content_hash=HASH, profile_version="720p-v1", duration=30, width=1280, height=720,
+            codec="h264", file_path=str(cached)
+        ))
+        await test_db.commit()
+        
+        result = reconcile_storage_task()
+        
+        assert cached.exists()
+        assert cached_hls.exists()
+        assert staged_live.exists()
+        assert legacy.exists()
+        assert not uncached.exists()
+        assert not partial.exists()
+        assert not staged_dead.exists()
+        assert result["processed"]["removed"] == 3
+        assert result["reclaimed_bytes"] == 30
+    
+    async def test_foreign_files_are_kept(self, test_db, storage):
+        """Test that names outside the storage layouts are never removed, however old"""
+        kept = [
+            write(storage / area / ".gitkeep", size=0) for area in ("uploads", "temp", "processed")
+        ] + [
+            write(storage / "uploads" / "sample.mp4"),
+            write(storage / "uploads" / f"{uuid.uuid4()}.mov"),
+            write(storage / "temp" / "scratch.bin"),
+            write(storage / "processed" / ".DS_Store"),
+            write(storage / "processed" / "thumbs" / ".gitkeep", size=0),
+        ]
+        
+        result = reconcile_storage_task()
+        
+        assert all(path.exists() for path in kept)
+        assert result["reclaimed_bytes"] == 0
+        assert all(result[area]["removed"] == 0 for area in ("uploads", "temp", "processed"))
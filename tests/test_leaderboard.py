@@ -0,0 +1,132 @@
+import pytest
+import redis
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.repositories.video_repository import video_repository
+from app.tasks.vote_tasks import reconcile_vote_counts_task
+from tests.conftest import TEST_REDIS_URL
+
+
+def redis_available() -> bool:
+    try:
+        return redis.Redis.from_url(TEST_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+requires_redis = pytest.mark.skipif(not redis_available(), reason="Redis not available")
+
+
+async def publish(client, token, video):
+    response = await client.put(f"/api/videos/{video.id}/publish", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+async def vote(client, token, video):
+    response = await client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+class TestLeaderboard:
+    
+    @requires_redis
+    async def test_rankings_follow_votes(
+        self, client: AsyncClient, test_db, test_user, test_user_token, another_test_user, another_test_user_token
+    ):
+        """Test that published videos and votes reach the global and city boards"""
+        videos = []
+        for owner in (test_user, another_test_user):
+            video = await video_repository.create(
+                db=test_db, user_id=owner.id, title="Ranked", original_filename="r.mp4",
+                file_path="storage/processed/r.mp4", duration_seconds=30, file_size_bytes=1
+            )
+            videos.append(video)
+        await test_db.commit()
+        
+        # The first request builds the boards from Postgres
+        assert (await client.get("/api/public/rankings")).json() == []
+        
+        await publish(client, test_user_token, videos[0])
+        await publish(client, another_test_user_token, videos[1])
+        await vote(client, test_user_token, videos[1])
+        await vote(client, another_test_user_token, videos[1])
+        await vote(client, test_user_token, videos[0])
+        
+        rankings = (await client.get("/api/public/rankings")).json()
+        assert [(r["position"], r["city"], r["votes"]) for r in rankings] == [
+            (1, "Medellín", 2),
+            (2, "Bogotá", 1)
+        ]
+        
+        city = (await client.get("/api/public/rankings", params={"city": "Bogotá"})).json()
+        assert [(r["position"], r["username"], r["votes"]) for r in city] == [(1, "Test User", 1)]
+    
+    @requires_redis
+    async def test_missing_boards_are_rebuilt(self, client: AsyncClient, test_db, public_test_video):
+        """Test that boards lost in Redis are rebuilt from Postgres"""
+        public_test_video.votes_count = 7
+        await test_db.commit()
+        
+        redis.Redis.from_url(TEST_REDIS_URL).flushdb()
+        rankings = (await client.get("/api/public/rankings")).json()
+        
+        assert rankings == [{"position": 1, "username": "Test User", "city": "Bogotá", "votes": 7}]
+        assert redis.Redis.from_url(TEST_REDIS_URL).zscore("leaderboard:global", str(public_test_video.id)) == 7
+    
+    @requires_redis
+    async def test_rebuild_replaces_boards(self, client: AsyncClient, test_db, public_test_video):
+        """Test that a rebuild swaps in the Postgres counts, dropping stale scores and cities"""
+        store = redis.Redis.from_url(TEST_REDIS_URL, decode_responses=True)
+        assert (await client.get("/api/public/rankings")).json()[0]["votes"] == 0
+        assert 0 < store.ttl("leaderboard:ready") <= settings.LEADERBOARD_REBUILD_SECONDS
+        
+        store.zadd("leaderboard:global", {str(public_test_video.id): 50})
+        store.zadd("leaderboard:city:Atlantis", {"gone": 1})
+        store.delete("leaderboard:ready")
+        rankings = (await client.get("/api/public/rankings")).json()
+        
+        assert [item["votes"] for item in rankings] == [0]
+        assert not store.exists("leaderboard:city:Atlantis")
+        assert not store.keys("leaderboard:rebuild:*")
+    
+    @requires_redis
+    async def test_vote_restores_missing_video(
+        self, client: AsyncClient, test_db, test_user_token, public_test_video
+    ):
+        """Test that a vote puts back a video the boards lost"""
+        assert (await client.get("/api/public/rankings")).json()[0]["votes"] == 0
+        store = redis.Redis.from_url(TEST_REDIS_URL)
+        store.hdel("leaderboard:players", str(public_test_video.id))
+        store.zrem("leaderboard:global", str(public_test_video.id))
+        store.zrem("leaderboard:city:Bogotá", str(public_test_video.id))
+        
+        await vote(client, test_user_token, public_test_video)
+        rankings = (await client.get("/api/public/rankings")).json()
+        
+        assert rankings == [{"position": 1, "username": "Test User", "city": "Bogotá", "votes": 1}]
+    
+    @requires_redis
+    async def test_reconcile_resyncs_boards(self, client: AsyncClient, test_db, test_user_token, public_test_video):
+        """Test that counts fixed by the reconciler replace the scores in Redis"""
+        await vote(client, test_user_token, public_test_video)
+        assert (await client.get("/api/public/rankings")).json()[0]["votes"] == 1
+        # Drift that ZADD GT alone would never undo
+        redis.Redis.from_url(TEST_REDIS_URL).zadd("leaderboard:global", {str(public_test_video.id): 9})
+        
+        reconcile_vote_counts_task()
+        rankings = (await client.get("/api/public/rankings")).json()
+        
+        assert [item["votes"] for item in rankings] == [1]
+    
+    async def test_rankings_without_redis(self, client: AsyncClient, test_db, public_test_video, monkeypatch):
+        """Test that rankings are served from Postgres when Redis is down"""
+        from app.services.leaderboard_service import leaderboard_service
+        
+        monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+        monkeypatch.setattr(leaderboard_service, "_client", None)
+        
+        rankings = (await client.get("/api/public/rankings")).json()
+        
+        assert rankings == [{"position": 1, "username": "Test User", "city": "Bogotá", "votes": 0}]
@@ -0,0 +1,38 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.metrics import measure_stage
+
+
+def sample(name, stage):
+    return REGISTRY.get_sample_value(name, {"stage": stage}) or 0
+
+
+class TestStageMetrics:
+    
+    def test_measure_stage_records_stats(self):
+        """Test that a stage gets timings, fps and byte counts"""
+        before = sample("video_stage_wall_seconds_count", "test-encode")
+        
+        with measure_stage("test-encode") as stats:
+            stats["frames"] = 300
+            stats["input_bytes"] = 1024
+            stats["output_bytes"] = 2048
+            sum(range(100000))
+        
+        assert stats["wall_seconds"] >= 0
+        assert stats["cpu_seconds"] >= 0
+        assert stats["peak_rss_bytes"] > 0
+        assert stats["fps"] > 0
+        assert sample("video_stage_wall_seconds_count", "test-encode") == before + 1
+        assert sample("video_stage_output_bytes_sum", "test-encode") >= 2048
+    
+    def test_failed_stage_not_recorded(self):
+        """Test that a stage that raises is left out of the histograms"""
+        before = sample("video_stage_wall_seconds_count", "test-failed")
+        
+        with pytest.raises(RuntimeError):
+            with measure_stage("test-failed"):
+                raise RuntimeError("encode failed")
+        
+        assert sample("video_stage_wall_seconds_count", "test-failed") == before
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import pytest
+import struct
+import time
+from io import BytesIO
+
+from app.core.config import settings
+from app.core.exceptions import ValidationException
+from app.services.probe_service import ProbeService
+from app.utils.mp4_header import read_mp4_metadata
+
+
+def probe_output(duration=30.0, width=1920, height=1080, codec_type="video"):
+    return json.dumps({
+        "format": {"duration": str(duration)},
+        "streams": [{"codec_type": codec_type, "codec_name": "h264", "width": width, "height": height}]
+    })
+
+
+def fake_ffprobe(tmp_path, body):
+    script = tmp_path / "ffprobe"
+    script.write_text(f"#!/bin/sh\n{body}\n")
+    script.chmod(0o755)
+    return str(script)
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def build_mp4(duration=30, timescale=1000, width=1920, height=1080, fourcc=b"avc1", moov_first=True):
+    """Minimal MP4 with a single video track"""
+    mvhd = box(b"mvhd", bytes(12) + struct.pack(">II", timescale, duration * timescale) + bytes(80))
+    tkhd = box(b"tkhd", bytes(76) + struct.pack(">II", width << 16, height << 16))
+    hdlr = box(b"hdlr", bytes(8) + b"vide" + bytes(12))
+    entry = box(fourcc, bytes(24) + struct.pack(">HH", width, height) + bytes(50))
+    stsd = box(b"stsd", bytes(4) + struct.pack(">I", 1) + entry)
+    mdia = box(b"mdia", hdlr + box(b"minf", box(b"stbl", stsd)))
+    moov = box(b"moov", mvhd + box(b"trak", tkhd + mdia))
+    ftyp = box(b"ftyp", b"isom" + bytes(4))
+    mdat = box(b"mdat", bytes(4096))
+    return ftyp + (moov + mdat if moov_first else mdat + moov)
+
+
+class TestMp4Header:
+    
+    @pytest.mark.parametrize("moov_first", [True, False])
+    def test_reads_metadata(self, moov_first):
+        """Test that moov is found before or after the media data"""
+        metadata = read_mp4_metadata(BytesIO(build_mp4(duration=42, moov_first=moov_first)))
+        
+        assert metadata == {"duration": 42.0, "width": 1920, "height": 1080, "codec": "h264"}
+    
+    def test_reads_real_file(self):
+        """Test the parser against an encoder-produced file"""
+        with open("tests/test_data/flex.mp4", "rb") as f:
+            metadata = read_mp4_metadata(f)
+        
+        assert metadata["width"] == 1280
+        assert metadata["height"] == 720
+        assert metadata["codec"] == "h264"
+        assert metadata["duration"] == pytest.approx(61.2, abs=0.1)
+    
+    def test_unknown_container(self):
+        """Test that non-MP4 data is left to ffprobe"""
+        assert read_mp4_metadata(BytesIO(b"\x1aE\xdf\xa3" + bytes(1024))) is None
+        assert read_mp4_metadata(BytesIO(bytes(1024))) is None
+    
+    @pytest.mark.parametrize("largesize", [0, 8, 15])
+    def test_truncated_largesize(self, largesize):
+        """Test that a 64-bit box size smaller than its header is rejected instead of looping"""
+        header = struct.pack('>I4sQ', 1, b'ftyp', largesize) + bytes(64)
+        assert read_mp4_metadata(BytesIO(header)) is None
+        
+        after_ftyp = box(b'ftyp', b'isom') + struct.pack('>I4sQ', 1, b'free', largesize) + bytes(64)
+        assert read_mp4_metadata(BytesIO(after_ftyp)) is None
+    
+    def test_missing_duration(self):
+        """Test that fragmented files without a movie duration are left to ffprobe"""
+        assert read_mp4_metadata(BytesIO(build_mp4(duration=0))) is None
+    
+    def test_rewinds_file(self):
+        """Test that the file position is reset for the caller"""
+        f = BytesIO(build_mp4(moov_first=False))
+        read_mp4_metadata(f)
+        
+        assert f.tell() == 0
+    
+    def test_probe_skips_ffprobe_for_mp4(self, tmp_path, monkeypatch):
+        """Test that MP4 files are validated without starting ffprobe"""
+        video = tmp_path / "video.mp4"
+        video.write_bytes(build_mp4(fourcc=b"hvc1"))
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", str(tmp_path / "missing-ffprobe"))
+        
+        assert ProbeService().probe_sync(str(video))["codec"] == "hevc"
+
+
+class TestProbeParsing:
+    
+    def test_parse_valid_metadata(self):
+        """Test that a valid 1080p clip returns its metadata"""
+        metadata = ProbeService().parse(probe_output())
+        
+        assert metadata == {"duration": 30.0, "width": 1920, "height": 1080, "codec": "h264"}
+    
+    @pytest.mark.parametrize("duration", [10.0, 75.0])
+    def test_parse_rejects_duration(self, duration):
+        """Test that clips outside 20-60 seconds are rejected"""
+        with pytest.raises(ValidationException, match="duration"):
+            ProbeService().parse(probe_output(duration=duration))
+    
+    def test_parse_rejects_low_resolution(self):
+        """Test that clips below 1080p are rejected"""
+        with pytest.raises(ValidationException, match="1080p"):
+            ProbeService().parse(probe_output(width=1280, height=720))
+    
+    def test_parse_requires_video_stream(self):
+        """Test that audio-only files are rejected"""
+        with pytest.raises(ValidationException, match="No video stream"):
+            ProbeService().parse(probe_output(codec_type="audio"))
+
+
+@pytest.mark.asyncio
+class TestAsyncProbe:
+    
+    async def test_probe_runs_ffprobe(self, tmp_path, monkeypatch):
+        """Test that the async probe parses the subprocess output"""
+        (tmp_path / "out.json").write_text(probe_output())
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, f"cat {tmp_path / 'out.json'}"))
+        
+        metadata = await ProbeService().probe("video.mp4")
+        
+        assert metadata["height"] == 1080
+    
+    async def test_probe_failure(self, tmp_path, monkeypatch):
+        """Test that a failing ffprobe is reported as an invalid file"""
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, "exit 1"))
+        
+        with pytest.raises(ValidationException, match="Unable to process"):
+            await ProbeService().probe("video.mp4")
+    
+    async def test_probe_timeout_kills_process(self, tmp_path, monkeypatch):
+        """Test that a hung ffprobe is killed once the timeout expires"""
+        pid_file = tmp_path / "pid"
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, f"echo $$ > {pid_file}; exec sleep 30"))
+        monkeypatch.setattr(settings, "PROBE_TIMEOUT_SECONDS", 1)
+        
+        with pytest.raises(ValidationException, match="timeout"):
+            await ProbeService().probe("video.mp4")
+        
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid_file.read_text()), 0)
+    
+    async def test_probe_does_not_block_event_loop(self, tmp_path, monkeypatch):
+        """Test that other coroutines keep running while a probe is in flight"""
+        (tmp_path / "out.json").write_text(probe_output())
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, f"sleep 1; cat {tmp_path / 'out.json'}"))
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.05)
+        
+        task = asyncio.create_task(ticker())
+        await ProbeService().probe("video.mp4")
+        task.cancel()
+        
+        assert ticks > 5
+    
+    async def test_probe_concurrency_is_bounded(self, tmp_path, monkeypatch):
+        """Test that no more than PROBE_CONCURRENCY probes run at the same time"""
+        (tmp_path / "out.json").write_text(probe_output())
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, f"sleep 0.5; cat {tmp_path / 'out.json'}"))
+        monkeypatch.setattr(settings, "PROBE_CONCURRENCY", 2)
+        service = ProbeService()
+        
+        started = time.monotonic()
+        await asyncio.gather(*(service.probe("video.mp4") for _ in range(4)))
+        
+        assert time.monotonic() - started >= 1.0
+    
+    async def test_probe_cancellation_kills_process(self, tmp_path, monkeypatch):
+        """Test that cancelling the caller also kills ffprobe"""
+        pid_file = tmp_path / "pid"
+        monkeypatch.setattr(settings, "FFPROBE_BINARY", fake_ffprobe(tmp_path, f"echo $$ > {pid_file}; exec sleep 30"))
+        
+        task = asyncio.create_task(ProbeService().probe("video.mp4"))
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid_file.read_text()), 0)
@@ -0,0 +1,340 @@
+import os
+import pytest
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from app.core.config import settings
+from app.processing import DEFAULT_PROFILE, ProcessingError, render_video
+from app.processing.assets import get_segment
+from app.processing.ffmpeg_engine import (
+    build_body_graph,
+    build_ffmpeg_command,
+    build_filter_graph,
+    split_points
+)
+from app.processing import ffmpeg_utils
+from app.processing.ffmpeg_utils import (
+    base_args,
+    build_concat_command,
+    kill_orphaned_groups,
+    kill_running,
+    run_ffmpeg
+)
+from app.processing.hls import HLS_LADDER, build_hls_command, ladder_for, render_hls
+from app.processing.profile import ProcessingProfile
+from app.processing.thumbnails import build_thumbnail_graph, poster_time
+
+
+LOGO_PATH = str(Path(settings.RES_PATH) / "logo720.png")
+requires_ffmpeg = pytest.mark.skipif(shutil.which(settings.FFMPEG_BINARY) is None, reason="ffmpeg not installed")
+
+
+class TestFfmpegEngine:
+    
+    def test_command_trims_long_videos(self):
+        """Test that the source input is cut to the maximum duration"""
+        cmd = build_ffmpeg_command("in.mp4", "out.mp4", 55.0, LOGO_PATH)
+        
+        source_index = cmd.index("in.mp4")
+        assert cmd[source_index - 3:source_index - 1] == ["-t", str(DEFAULT_PROFILE.max_duration)]
+    
+    def test_command_keeps_short_videos(self):
+        """Test that videos under the limit are not trimmed further"""
+        cmd = build_ffmpeg_command("in.mp4", "out.mp4", 21.5, LOGO_PATH)
+        
+        source_index = cmd.index("in.mp4")
+        assert cmd[source_index - 2] == "21.5"
+    
+    def test_command_is_single_invocation_without_audio(self):
+        """Test that the whole composition is one filter graph with audio dropped"""
+        cmd = build_ffmpeg_command("in.mp4", "out.mp4", 25.0, LOGO_PATH)
+        
+        assert cmd.count("-filter_complex") == 1
+        assert "-an" in cmd
+        assert cmd[cmd.index("-map") + 1] == "[out]"
+        assert cmd[-1] == "out.mp4"
+    
+    def test_filter_graph_composition(self):
+        """Test that the graph scales, fades, overlays and concatenates"""
+        graph = build_filter_graph(25.0)
+        
+        assert f"scale={DEFAULT_PROFILE.width}:{DEFAULT_PROFILE.height}" in graph
+        assert f"colorchannelmixer=aa={DEFAULT_PROFILE.watermark_opacity}" in graph
+        assert "overlay=" in graph
+        assert "concat=n=3:v=1:a=0[out]" in graph
+    
+    def test_unknown_engine(self):
+        """Test that an unknown engine name is rejected"""
+        with pytest.raises(ProcessingError):
+            render_video("in.mp4", "out.mp4", 25.0, LOGO_PATH, engine="unknown")
+    
+    def test_concat_is_stream_copy(self):
+        """Test that joining cached segments does not re-encode"""
+        cmd = build_concat_command("segments.txt", "out.mp4")
+        
+        assert cmd[cmd.index("-c") + 1] == "copy"
+    
+    @requires_ffmpeg
+    def test_render_video(self, tmp_path, monkeypatch):
+        """Test rendering a synthetic clip end to end"""
+        monkeypatch.setattr(settings, "RES_PATH", str(tmp_path / "res"))
+        source = tmp_path / "source.mp4"
+        subprocess.run(
+            [settings.FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi",
+             "-i", "testsrc=size=1920x1080:rate=30:duration=3", str(source)],
+            check=True
+        )
+        output = tmp_path / "output.mp4"
+        
+        thumbnails = render_video(
+            str(source), str(output), 3.0, LOGO_PATH, engine="ffmpeg",
+            thumbnails_dir=str(tmp_path / "thumbs")
+        )
+        
+        assert output.exists()
+        assert output.stat().st_size > 0
+        for path in (thumbnails.poster, thumbnails.preview, thumbnails.sprite):
+            assert Path(path).stat().st_size > 0
+
+
+    @requires_ffmpeg
+    def test_run_ffmpeg_reports_progress(self, tmp_path):
+        """Test that run_ffmpeg forwards the seconds encoded so far"""
+        seen = []
+        run_ffmpeg(base_args() + [
+            '-f', 'lavfi', '-i', 'testsrc2=s=320x240:d=3',
+            '-c:v', 'libx264', '-preset', 'ultrafast', str(tmp_path / "out.mp4")
+        ], seen.append)
+        
+        assert seen
+        assert seen[-1] == pytest.approx(3.0, abs=0.1)
+    
+    @requires_ffmpeg
+    def test_run_ffmpeg_progress_error(self, tmp_path):
+        """Test that failures are still reported when progress is followed"""
+        with pytest.raises(ProcessingError, match="ffmpeg failed"):
+            run_ffmpeg(base_args() + ['-i', str(tmp_path / "missing.mp4"), str(tmp_path / "out.mp4")], lambda s: None)
+    
+    @requires_ffmpeg
+    def test_run_ffmpeg_interrupted_is_reaped(self, tmp_path):
+        """Test that ffmpeg is killed when the caller is interrupted mid-encode"""
+        class Interrupted(Exception):
+            pass
+        
+        def stop(seconds):
+            raise Interrupted()
+        
+        with pytest.raises(Interrupted):
+            run_ffmpeg(base_args() + [
+                '-re', '-f', 'lavfi', '-i', 'testsrc2=s=320x240:d=60',
+                '-c:v', 'libx264', '-preset', 'ultrafast', str(tmp_path / "out.mp4")
+            ], stop)
+        
+        assert not ffmpeg_utils._running
+    
+    @requires_ffmpeg
+    def test_kill_running_reaches_other_threads(self, tmp_path):
+        """Test that a timed-out task can kill encodes started by pool threads"""
+        errors = []
+        
+        def encode():
+            try:
+                run_ffmpeg(base_args() + [
+                    '-re', '-f', 'lavfi', '-i', 'testsrc2=s=320x240:d=60',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', str(tmp_path / "out.mp4")
+                ])
+            except ProcessingError as e:
+                errors.append(e)
+        
+        worker = threading.Thread(target=encode)
+        worker.start()
+        while not ffmpeg_utils._running:
+            time.sleep(0.05)
+        
+        process = next(iter(ffmpeg_utils._running))
+        assert os.getpgid(process.pid) == process.pid
+        assert kill_running() == 1
+        worker.join(timeout=10)
+        
+        assert not worker.is_alive()
+        assert errors
+        assert not list(ffmpeg_utils.scratch_root().glob(f"{ffmpeg_utils.GROUP_PREFIX}*"))
+    
+    def test_kill_orphaned_groups_of_dead_workers(self, tmp_path, monkeypatch):
+        """Test that a new worker child kills encodes left by a sibling that died"""
+        monkeypatch.setattr(settings, "SCRATCH_PATH", str(tmp_path))
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        orphan = subprocess.Popen(["sleep", "60"], start_new_session=True)
+        live = subprocess.Popen(["sleep", "60"], start_new_session=True)
+        orphan_marker = tmp_path / f"{ffmpeg_utils.GROUP_PREFIX}{dead.pid}-{orphan.pid}"
+        live_marker = tmp_path / f"{ffmpeg_utils.GROUP_PREFIX}{os.getpid()}-{live.pid}"
+        orphan_marker.write_text(ffmpeg_utils._start_time(orphan.pid))
+        live_marker.write_text(ffmpeg_utils._start_time(live.pid))
+        
+        try:
+            assert kill_orphaned_groups() == 1
+            assert orphan.wait(timeout=5) == -9
+            assert live.poll() is None
+            assert not orphan_marker.exists()
+            assert live_marker.exists()
+        finally:
+            live.kill()
+            live.wait()
+    
+    def test_kill_orphaned_groups_skips_recycled_pids(self, tmp_path, monkeypatch):
+        """Test that a stale marker whose pid now leads another group is not killed"""
+        monkeypatch.setattr(settings, "SCRATCH_PATH", str(tmp_path))
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        # Same pid as the marker, but started after it was written
+        recycled = subprocess.Popen(["sleep", "60"], start_new_session=True)
+        marker = tmp_path / f"{ffmpeg_utils.GROUP_PREFIX}{dead.pid}-{recycled.pid}"
+        marker.write_text(str(int(ffmpeg_utils._start_time(recycled.pid)) - 1))
+        
+        try:
+            assert kill_orphaned_groups() == 0
+            assert recycled.poll() is None
+            assert not marker.exists()
+        finally:
+            recycled.kill()
+            recycled.wait()
+
+
+class TestParallelSegments:
+    
+    def test_split_points_even(self):
+        """Test that the body is cut into evenly spaced pieces"""
+        assert split_points(30.0, 3, 5.0) == [10.0, 20.0]
+    
+    def test_split_points_respects_minimum(self):
+        """Test that short videos use fewer pieces"""
+        assert split_points(12.0, 8, 5.0) == [6.0]
+        assert split_points(8.0, 4, 5.0) == []
+    
+    def test_only_first_piece_fades_in(self):
+        """Test that later pieces do not repeat the fade in"""
+        assert "fade=" in build_body_graph(fade_in=True)
+        assert "fade=" not in build_body_graph(fade_in=False)
+    
+    @requires_ffmpeg
+    def test_parallel_render_keeps_duration(self, tmp_path, monkeypatch):
+        """Test that a parallel render has the same frame count as the serial one"""
+        monkeypatch.setattr(settings, "RES_PATH", str(tmp_path / "res"))
+        monkeypatch.setattr(settings, "PARALLEL_MIN_SEGMENT_SECONDS", 2.0)
+        source = tmp_path / "source.mp4"
+        subprocess.run(
+            [settings.FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi",
+             "-i", "testsrc=size=640x360:rate=30:duration=6", "-g", "30", str(source)],
+            check=True
+        )
+        
+        frame_counts = []
+        for parallelism in (1, 3):
+            monkeypatch.setattr(settings, "PARALLEL_SEGMENTS", parallelism)
+            output = tmp_path / f"output_{parallelism}.mp4"
+            render_video(str(source), str(output), 6.0, LOGO_PATH, engine="ffmpeg")
+            frames = subprocess.run(
+                [settings.FFMPEG_BINARY, "-v", "error", "-i", str(output), "-f", "framemd5", "-"],
+                check=True, capture_output=True, text=True
+            ).stdout
+            frame_counts.append(len([line for line in frames.splitlines() if not line.startswith("#")]))
+        
+        assert frame_counts[0] == frame_counts[1]
+
+
+@requires_ffmpeg
+class TestAssetCache:
+    
+    def test_segment_is_rendered_once(self, tmp_path, monkeypatch):
+        """Test that a cached segment is reused instead of rendered again"""
+        monkeypatch.setattr(settings, "RES_PATH", str(tmp_path))
+        
+        first = get_segment("intro", LOGO_PATH)
+        mtime = first.stat().st_mtime_ns
+        second = get_segment("intro", LOGO_PATH)
+        
+        assert first == second
+        assert second.stat().st_mtime_ns == mtime
+    
+    def test_segment_invalidated_when_logo_changes(self, tmp_path, monkeypatch):
+        """Test that a new logo produces a new segment and drops the old one"""
+        monkeypatch.setattr(settings, "RES_PATH", str(tmp_path))
+        logo = tmp_path / "logo.png"
+        logo.write_bytes(Path(LOGO_PATH).read_bytes())
+        
+        old = get_segment("outro", str(logo))
+        
+        subprocess.run(
+            [settings.FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi",
+             "-i", "color=c=red:size=640x360", "-frames:v", "1", str(logo)],
+            check=True
+        )
+        new = get_segment("outro", str(logo))
+        
+        assert new != old
+        assert new.exists()
+        assert not old.exists()
+
+
+class TestHls:
+    
+    def test_ladder_never_upscales(self):
+        """Test that renditions above the processed height are dropped"""
+        assert [r.name for r in ladder_for(DEFAULT_PROFILE)] == ["360p", "480p", "720p"]
+        assert [r.name for r in ladder_for(ProcessingProfile(width=854, height=480))] == ["360p", "480p"]
+    
+    def test_command_maps_every_rendition(self):
+        """Test that all renditions are encoded in one pass with a master playlist"""
+        cmd = build_hls_command("in.mp4", "out", HLS_LADDER)
+        
+        assert cmd.count("-map") == len(HLS_LADDER)
+        assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,name:360p v:1,name:480p v:2,name:720p"
+        assert cmd[cmd.index("-master_pl_name") + 1] == "master.m3u8"
+    
+    @requires_ffmpeg
+    def test_render_hls(self, tmp_path):
+        """Test producing the ladder from a processed clip"""
+        source = tmp_path / "processed.mp4"
+        subprocess.run(
+            [settings.FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi",
+             "-i", "testsrc=size=1280x720:rate=30:duration=5", str(source)],
+            check=True
+        )
+        
+        master = Path(render_hls(str(source), str(tmp_path / "hls" / "video")))
+        
+        assert master.exists()
+        for rendition in HLS_LADDER:
+            assert (master.parent / rendition.name / "index.m3u8").exists()
+            assert list((master.parent / rendition.name).glob("segment_*.ts"))
+        assert not (tmp_path / "hls" / ".video.tmp").exists()
+
+
+class TestThumbnails:
+    
+    def test_poster_after_fade(self):
+        """Test that the poster frame is taken once the fade in is over"""
+        assert poster_time(30.0) == DEFAULT_PROFILE.fade_duration + 1.0
+        assert poster_time(2.0) == 1.0
+    
+    def test_thumbnails_share_body_decode(self):
+        """Test that the body command writes thumbnails from the same process"""
+        from app.processing.ffmpeg_engine import build_body_command
+        
+        cmd = build_body_command("in.mp4", "body.mp4", 25.0, LOGO_PATH, thumbnails_dir="thumbs")
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        
+        assert cmd.count("-i") == 2
+        assert "[out_all]split=2[out][out_thumbs]" in graph
+        assert cmd[-1] == str(Path("thumbs") / "sprite.jpg")
+    
+    def test_sprite_covers_body(self):
+        """Test that the sprite samples the whole body into one tile sheet"""
+        graph = build_thumbnail_graph("0:v", 25.0, start_offset=2.5)
+        
+        assert "trim=start=2.5:end=27.5" in graph
+        assert "tile=5x5" in graph
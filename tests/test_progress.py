@@ -0,0 +1,83 @@
+import json
+import pytest
+from httpx import AsyncClient
+
+from app.services.progress_service import ProgressService, progress_service
+
+
+def parse_events(body: str):
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+class TestProgressReporter:
+    
+    def test_reporter_throttles_updates(self, monkeypatch):
+        """Test that only whole-percent increases are published"""
+        service = ProgressService()
+        published = []
+        monkeypatch.setattr(service, "publish", lambda *args: published.append(args))
+        
+        report = service.reporter("video-1", "transcode", min_interval=0)
+        for fraction in (0.001, 0.004, 0.25, 0.25, 0.2, 1.0):
+            report(fraction)
+        
+        assert [args[3] for args in published] == [0, 25, 100]
+        assert all(args[1:3] == ("processing", "transcode") for args in published)
+    
+    def test_publish_without_redis(self, monkeypatch):
+        """Test that an unreachable Redis never breaks processing"""
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+        
+        ProgressService().publish("video-1", "processing", "probe", 0)
+
+
+@pytest.mark.asyncio
+class TestProgressStream:
+    
+    async def test_stream_finished_video(self, client: AsyncClient, test_user_token, test_video):
+        """Test that a processed video returns its state and closes the stream"""
+        response = await client.get(
+            f"/api/videos/{test_video.id}/events",
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [event["status"] for event in parse_events(response.text)] == ["processed"]
+    
+    async def test_stream_live_updates(self, client: AsyncClient, test_user_token, test_video, test_db, monkeypatch):
+        """Test that worker updates are forwarded until a terminal status"""
+        test_video.status = "processing"
+        await test_db.commit()
+        
+        async def listen(video_id):
+            yield {"video_id": video_id, "status": "processing", "stage": "transcode", "percent": 40}
+            yield None
+            yield {"video_id": video_id, "status": "processed", "stage": "finalize", "percent": 100}
+        
+        monkeypatch.setattr(progress_service, "listen", listen)
+        
+        response = await client.get(
+            f"/api/videos/{test_video.id}/events",
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        events = parse_events(response.text)
+        assert [event["status"] for event in events] == ["processing", "processing", "processed"]
+        assert events[1]["percent"] == 40
+        assert ": keepalive" in response.text
+    
+    async def test_stream_not_owner(self, client: AsyncClient, another_test_user_token, test_video):
+        """Test that only the owner can follow a video's progress"""
+        response = await client.get(
+            f"/api/videos/{test_video.id}/events",
+            headers={"Authorization": f"Bearer {another_test_user_token}"}
+        )
+        
+        assert response.status_code == 403
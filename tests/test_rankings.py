@@ -1,5 +1,36 @@
+import asyncio
 import pytest
+from datetime import datetime, timedelta
 from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.models.video_vote_bucket import VideoVoteBucket
+from app.repositories.video_repository import video_repository
+from app.tasks.vote_tasks import flush_vote_counters_task, reconcile_vote_counts_task
+from tests.conftest import TEST_DATABASE_URL
+
+
+async def create_videos(test_db, owner, count):
+    videos = []
+    for i in range(count):
+        videos.append(await video_repository.create(
+            db=test_db, user_id=owner.id, title=f"Clip {i}", original_filename="clip.mp4",
+            file_path="storage/processed/clip.mp4", duration_seconds=30, file_size_bytes=1
+        ))
+    await test_db.commit()
+    return videos
+
+
+async def publish(client, token, video):
+    response = await client.put(f"/api/videos/{video.id}/publish", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+async def vote(client, token, video):
+    response = await client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
 
 
 @pytest.mark.asyncio
@@ -79,4 +110,144 @@ class TestRankings:
         # Verify private video is not in the list
         video_ids = [v["video_id"] for v in data]
         assert str(test_video.id) not in video_ids
-        assert str(public_test_video.id) in video_ids
\ No newline at end of file
+        assert str(public_test_video.id) in video_ids
+    
+    async def test_list_public_videos_hls_url(self, client: AsyncClient, public_test_video, test_db):
+        """Test that the HLS master playlist is exposed as a storage URL"""
+        public_test_video.hls_path = "storage/processed/hls/public_test/master.m3u8"
+        await test_db.commit()
+        
+        response = await client.get("/api/public/videos")
+        
+        assert response.status_code == 200
+        video = response.json()[0]
+        assert video["hls_url"] == "/storage/processed/hls/public_test/master.m3u8"
+
+    
+    async def test_list_public_videos_thumbnail_urls(self, client: AsyncClient, public_test_video, test_db):
+        """Test that thumbnail URLs are returned for processed videos"""
+        public_test_video.poster_path = "storage/processed/thumbs/public_test/poster.jpg"
+        public_test_video.preview_path = "storage/processed/thumbs/public_test/preview.webp"
+        public_test_video.sprite_path = "storage/processed/thumbs/public_test/sprite.jpg"
+        await test_db.commit()
+        
+        response = await client.get("/api/public/videos")
+        
+        assert response.status_code == 200
+        video = response.json()[0]
+        assert video["poster_url"] == "/storage/processed/thumbs/public_test/poster.jpg"
+        assert video["preview_url"] == "/storage/processed/thumbs/public_test/preview.webp"
+        assert video["sprite_url"] == "/storage/processed/thumbs/public_test/sprite.jpg"
+    
+    async def test_user_rankings_sum_all_videos(
+        self, client: AsyncClient, test_db, test_user, test_user_token, another_test_user, another_test_user_token
+    ):
+        """Test that players are ranked by the votes of all their public videos"""
+        first, second = await create_videos(test_db, test_user, 2)
+        (other,) = await create_videos(test_db, another_test_user, 1)
+        for video, token in ((first, test_user_token), (second, test_user_token), (other, another_test_user_token)):
+            await publish(client, token, video)
+        # Publishing twice must not count the video twice
+        await publish(client, test_user_token, first)
+        
+        await vote(client, test_user_token, first)
+        await vote(client, another_test_user_token, second)
+        await vote(client, another_test_user_token, other)
+        flush_vote_counters_task()
+        
+        response = await client.get("/api/public/rankings/users")
+        
+        assert response.status_code == 200
+        assert [(r["position"], r["username"], r["votes"]) for r in response.json()] == [
+            (1, "Test User", 2),
+            (2, "Another User", 1)
+        ]
+        
+        city = (await client.get("/api/public/rankings/users", params={"city": "Medellín"})).json()
+        assert [(r["username"], r["city"]) for r in city] == [("Another User", "Medellín")]
+    
+    async def test_concurrent_publish_counts_once(self, test_db, test_user):
+        """Test that only one of two simultaneous publish requests adds the video to the player's total"""
+        (video,) = await create_videos(test_db, test_user, 1)
+        engine = create_async_engine(TEST_DATABASE_URL)
+        
+        async def publish_once():
+            async with AsyncSession(engine) as session:
+                votes = await video_repository.mark_public(session, video.id)
+                await asyncio.sleep(0.1)
+                await session.commit()
+                return votes
+        
+        results = await asyncio.gather(publish_once(), publish_once())
+        await engine.dispose()
+        
+        assert sorted(results, key=lambda votes: votes is None) == [0, None]
+    
+    async def test_reconcile_rebuilds_user_totals(self, client: AsyncClient, test_db, test_user, public_test_video):
+        """Test that the reconciler fills the rollup for videos it has not seen"""
+        assert (await client.get("/api/public/rankings/users")).json() == []
+        
+        public_test_video.votes_count = 3
+        await test_db.commit()
+        result = reconcile_vote_counts_task()
+        
+        # votes_count had no vote rows behind it, so it is recounted to 0 first
+        assert result["corrected_players"] == 1
+        rankings = (await client.get("/api/public/rankings/users")).json()
+        assert [(r["username"], r["votes"]) for r in rankings] == [("Test User", 0)]
+    
+    async def test_windowed_rankings_sum_buckets(
+        self, client: AsyncClient, test_db, test_user, test_user_token, another_test_user_token, public_test_video
+    ):
+        """Test that daily, weekly and season rankings only count the buckets of their window"""
+        (recent,) = await create_videos(test_db, test_user, 1)
+        await publish(client, test_user_token, recent)
+        await vote(client, test_user_token, recent)
+        await vote(client, another_test_user_token, recent)
+        await vote(client, another_test_user_token, public_test_video)
+        flush_vote_counters_task()
+        
+        # Votes cast before the window of each ranking
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        test_db.add(VideoVoteBucket(video_id=public_test_video.id, hour=current_hour - timedelta(days=3), votes=4))
+        test_db.add(VideoVoteBucket(video_id=public_test_video.id, hour=current_hour - timedelta(days=30), votes=10))
+        await test_db.commit()
+        
+        async def ranked(**params):
+            response = await client.get("/api/public/rankings", params=params)
+            assert response.status_code == 200
+            return [(r["position"], r["votes"]) for r in response.json()]
+        
+        assert await ranked(window="daily") == [(1, 2), (2, 1)]
+        assert await ranked(window="weekly") == [(1, 5), (2, 2)]
+        assert await ranked(window="season") == [(1, 15), (2, 2)]
+        assert await ranked(window="daily", city="Medellín") == []
+        
+        settings.RANKING_SEASON_START = current_hour - timedelta(days=7)
+        try:
+            assert await ranked(window="season") == [(1, 5), (2, 2)]
+        finally:
+            settings.RANKING_SEASON_START = None
+    
+    async def test_windowed_rankings_invalid_window(self, client: AsyncClient):
+        """Test that an unknown window is rejected"""
+        response = await client.get("/api/public/rankings", params={"window": "monthly"})
+        
+        assert response.status_code == 400
+    
+    async def test_reconcile_fixes_vote_buckets(self, client: AsyncClient, test_db, test_user_token, public_test_video):
+        """Test that the reconciler recounts recent buckets from the votes table"""
+        await vote(client, test_user_token, public_test_video)
+        flush_vote_counters_task()
+        
+        bucket = (await test_db.execute(select(VideoVoteBucket))).scalar_one()
+        bucket.votes = 7
+        stale = VideoVoteBucket(video_id=public_test_video.id, hour=bucket.hour - timedelta(hours=5), votes=3)
+        test_db.add(stale)
+        await test_db.commit()
+        
+        assert reconcile_vote_counts_task()["corrected_buckets"] == 2
+        await test_db.refresh(bucket)
+        await test_db.refresh(stale)
+        assert (bucket.votes, stale.votes) == (1, 0)
+        assert reconcile_vote_counts_task()["corrected_buckets"] == 0
@@ -0,0 +1,79 @@
+import errno
+import os
+import subprocess
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.storage import scratch
+from app.storage.scratch import move_into_storage, purge_stale_scratch, scratch_dir
+
+
+@pytest.fixture
+def scratch_path(tmp_path, monkeypatch):
+    path = tmp_path / "scratch"
+    monkeypatch.setattr(settings, "SCRATCH_PATH", str(path))
+    return path
+
+
+class TestScratch:
+    
+    def test_scratch_dir_removed_on_error(self, scratch_path):
+        """Test that intermediates are cleaned up even when the encode fails"""
+        with pytest.raises(RuntimeError):
+            with scratch_dir("transcode") as work:
+                (work / "video.mp4").write_bytes(b"partial")
+                raise RuntimeError("encode failed")
+        
+        assert not work.exists()
+        assert list(scratch_path.iterdir()) == []
+    
+    def test_purge_only_dead_processes(self, scratch_path):
+        """Test that scratch left by killed workers is reclaimed, live ones are kept"""
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        stale = scratch_path / f"anb-{dead.pid}-render-x"
+        stale.mkdir(parents=True)
+        (stale / "body.mp4").write_bytes(b"x" * 100)
+        live = scratch_path / f"anb-{os.getpid()}-render-y"
+        live.mkdir()
+        
+        assert purge_stale_scratch() == 100
+        assert not stale.exists()
+        assert live.exists()
+    
+    def test_move_replaces_existing_directory(self, tmp_path):
+        """Test that a rendered folder replaces an older one in place"""
+        source = tmp_path / "work" / "hls"
+        source.mkdir(parents=True)
+        (source / "master.m3u8").write_text("new")
+        target = tmp_path / "processed" / "hls" / "video"
+        target.mkdir(parents=True)
+        (target / "old.ts").write_text("old")
+        
+        move_into_storage(source, target)
+        
+        assert [p.name for p in target.iterdir()] == ["master.m3u8"]
+        assert not source.exists()
+    
+    def test_move_across_filesystems(self, tmp_path):
+        """Test that tmpfs outputs are copied to a hidden name and renamed into place"""
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b"video")
+        target = tmp_path / "processed" / "video.mp4"
+        replace = os.replace
+        renames = []
+        
+        def cross_device(src, dst):
+            if src == source:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            renames.append((src, dst))
+            replace(src, dst)
+        
+        with patch.object(scratch.os, "replace", side_effect=cross_device):
+            move_into_storage(source, target)
+        
+        assert target.read_bytes() == b"video"
+        assert renames[0][0].name.startswith(".video.mp4.partial-")
+        assert not source.exists()
+        assert [p.name for p in target.parent.iterdir()] == ["video.mp4"]
@@ -0,0 +1,188 @@
+import pytest
+from httpx import AsyncClient
+from pathlib import Path
+from unittest.mock import patch
+
+from app.storage.file_service import fileservice
+
+
+@pytest.mark.asyncio
+class TestResumableUploads:
+    
+    async def _create_session(self, client: AsyncClient, token: str, total_size: int) -> str:
+        response = await client.post(
+            "/api/videos/uploads",
+            json={"title": "Resumable Video", "filename": "resumable.mp4", "total_size": total_size},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+        return response.json()["upload_id"]
+    
+    async def test_create_upload_session(self, client: AsyncClient, test_user_token):
+        """Test creating a resumable upload session"""
+        response = await client.post(
+            "/api/videos/uploads",
+            json={"title": "Resumable Video", "filename": "resumable.mp4", "total_size": 1024},
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert "upload_id" in data
+        assert data["offset"] == 0
+        assert data["total_size"] == 1024
+    
+    async def test_create_upload_session_too_large(self, client: AsyncClient, test_user_token):
+        """Test creating a session bigger than the size limit"""
+        response = await client.post(
+            "/api/videos/uploads",
+            json={"title": "Huge", "filename": "huge.mp4", "total_size": 10 * 1024 * 1024 * 1024},
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 400
+    
+    async def test_create_upload_session_without_auth(self, client: AsyncClient):
+        """Test creating a session without authentication"""
+        response = await client.post(
+            "/api/videos/uploads",
+            json={"title": "Resumable Video", "filename": "resumable.mp4", "total_size": 1024}
+        )
+        
+        assert response.status_code == 401
+    
+    async def test_resume_and_complete_upload(self, client: AsyncClient, test_user_token, mock_celery):
+        """Test uploading in chunks, resuming from the reported offset and finishing"""
+        content = b"0123456789" * 100
+        upload_id = await self._create_session(client, test_user_token, len(content))
+        headers = {"Authorization": f"Bearer {test_user_token}"}
+        
+        response = await client.patch(
+            f"/api/videos/uploads/{upload_id}",
+            content=content[:400],
+            headers={**headers, "Upload-Offset": "0"}
+        )
+        assert response.status_code == 200
+        assert response.json()["offset"] == 400
+        
+        # Client lost track of its position and asks the server
+        response = await client.get(f"/api/videos/uploads/{upload_id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["offset"] == 400
+        assert response.headers["Upload-Offset"] == "400"
+        
+        response = await client.patch(
+            f"/api/videos/uploads/{upload_id}",
+            content=content[400:],
+            headers={**headers, "Upload-Offset": "400"}
+        )
+        assert response.status_code == 200
+        assert response.json()["offset"] == len(content)
+        
+        response = await client.post(f"/api/videos/uploads/{upload_id}/complete", headers=headers)
+        
+        assert response.status_code == 201
+        assert "task_id" in response.json()
+        
+        stored = Path("storage/uploads") / f"{upload_id}.mp4"
+        try:
+            assert stored.read_bytes() == content
+            assert not (Path("storage/temp") / f"{upload_id}.part").exists()
+            mock_celery.assert_called_once()
+        finally:
+            stored.unlink(missing_ok=True)
+    
+    async def test_upload_chunk_offset_mismatch(self, client: AsyncClient, test_user_token):
+        """Test sending a chunk at the wrong offset"""
+        upload_id = await self._create_session(client, test_user_token, 100)
+        
+        response = await client.patch(
+            f"/api/videos/uploads/{upload_id}",
+            content=b"x" * 10,
+            headers={"Authorization": f"Bearer {test_user_token}", "Upload-Offset": "50"}
+        )
+        
+        assert response.status_code == 409
+        (Path("storage/temp") / f"{upload_id}.part").unlink(missing_ok=True)
+    
+    async def test_upload_chunk_streams_outside_transaction(self, client: AsyncClient, test_db, test_user_token):
+        """Test that no database transaction stays open while the chunk is received"""
+        upload_id = await self._create_session(client, test_user_token, 100)
+        append_stream = fileservice.append_stream
+        in_transaction = []
+        
+        async def tracked(*args, **kwargs):
+            in_transaction.append(test_db.in_transaction())
+            return await append_stream(*args, **kwargs)
+        
+        with patch.object(fileservice, "append_stream", side_effect=tracked):
+            response = await client.patch(
+                f"/api/videos/uploads/{upload_id}",
+                content=b"x" * 10,
+                headers={"Authorization": f"Bearer {test_user_token}", "Upload-Offset": "0"}
+            )
+        
+        assert response.status_code == 200
+        assert response.json()["offset"] == 10
+        assert in_transaction == [False]
+        (Path("storage/temp") / f"{upload_id}.part").unlink(missing_ok=True)
+    
+    async def test_upload_chunk_while_another_is_written(self, client: AsyncClient, test_user_token):
+        """Test that a second chunk for the same upload is rejected while the first is written"""
+        upload_id = await self._create_session(client, test_user_token, 100)
+        headers = {"Authorization": f"Bearer {test_user_token}", "Upload-Offset": "0"}
+        
+        async with fileservice.lock_partial(f"{upload_id}.part"):
+            response = await client.patch(f"/api/videos/uploads/{upload_id}", content=b"x" * 10, headers=headers)
+        assert response.status_code == 409
+        
+        response = await client.patch(f"/api/videos/uploads/{upload_id}", content=b"x" * 10, headers=headers)
+        assert response.status_code == 200
+        (Path("storage/temp") / f"{upload_id}.part").unlink(missing_ok=True)
+    
+    async def test_upload_chunk_exceeds_total(self, client: AsyncClient, test_user_token):
+        """Test sending more bytes than declared"""
+        upload_id = await self._create_session(client, test_user_token, 10)
+        
+        response = await client.patch(
+            f"/api/videos/uploads/{upload_id}",
+            content=b"x" * 20,
+            headers={"Authorization": f"Bearer {test_user_token}", "Upload-Offset": "0"}
+        )
+        
+        assert response.status_code == 400
+        (Path("storage/temp") / f"{upload_id}.part").unlink(missing_ok=True)
+    
+    async def test_complete_incomplete_upload(self, client: AsyncClient, test_user_token):
+        """Test finishing an upload before all bytes arrived"""
+        upload_id = await self._create_session(client, test_user_token, 100)
+        
+        response = await client.post(
+            f"/api/videos/uploads/{upload_id}/complete",
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 400
+        assert "incomplete" in response.json()["detail"].lower()
+    
+    async def test_upload_session_not_owner(self, client: AsyncClient, test_user_token, another_test_user_token):
+        """Test accessing another user's upload session"""
+        upload_id = await self._create_session(client, test_user_token, 100)
+        
+        response = await client.get(
+            f"/api/videos/uploads/{upload_id}",
+            headers={"Authorization": f"Bearer {another_test_user_token}"}
+        )
+        
+        assert response.status_code == 403
+    
+    async def test_upload_session_not_found(self, client: AsyncClient, test_user_token):
+        """Test querying a non-existent upload session"""
+        import uuid
+        
+        response = await client.get(
+            f"/api/videos/uploads/{uuid.uuid4()}",
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 404
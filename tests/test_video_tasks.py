@@ -0,0 +1,187 @@
+import pytest
+from unittest.mock import patch
+
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy import select
+
+from app.core.exceptions import ValidationException
+from app.models.outbox_task import OutboxTask
+from app.repositories.video_repository import video_repository
+from app.tasks.video_tasks import (
+    STAGES,
+    fail_video_task,
+    probe_video_task,
+    process_video_task,
+    stage_time_limits,
+    transcode_video_task
+)
+
+METADATA = {"duration": 30.0, "width": 1920, "height": 1080, "codec": "h264"}
+
+
+async def create_video(test_db, user, **fields):
+    video = await video_repository.create(
+        db=test_db,
+        user_id=user.id,
+        title="Pipeline Video",
+        original_filename="pipeline.mp4",
+        file_path="storage/uploads/pipeline.mp4",
+        duration_seconds=0,
+        file_size_bytes=1024,
+        status="processing",
+        content_hash="a" * 64
+    )
+    for name, value in fields.items():
+        setattr(video, name, value)
+    await test_db.commit()
+    return video
+
+
+@pytest.mark.asyncio
+class TestProcessingPipeline:
+    
+    async def test_probe_stage_checkpoints(self, test_db, test_user):
+        """Test that the probe stage stores its metadata and is not repeated"""
+        video = await create_video(test_db, test_user)
+        
+        with patch("app.tasks.video_tasks.validate_video_sync", return_value=METADATA) as validate:
+            first = probe_video_task(str(video.id))
+            second = probe_video_task(str(video.id))
+        
+        await test_db.refresh(video)
+        
+        assert first["status"] == "success"
+        assert second["status"] == "skipped"
+        validate.assert_called_once()
+        assert video.processing_stage == "probe"
+        assert video.processing_artifacts["metadata"] == METADATA
+        assert video.duration_seconds == 30
+        assert set(video.processing_metrics["probe"]) >= {"wall_seconds", "cpu_seconds", "peak_rss_bytes"}
+    
+    async def test_stage_waits_for_previous(self, test_db, test_user):
+        """Test that a stage does nothing until the previous one completed"""
+        video = await create_video(test_db, test_user)
+        
+        with patch("app.tasks.video_tasks.render_video") as render:
+            result = transcode_video_task(str(video.id))
+        
+        assert result["status"] == "skipped"
+        render.assert_not_called()
+    
+    async def test_invalid_video_fails_without_retry(self, test_db, test_user):
+        """Test that validation errors mark the video failed immediately"""
+        video = await create_video(test_db, test_user)
+        
+        with patch("app.tasks.video_tasks.validate_video_sync", side_effect=ValidationException("too short")):
+            result = probe_video_task(str(video.id))
+        
+        await test_db.refresh(video)
+        
+        assert result["status"] == "failed"
+        assert video.status == "failed"
+        assert video.processing_stage is None
+    
+    async def test_process_video_resumes_from_checkpoint(self, test_db, test_user, mock_celery):
+        """Test that a new run only chains the stages after the checkpoint"""
+        video = await create_video(
+            test_db,
+            test_user,
+            status="failed",
+            processing_stage="transcode",
+            processing_artifacts={"metadata": METADATA}
+        )
+        
+        result = process_video_task(str(video.id), video.file_path)
+        
+        await test_db.refresh(video)
+        
+        assert result["stages"] == list(STAGES[2:])
+        mock_celery.assert_called_once()
+        name, options = mock_celery.call_args.args[0], mock_celery.call_args.kwargs
+        stages = [options] + [sig["options"] for sig in options["chain"]]
+        assert [name] + [sig["task"] for sig in options["chain"]] == ["render_renditions", "finalize_video"]
+        assert video.status == "processing"
+        assert all(stage["soft_time_limit"] < stage["time_limit"] for stage in stages)
+        assert all(stage["link_error"] for stage in stages)
+    
+    async def test_process_video_duplicate_delivery_starts_once(self, test_db, test_user, mock_celery):
+        """Test that a redelivered task does not chain the pipeline a second time"""
+        video = await create_video(test_db, test_user, status="uploaded")
+        
+        first = process_video_task(str(video.id), video.file_path)
+        second = process_video_task(str(video.id), video.file_path)
+        
+        await test_db.refresh(video)
+        
+        assert first["status"] == "queued"
+        assert second["status"] == "skipped"
+        mock_celery.assert_called_once()
+        assert mock_celery.call_args.args[0] == "probe_video"
+        assert video.status == "processing"
+    
+    async def test_process_video_publish_failure_left_to_outbox(self, test_db, test_user, mock_celery):
+        """Test that a chain the broker did not take stays in the outbox for the sweeper"""
+        video = await create_video(test_db, test_user, status="uploaded")
+        mock_celery.side_effect = ConnectionError("broker down")
+        
+        result = process_video_task(str(video.id), video.file_path)
+        
+        entry = (await test_db.execute(select(OutboxTask))).scalar_one()
+        await test_db.refresh(video)
+        
+        assert result["status"] == "queued"
+        assert video.status == "processing"
+        assert (entry.task_name, entry.status, entry.args) == ("probe_video", "pending", [str(video.id)])
+        assert [sig["task"] for sig in reversed(entry.options["chain"])] == ["transcode_video", "render_renditions", "finalize_video"]
+
+    async def test_stage_timeout_fails_without_retry(self, test_db, test_user):
+        """Test that a stage hitting its soft time limit kills ffmpeg and fails the video"""
+        video = await create_video(
+            test_db,
+            test_user,
+            processing_stage="probe",
+            processing_artifacts={"metadata": METADATA}
+        )
+        
+        with patch("app.tasks.video_tasks.render_video", side_effect=SoftTimeLimitExceeded()), \
+                patch("app.tasks.video_tasks.kill_running") as kill:
+            result = transcode_video_task(str(video.id))
+        
+        await test_db.refresh(video)
+        
+        assert result["status"] == "failed"
+        kill.assert_called_once()
+        assert video.status == "failed"
+        assert video.failure_reason == "Stage transcode exceeded its time limit"
+        assert video.processing_stage == "probe"
+    
+    async def test_killed_stage_marks_video_failed(self, test_db, test_user):
+        """Test the errback run when a hard time limit kills the worker child"""
+        video = await create_video(test_db, test_user)
+        
+        fail_video_task(str(video.id), "renditions")
+        
+        await test_db.refresh(video)
+        
+        assert video.status == "failed"
+        assert "renditions" in video.failure_reason
+
+
+class TestStageTimeLimits:
+    
+    def test_limits_scale_with_duration(self):
+        """Test that longer clips get more time to encode"""
+        short = stage_time_limits("transcode", 20)
+        long = stage_time_limits("transcode", 60)
+        
+        assert short["soft_time_limit"] < long["soft_time_limit"]
+        assert long["time_limit"] > long["soft_time_limit"]
+    
+    def test_unknown_duration_gets_longest_limits(self):
+        """Test that a missing duration is treated as the longest clip"""
+        assert stage_time_limits("renditions", None) == stage_time_limits("renditions", 600)
+    
+    def test_probe_limit_is_fixed(self):
+        """Test that stages without encodes only get the base limit"""
+        assert stage_time_limits("probe", 20) == stage_time_limits("probe", 60)
+
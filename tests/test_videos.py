@@ -271,4 +271,228 @@ class TestVideos:
             headers={"Authorization": f"Bearer {test_user_token}"}
         )
         
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+    
+    async def test_upload_video_streams_to_storage(self, client: AsyncClient, test_user_token, test_db):
+        """Test that a streamed upload is stored with its exact size"""
+        from app.models import Video
+        from sqlalchemy import select
+        
+        content = b"\x00" * (3 * 1024 * 1024 + 17)  # spans several chunks
+        
+        files = {
+            "video_file": ("streamed.mp4", content, "video/mp4")
+        }
+        data = {
+            "title": "Streamed Video"
+        }
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files=files,
+            data=data,
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        
+        result = await test_db.execute(select(Video).where(Video.title == "Streamed Video"))
+        video = result.scalar_one()
+        stored = Path(video.file_path)
+        try:
+            assert video.file_size_bytes == len(content)
+            assert stored.stat().st_size == len(content)
+        finally:
+            stored.unlink(missing_ok=True)
+    
+    async def test_save_stream_aborts_over_max_size(self, tmp_path):
+        """Test that a stream over max_size is cut off mid-way and the partial file removed"""
+        from app.core.exceptions import ValidationException
+        from app.storage.local_storage import LocalStorage
+        
+        storage = LocalStorage(str(tmp_path))
+        sent = []
+        
+        async def chunks():
+            for _ in range(10):
+                sent.append(1024)
+                yield b"x" * 1024
+        
+        with pytest.raises(ValidationException):
+            await storage.save_stream(chunks(), "too_big.mp4", subfolder="uploads", max_size=3 * 1024)
+        
+        assert sum(sent) == 4 * 1024
+        assert not (tmp_path / "uploads" / "too_big.mp4").exists()
+    
+    async def test_upload_video_rejected_from_header(self, client: AsyncClient, test_user_token, mock_celery):
+        """Test that a clip over 60 seconds is rejected before being stored or queued"""
+        uploads = set(Path("storage/uploads").glob("*.mp4"))
+        
+        with open("tests/test_data/flex.mp4", "rb") as f:
+            files = {
+                "video_file": ("flex.mp4", f.read(), "video/mp4")
+            }
+        data = {
+            "title": "Too Long"
+        }
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files=files,
+            data=data,
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 400
+        assert "duration" in response.json()["detail"].lower()
+        assert set(Path("storage/uploads").glob("*.mp4")) == uploads
+        mock_celery.assert_not_called()
+    
+    async def test_upload_video_too_large(self, client: AsyncClient, test_user_token, monkeypatch):
+        """Test that oversized uploads are rejected and nothing is left on disk"""
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+        uploads = set(Path("storage/uploads").glob("*.mp4"))
+        
+        files = {
+            "video_file": ("big.mp4", b"\x00" * (2 * 1024 * 1024), "video/mp4")
+        }
+        data = {
+            "title": "Too Big"
+        }
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files=files,
+            data=data,
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 400
+        assert "exceeds" in response.json()["detail"].lower()
+        assert set(Path("storage/uploads").glob("*.mp4")) == uploads
+    
+    async def test_upload_video_dispatches_after_commit(self, client: AsyncClient, test_user_token, test_db, mock_celery):
+        """Test that the processing task goes through the outbox and is published"""
+        from app.models import OutboxTask, Video
+        from sqlalchemy import select
+        
+        files = {
+            "video_file": ("outbox.mp4", b"\x00" * 1024, "video/mp4")
+        }
+        data = {
+            "title": "Outbox Video"
+        }
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files=files,
+            data=data,
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        
+        video = (await test_db.execute(select(Video).where(Video.title == "Outbox Video"))).scalar_one()
+        entry = (await test_db.execute(select(OutboxTask))).scalar_one()
+        Path(video.file_path).unlink(missing_ok=True)
+        
+        assert entry.status == "dispatched"
+        assert entry.args == [str(video.id), video.file_path]
+        mock_celery.assert_called_once_with("process_video", args=entry.args, priority=5)
+    
+    async def test_upload_video_records_content_hash(self, client: AsyncClient, test_user_token, test_db):
+        """Test that uploads are hashed while they are streamed to storage"""
+        import hashlib
+        from app.models import Video
+        from sqlalchemy import select
+        
+        content = b"\x01" * (2 * 1024 * 1024 + 5)
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files={"video_file": ("hashed.mp4", content, "video/mp4")},
+            data={"title": "Hashed Video"},
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        
+        video = (await test_db.execute(select(Video).where(Video.title == "Hashed Video"))).scalar_one()
+        Path(video.file_path).unlink(missing_ok=True)
+        
+        assert video.content_hash == hashlib.sha256(content).hexdigest()
+    
+    async def test_upload_video_duplicate_links_processed_copy(self, client: AsyncClient, test_user_token, test_db, mock_celery, tmp_path):
+        """Test that a duplicate upload reuses cached outputs without queueing work"""
+        import hashlib
+        from app.core.config import settings
+        from app.models import MediaAsset, OutboxTask, Video
+        from app.processing.assets import processing_version
+        from sqlalchemy import select
+        
+        content = b"\x02" * 4096
+        processed = tmp_path / "processed.mp4"
+        processed.write_bytes(b"processed")
+        test_db.add(MediaAsset(
+            content_hash=hashlib.sha256(content).hexdigest(),
+            profile_version=processing_version(str(Path(settings.RES_PATH) / "logo720.png")),
+            duration=25.0,
+            width=1920,
+            height=1080,
+            codec="h264",
+            file_path=str(processed),
+            poster_path=str(tmp_path / "poster.jpg")
+        ))
+        await test_db.commit()
+        uploads = set(Path("storage/uploads").glob("*.mp4"))
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files={"video_file": ("dup.mp4", content, "video/mp4")},
+            data={"title": "Duplicate Video"},
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        
+        video = (await test_db.execute(select(Video).where(Video.title == "Duplicate Video"))).scalar_one()
+        assert video.status == "processed"
+        assert video.file_path == str(processed)
+        assert video.poster_path == str(tmp_path / "poster.jpg")
+        assert video.duration_seconds == 25
+        assert (await test_db.execute(select(OutboxTask))).scalars().all() == []
+        assert set(Path("storage/uploads").glob("*.mp4")) == uploads
+        mock_celery.assert_not_called()
+    
+    async def test_upload_video_broker_unavailable(self, client: AsyncClient, test_user_token, test_db, mock_celery):
+        """Test that the upload succeeds and the task stays pending when the broker is down"""
+        from app.models import OutboxTask, Video
+        from sqlalchemy import select
+        
+        mock_celery.side_effect = ConnectionError("broker unavailable")
+        
+        files = {
+            "video_file": ("outbox.mp4", b"\x00" * 1024, "video/mp4")
+        }
+        data = {
+            "title": "Outbox Video"
+        }
+        
+        response = await client.post(
+            "/api/videos/upload",
+            files=files,
+            data=data,
+            headers={"Authorization": f"Bearer {test_user_token}"}
+        )
+        
+        assert response.status_code == 201
+        
+        video = (await test_db.execute(select(Video).where(Video.title == "Outbox Video"))).scalar_one()
+        entry = (await test_db.execute(select(OutboxTask))).scalar_one()
+        Path(video.file_path).unlink(missing_ok=True)
+        
+        assert entry.status == "pending"
+        assert entry.attempts == 1
+        assert "broker unavailable" in entry.last_error